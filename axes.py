@@ -0,0 +1,90 @@
+import json
+import os
+
+# ===== ТАБЛИЦА ОСЕЙ =====
+# Оси описываются данными (axes.json или AXES), а не кодом: пины, полярность
+# DIR, концевик, ход, безопасная цель, настройки по умолчанию. Из таблицы
+# motor_control строит свои списки по осям, а настройки, общая память ядра,
+# запись движения и меню берут из неё число осей и их параметры.
+#
+# Поля оси:
+#   name, label  — имя для конфигов и подпись в меню
+#   dir_pin, step_pin, limit_pin (null — концевика нет)
+#   dir_inverted — обратная полярность DIR
+#   homing       — ищет ноль по концевику при калибровке
+#   travel       — [нижний, верхний] предел хода: число или ключ настроек
+#                  оси ("-ключ" — со знаком минус), как в channel_map
+#   safe         — цель при потере связи (как travel; null — ось не трогаем)
+#   max_speed    — верхняя граница настройки speed (null — без неё)
+#   settings     — настройки по умолчанию; их ключи, кроме jerk, правятся в меню
+#
+# Ручник и поворотники — пятая и шестая оси в axes.json, например:
+#   {"name": "handbrake", "label": "Ручник", "dir_pin": 16, "step_pin": 21,
+#    "limit_pin": 5, "dir_inverted": false, "homing": true,
+#    "travel": [0, "distance"], "safe": "distance",
+#    "settings": {"speed": 10000, "acceleration": 100, "distance": 3000}}
+
+AXES_FILE = os.environ.get("AXES_FILE", "axes.json")
+
+AXES = [
+    {"name": "steer", "label": "Руль", "dir_pin": 26, "step_pin": 20, "limit_pin": None,
+     "dir_inverted": False, "homing": False, "travel": ["-distance", "distance"],
+     "safe": 0, "max_speed": 25000,
+     "settings": {"speed": 10000, "acceleration": 100, "distance": 15000}},
+    {"name": "gas", "label": "Газ", "dir_pin": 6, "step_pin": 12, "limit_pin": 19,
+     "dir_inverted": True, "homing": True, "travel": ["-distance", "distance"],
+     "safe": 0, "max_speed": None,
+     "settings": {"speed": 10000, "acceleration": 100, "distance": 10000}},
+    {"name": "brake", "label": "Тормоз", "dir_pin": 0, "step_pin": 1, "limit_pin": 13,
+     "dir_inverted": True, "homing": True, "travel": ["-distance", "distance"],
+     "safe": "distance", "max_speed": None,
+     "settings": {"speed": 10000, "acceleration": 100, "distance": 10000}},
+    {"name": "akpp", "label": "АКПП", "dir_pin": 11, "step_pin": 8, "limit_pin": None,
+     "dir_inverted": False, "homing": False, "travel": ["-distance_R", "distance_D"],
+     "safe": None, "max_speed": None,
+     "settings": {"speed": 10000, "acceleration": 100, "distance_R": 4000, "distance_D": 7000}},
+]
+
+def load_axes(path: str = AXES_FILE):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            table = json.load(f)
+    else:
+        table = AXES
+    for axis in table:
+        if axis.get("homing") and axis.get("limit_pin") is None:
+            raise ValueError(f"ось {axis['name']}: поиск нуля без концевика")
+    return table
+
+def resolve(spec, cfg):
+    # число или ключ настроек оси, "-ключ" — со знаком минус
+    if isinstance(spec, str):
+        if spec.startswith("-"):
+            return -cfg[spec[1:]]
+        return cfg[spec]
+    return spec
+
+def travel_keys(axis) -> list:
+    # ключи настроек, задающие ход, по порядку и без повторов
+    keys = []
+    for spec in axis["travel"]:
+        if isinstance(spec, str) and spec.lstrip("-") not in keys:
+            keys.append(spec.lstrip("-"))
+    return keys
+
+def setting_keys(axis) -> list:
+    # что правится в меню
+    return [key for key in axis["settings"] if key != "jerk"]
+
+def index(name: str, table=None):
+    # номер оси по имени; None — такой оси в таблице нет
+    for i, axis in enumerate(table or TABLE):
+        if axis["name"] == name:
+            return i
+    return None
+
+def default_settings(table=None) -> list:
+    return [dict(axis["settings"]) for axis in (table or TABLE)]
+
+TABLE = load_axes()
+COUNT = len(TABLE)
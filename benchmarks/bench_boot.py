@@ -0,0 +1,86 @@
+import json
+import os
+import selectors
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sim.fb import fake_framebuffer
+from sim.ibus_gen import IBusGenerator
+from sim.uart import PtyUart
+
+# Время от старта процесса reed.py до первого шага: reed запускается как на
+# машине, но с бэкендом sim, UART на PTY (кадры идут с самого начала),
+# файлом вместо /dev/fb0 и своими сокетом статистики и pid-файлом.
+# Метки берутся из строк «boot: <этап> <мс> ms» в stderr. HEADLESS=1 —
+# запуск без меню, последний этап — API управления.
+
+HEADLESS = os.environ.get("HEADLESS") == "1"
+STAGES = ("lock", "motion", "first step", "control" if HEADLESS else "menu")
+
+def boot_once(workdir: str, uart: PtyUart, timeout: float = 30.0):
+    env = dict(os.environ,
+               STEP_BACKEND="sim",
+               MOTION_CORE=os.environ.get("MOTION_CORE", "thread"),
+               UART_PORT=uart.port,
+               FRAMEBUFFER=fake_framebuffer(),
+               STATS_SOCKET=os.path.join(workdir, "stats.sock"),
+               CONTROL_SOCKET=os.path.join(workdir, "control.sock"),
+               TIHON_LOCK=os.path.join(workdir, "tihon.pid"))
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "reed.py")], cwd=workdir,
+                            env=env, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
+    marks = {}
+    selector = selectors.DefaultSelector()
+    selector.register(proc.stderr, selectors.EVENT_READ)
+    end = time.monotonic() + timeout
+    try:
+        while time.monotonic() < end and not all(stage in marks for stage in STAGES):
+            if not selector.select(end - time.monotonic()):
+                break
+            line = proc.stderr.readline()
+            if not line:
+                break
+            if line.startswith("boot: "):
+                name, ms, _ = line[6:].rsplit(" ", 2)
+                marks[name] = float(ms)
+    finally:
+        selector.close()
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        os.unlink(env["FRAMEBUFFER"])
+    return marks
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    output = sys.argv[2] if len(sys.argv) > 2 else None
+    uart = PtyUart()
+    uart.play(IBusGenerator())
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(runs):
+            results.append(boot_once(workdir, uart))
+    uart.close()
+
+    summary = {}
+    for stage in STAGES:
+        values = sorted(r[stage] for r in results if stage in r)
+        if values:
+            summary[stage] = {"median_ms": values[len(values) // 2], "max_ms": values[-1],
+                              "runs": len(values)}
+        print(f"{stage:<12} " + (f"медиана {values[len(values) // 2]:7.0f} мс, максимум {values[-1]:7.0f} мс"
+                                 if values else "не достигнут"))
+    if output:
+        with open(output, "w") as f:
+            json.dump({"runs": results, "summary": summary}, f, indent=4, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
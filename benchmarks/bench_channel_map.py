@@ -0,0 +1,65 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import axes
+from channel_map import ChannelMap
+
+# заводские настройки осей: motor_control без RPi.GPIO не импортируется
+MOTOR_SETTINGS = axes.default_settings()
+
+# Разбор кадра в цели моторов: прежние формулы с настройками на каждый кадр
+# против таблиц ChannelMap. Заодно проверка, что результаты совпадают.
+
+def legacy_map(channels, settings, targets):
+    max_steer = settings[0]["distance"]
+    targets[0] = int((channels[0] - 1500) * (max_steer / 500))
+    max_gas = settings[1]["distance"]
+    if channels[1] > 1500:
+        targets[1] = int((channels[1] - 1500) * (max_gas / 500))
+    else:
+        targets[1] = 0
+    max_brake = settings[2]["distance"]
+    targets[2] = int((channels[2] - 1000) * (max_brake / 1000))
+    akpp_value = channels[5]
+    if akpp_value < 1200:
+        targets[3] = -settings[3]["distance_R"]
+    elif akpp_value > 1800:
+        targets[3] = settings[3]["distance_D"]
+    else:
+        targets[3] = 0
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rnd = random.Random(1)
+    frames = [tuple(rnd.randint(1000, 2000) for _ in range(6)) + (1500,) * 8 for _ in range(count)]
+    mapping = ChannelMap()
+
+    start = time.perf_counter()
+    mapping.compile(MOTOR_SETTINGS)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    a, b = [0] * 4, [0] * 4
+    for channels in frames[:10000]:
+        legacy_map(channels, MOTOR_SETTINGS, a)
+        mapping.apply(channels, b)
+        assert a == b, (channels, a, b)
+
+    start = time.perf_counter()
+    for channels in frames:
+        legacy_map(channels, MOTOR_SETTINGS, a)
+    legacy_us = (time.perf_counter() - start) / count * 1e6
+    start = time.perf_counter()
+    for channels in frames:
+        mapping.apply(channels, b)
+    table_us = (time.perf_counter() - start) / count * 1e6
+
+    print(f"сборка таблиц          {compile_ms:8.2f} мс")
+    print(f"кадр, прежние формулы  {legacy_us:8.3f} мкс")
+    print(f"кадр, ChannelMap       {table_us:8.3f} мкс")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim
+
+# поддельный RPi.GPIO и файл вместо /dev/fb0 — до импорта motor_control
+gpio = sim.install()
+os.environ["MOTION_CORE"] = "thread"
+os.environ.setdefault("STEP_BACKEND", "gpio")
+
+import axes
+import motor_control as motor
+import data_receiver
+import step_loop
+from sim.ibus_gen import IBusGenerator, still_frame
+from sim.uart import PtyUart
+
+# Контур управления целиком без железа: предел частоты шагов, джиттер
+# интервалов, задержка «кадр iBus -> первый шаг» и загрузка CPU для
+# receive_data, move_motor (цикл шагов) и Menu.update_screen.
+# Результат — JSON (-o), два прогона сравниваются через --compare.
+
+# разгон круче заводского, чтобы короткие ходы в замерах не тянулись секундами
+BENCH_SETTINGS = [dict(cfg, acceleration=2000) for cfg in axes.default_settings()]
+
+# ===== ОБЩЕЕ =====
+def percentiles(values, points=(50, 90, 99, 99.9)):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    n = len(ordered)
+    result = {f"p{p:g}": ordered[min(n - 1, int(n * p / 100))] for p in points}
+    result["max"] = ordered[-1]
+    result["mean"] = sum(ordered) / n
+    result["count"] = n
+    return result
+
+def thread_cpu(thread) -> float:
+    return time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+
+def reset_motion(settings=BENCH_SETTINGS):
+    motor.update_motor_settings([dict(cfg) for cfg in settings])
+    for i in range(motor.AXIS_COUNT):
+        motor.target_positions[i] = 0
+        motor.set_position(i, 0)
+    gpio.clear_edges()
+
+def wait_stopped(timeout: float) -> bool:
+    end = time.monotonic() + timeout
+    while any(plan is not None for plan in motor.plans):
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.002)
+    return True
+
+def start_receiver(uart, mailbox):
+    data_receiver.UART_PORT = uart.port
+    # receive_data не выходит сам: после замера поток-демон простаивает на
+    # таймауте чтения
+    thread = threading.Thread(target=data_receiver.receive_data, args=(motor, mailbox),
+                              name="receiver", daemon=True)
+    thread.start()
+    return thread
+
+# ===== ПРЕДЕЛ ЧАСТОТЫ ШАГОВ =====
+CEILING_STEPS = 2_000_000  # план хода хранится целиком: 8 байт на шаг
+
+def bench_step_ceiling(seconds: float):
+    # без пауз между шагами: цена одного шага в Python (план, GPIO, строб)
+    saved = motor.MIN_STEP_INTERVAL_NS, motor.MAX_SPEEDS
+    # крейсер в 1 нс и рампа в пару шагов: ограничивает только сам код
+    fast = [dict(cfg, speed=10 ** 9, acceleration=10 ** 16) for cfg in BENCH_SETTINGS]
+    for cfg, axis in zip(fast, axes.TABLE):
+        for key in axes.travel_keys(axis):
+            cfg[key] = CEILING_STEPS
+    motor.MIN_STEP_INTERVAL_NS, motor.MAX_SPEEDS = 1, [None] * motor.AXIS_COUNT
+    try:
+        reset_motion(fast)
+        motor.target_positions[0] = CEILING_STEPS
+        end = time.perf_counter() + seconds
+        start = time.perf_counter()
+        while time.perf_counter() < end:
+            for _ in range(1000):
+                motor.move_motor(0)
+        single = len(gpio.rising_edges(motor.STEP_PINS[0])) / (time.perf_counter() - start)
+
+        reset_motion(fast)
+        motor.target_positions[:] = [CEILING_STEPS] * motor.AXIS_COUNT
+        end = time.perf_counter() + seconds
+        start = time.perf_counter()
+        while time.perf_counter() < end:
+            for _ in range(250):
+                motor.step_all()
+        total = sum(len(gpio.rising_edges(pin)) for pin in motor.STEP_PINS)
+        all_axes = total / (time.perf_counter() - start)
+    finally:
+        motor.MIN_STEP_INTERVAL_NS, motor.MAX_SPEEDS = saved
+        reset_motion()
+    return {"single_axis_steps_per_s": single, "all_axes_steps_per_s": all_axes,
+            "ns_per_step": 1e9 / single if single else None}
+
+# ===== ДЖИТТЕР ИНТЕРВАЛОВ =====
+def bench_jitter(steps: int, uart_load: bool):
+    # план хода известен заранее — фактические интервалы сравниваются с ним
+    reset_motion()
+    uart = None
+    receiver = None
+    if uart_load:
+        # приёмник с потоком кадров, но с отдельным ящиком: GIL и CPU
+        # делит с циклом шагов, а уставки не трогает
+        uart = PtyUart()
+        receiver = start_receiver(uart, step_loop.SetpointMailbox(motor.target_positions))
+        uart.play(IBusGenerator())
+        time.sleep(0.1)
+
+    motor.target_positions[0] = steps
+    motor._replan(0, steps)
+    plan = motor.plans[0]
+    mailbox = step_loop.SetpointMailbox(motor.target_positions)
+    loop = step_loop.start_step_loop(motor, mailbox)
+    cpu_start = thread_cpu(loop)
+    wall_start = time.perf_counter()
+    receiver_cpu = thread_cpu(receiver) if receiver is not None else 0.0
+    finished = wait_stopped(60.0)
+    wall = time.perf_counter() - wall_start
+    cpu = thread_cpu(loop) - cpu_start
+    if receiver is not None:
+        receiver_cpu = thread_cpu(receiver) - receiver_cpu
+    loop.stop()
+    loop.join()
+    if uart is not None:
+        uart.stop()
+
+    times = gpio.rising_edges(motor.STEP_PINS[0])
+    errors_us = [abs((b - a) - plan.interval(k)) / 1000
+                 for k, (a, b) in enumerate(zip(times, times[1:]))]
+    result = {"steps": len(times), "finished": finished,
+              "interval_error_us": percentiles(errors_us),
+              "step_loop_cpu_percent": cpu / wall * 100}
+    if uart_load:
+        result["receiver_cpu_percent"] = receiver_cpu / wall * 100
+    reset_motion()
+    return result
+
+# ===== ЗАДЕРЖКА КАДР -> ШАГ =====
+def bench_latency(trials: int):
+    reset_motion()
+    uart = PtyUart()
+    mailbox = step_loop.SetpointMailbox(motor.target_positions)
+    loop = step_loop.start_step_loop(motor, mailbox)
+    start_receiver(uart, mailbox)
+    # первый кадр со связью обнуляет руль — после него и начинаем; pyserial
+    # при открытии сбрасывает вход, поэтому нейтраль шлём, пока он открывается
+    for _ in range(20):
+        uart.write(still_frame())
+        time.sleep(0.01)
+
+    pin = motor.STEP_PINS[0]
+    latencies_us = []
+    missed = 0
+    for n in range(trials):
+        wait_stopped(5.0)
+        # сдвиг фазы относительно таймаута чтения и сна цикла шагов
+        time.sleep(0.003 + (n % 7) * 0.001)
+        # ±20 мкс: один кадр должен пройти мёртвую зону фильтра уставок
+        steer = 1500 + (20 if n % 2 == 0 else -20)
+        sent = uart.write(still_frame(steer=steer))
+        end = time.monotonic_ns() + 1_000_000_000
+        first = None
+        while first is None and time.monotonic_ns() < end:
+            after = gpio.rising_edges(pin, sent)
+            if after:
+                first = after[0]
+            else:
+                # время шага берётся из фронта, частота опроса на него не влияет
+                time.sleep(0.001)
+        if first is None:
+            missed += 1
+        else:
+            latencies_us.append((first - sent) / 1000)
+    wait_stopped(5.0)
+    loop.stop()
+    loop.join()
+    uart.stop()
+    reset_motion()
+    return {"packet_to_first_step_us": percentiles(latencies_us), "missed": missed}
+
+# ===== CPU =====
+def bench_receiver_cpu(seconds: float):
+    # кадры в темпе пульта (7 мс), разбор и таблицы каналов; ящик отдельный
+    reset_motion()
+    uart = PtyUart()
+    thread = start_receiver(uart, step_loop.SetpointMailbox(motor.target_positions))
+    time.sleep(0.1)
+    cpu_start = thread_cpu(thread)
+    wall_start = time.perf_counter()
+    uart.play(IBusGenerator(), seconds).join()
+    time.sleep(0.05)
+    wall = time.perf_counter() - wall_start
+    cpu = thread_cpu(thread) - cpu_start
+    frames = len(uart.sent)
+    return {"frames": frames, "cpu_percent": cpu / wall * 100,
+            "cpu_us_per_frame": cpu / frames * 1e6 if frames else None}
+
+def bench_move_motor(calls: int):
+    # цена вызова без шага: мотор стоит / до дедлайна ещё далеко
+    reset_motion()
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        motor.move_motor(0)
+    idle_ns = (time.perf_counter_ns() - start) / calls
+
+    motor.target_positions[0] = 10000
+    motor.move_motor(0)
+    motor.next_deadline[0] = time.monotonic_ns() + 10 ** 12
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        motor.move_motor(0)
+    waiting_ns = (time.perf_counter_ns() - start) / calls
+    reset_motion()
+    return {"idle_ns_per_call": idle_ns, "not_due_ns_per_call": waiting_ns}
+
+def bench_step_tick(calls: int):
+    # проход step_all(), когда шагать ещё рано: одна ось едет, остальные
+    # стоят — цена не должна расти с числом осей в таблице (AXES_FILE)
+    reset_motion()
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        motor.step_all()
+    idle_ns = (time.perf_counter_ns() - start) / calls
+
+    motor.target_positions[0] = 10000
+    motor.step_all()
+    motor.next_deadline[0] = time.monotonic_ns() + 10 ** 12
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        motor.step_all()
+    waiting_ns = (time.perf_counter_ns() - start) / calls
+    reset_motion()
+    return {"axes": motor.AXIS_COUNT, "idle_ns_per_call": idle_ns, "one_moving_ns_per_call": waiting_ns}
+
+def bench_update_screen(repeat: int):
+    try:
+        from PIL import Image
+        import menu as menu_module
+        from framebuffer import Framebuffer, to_rgb565
+    except ImportError as e:
+        return {"skipped": str(e)}
+    width, height = menu_module.WIDTH, menu_module.HEIGHT
+    menu = menu_module.Menu.__new__(menu_module.Menu)
+    menu.framebuffer = Framebuffer(os.environ["FRAMEBUFFER"], width, height)
+    image = Image.new("RGB", (width, height), menu_module.BACKGROUND_COLOR)
+    frame = to_rgb565(image)
+
+    def timed(*args):
+        cpu = time.process_time()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            menu.update_screen(*args)
+        wall = time.perf_counter() - start
+        return {"ms_per_call": wall / repeat * 1000,
+                "cpu_ms_per_call": (time.process_time() - cpu) / repeat * 1000}
+
+    try:
+        return {"convert_and_copy": timed(image),
+                "cached_frame": timed(image, frame),
+                "dirty_rect": timed(image, frame, [menu_module.VALUE_RECT])}
+    finally:
+        menu.framebuffer.close()
+
+# ===== СРАВНЕНИЕ ПРОГОНОВ =====
+def flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(old, new):
+    before = flatten(old["results"])
+    after = flatten(new["results"])
+    for name in sorted(after):
+        if name not in before:
+            continue
+        a, b = before[name], after[name]
+        change = f"{(b - a) / a * 100:+7.1f}%" if a else "       "
+        print(f"{name:<60} {a:>12.2f} -> {b:>12.2f} {change}")
+
+def main():
+    parser = argparse.ArgumentParser(description="бенчмарк контура управления без железа")
+    parser.add_argument("-o", "--output", help="куда сохранить результаты (JSON)")
+    parser.add_argument("--compare", help="прежний JSON для сравнения")
+    parser.add_argument("--quick", action="store_true", help="короткий прогон")
+    args = parser.parse_args()
+
+    scale = 0.25 if args.quick else 1.0
+    results = {
+        "step_ceiling": bench_step_ceiling(1.0 * scale),
+        "jitter_idle": bench_jitter(int(4000 * scale), uart_load=False),
+        "jitter_uart_load": bench_jitter(int(4000 * scale), uart_load=True),
+        "latency": bench_latency(int(100 * scale)),
+        "receive_data": bench_receiver_cpu(3.0 * scale),
+        "move_motor": bench_move_motor(int(200000 * scale)),
+        "step_tick": bench_step_tick(int(200000 * scale)),
+        "update_screen": bench_update_screen(max(1, int(20 * scale))),
+    }
+    run = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "step_backend": motor.backend.name,
+        "settings": BENCH_SETTINGS,
+        "results": results,
+    }
+    text = json.dumps(run, indent=4, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["STEP_BACKEND"] = "sim"
+
+import motor_control as motor
+from step_backends import HIGH, LOW
+
+# Поиск нуля в симуляции с моделью концевика: он нажат, пока ось стоит на
+# точке срабатывания или дальше неё в сторону концевика. Сценарии — ось
+# стоит на концевике с самого начала и концевик в пути. Заезд за точку
+# срабатывания (перебег) должен быть порядка HOMING_BACKOFF, а не
+# HOMING_MAX_TRAVEL в жёсткий упор.
+
+SCENARIOS = {
+    "pressed": -50,  # точка срабатывания — за спиной: концевик уже нажат
+    "travel": 1500,  # до точки срабатывания 1500 шагов
+}
+
+def run(name: str, switch_at: int, timeout: float = 30.0):
+    backend = motor.init_backend("sim")
+    for i in range(motor.AXIS_COUNT):
+        motor.plans[i] = None
+        motor.set_position(i, 0)
+        motor.target_positions[i] = 0
+    toward = {i: motor._toward_switch(i) for i in motor.HOMING_AXES}
+    trips = {i: toward[i] * switch_at for i in motor.HOMING_AXES}
+    overrun = {i: 0 for i in motor.HOMING_AXES}
+
+    def update_switches():
+        for i in motor.HOMING_AXES:
+            beyond = (motor.positions[i] - trips[i]) * toward[i]
+            overrun[i] = max(overrun[i], beyond)
+            backend.set_input(motor.LIMIT_SWITCH_PINS[i], LOW if beyond >= 0 else HIGH)
+
+    update_switches()
+    start = time.monotonic()
+    motor.start_homing()
+    while motor.homing_active and time.monotonic() - start < timeout:
+        update_switches()
+        motor.step_all()
+        due = motor.next_due_ns()
+        gap = due - time.monotonic_ns() if due is not None else 1_000_000
+        if gap > 0:
+            time.sleep(min(gap, 200_000) / 1e9)
+    if motor.homing_active:
+        motor.abort_homing()
+    status = motor.homing_status()
+    for i in motor.HOMING_AXES:
+        backend.set_input(motor.LIMIT_SWITCH_PINS[i], HIGH)
+    return {"ok": status["ok"], "elapsed_s": status["elapsed"],
+            "axes": {motor.AXIS_TABLE[i]["name"]: {"phase": status["phases"][i], "overrun": overrun[i]}
+                     for i in motor.HOMING_AXES}}
+
+def main():
+    output = sys.argv[1] if len(sys.argv) > 1 else None
+    results = {}
+    for name, switch_at in SCENARIOS.items():
+        r = results[name] = run(name, switch_at)
+        print(f"{name}: {'ok' if r['ok'] else 'НЕ НАЙДЕН'} за {r['elapsed_s']:.2f} с")
+        for axis, a in r["axes"].items():
+            print(f"  {axis}: {a['phase']}, перебег {a['overrun']} шагов")
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+    for r in results.values():
+        assert r["ok"], r
+        assert all(a["overrun"] < 2 * motor.HOMING_BACKOFF for a in r["axes"].values()), r
+
+if __name__ == "__main__":
+    main()
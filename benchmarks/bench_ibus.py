@@ -0,0 +1,78 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ibus
+
+# ===== ПОТОКИ =====
+def clean_stream(frames: int) -> bytes:
+    rnd = random.Random(1)
+    return b"".join(ibus.build_frame([rnd.randint(1000, 2000) for _ in range(14)])
+                    for _ in range(frames))
+
+def noisy_stream(frames: int, noise: float = 0.2) -> bytes:
+    # мусор между кадрами, битые контрольные суммы и ложные заголовки
+    rnd = random.Random(2)
+    out = bytearray()
+    for _ in range(frames):
+        if rnd.random() < noise:
+            junk = bytearray(rnd.getrandbits(8) for _ in range(rnd.randint(1, 40)))
+            if rnd.random() < 0.5:
+                junk[:2] = ibus.HEADER
+            out += junk
+        frame = bytearray(ibus.build_frame([rnd.randint(1000, 2000) for _ in range(14)]))
+        if rnd.random() < noise / 2:
+            frame[rnd.randint(2, 29)] ^= 0xFF
+        out += frame
+    return bytes(out)
+
+def chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+# ===== ПРЕЖНИЙ РАЗБОР (из data_receiver до IBusParser) =====
+def legacy_feed(buffer: bytearray, data: bytes) -> list:
+    buffer.extend(data)
+    frames = []
+    while len(buffer) >= 32:
+        if buffer[0] == 0x20 and buffer[1] == 0x40:
+            packet = buffer[:32]
+            checksum = 0xFFFF
+            for b in packet[:-2]:
+                checksum -= b
+            checksum &= 0xFFFF
+            if checksum == packet[-2] | (packet[-1] << 8):
+                channels = []
+                for i in range(10):
+                    channels.append(packet[2 + i * 2] | (packet[3 + i * 2] << 8))
+                frames.append(channels)
+                del buffer[:32]
+            else:
+                del buffer[0]
+        else:
+            del buffer[0]
+    return frames
+
+# ===== ЗАМЕРЫ =====
+def run(name: str, parts, feed):
+    start = time.perf_counter()
+    count = 0
+    for part in parts:
+        count += len(feed(part))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {count:>7} кадров  {count / elapsed:>12.0f} кадров/с")
+    return count / elapsed
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for label, data in (("чистый", clean_stream(frames)), ("шумный", noisy_stream(frames))):
+        # 256 байт — типичная порция uart.read при заполненном FIFO
+        parts = chunks(data, 256)
+        legacy_buffer = bytearray()
+        run(f"{label}: прежний разбор", parts, lambda part: legacy_feed(legacy_buffer, part))
+        run(f"{label}: IBusParser", parts, ibus.IBusParser().feed)
+
+if __name__ == "__main__":
+    main()
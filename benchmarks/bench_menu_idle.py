@@ -0,0 +1,78 @@
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("MOTION_CORE", "process")  # GPIO здесь не нужен
+
+from menu import Menu
+from sim.touch import FakeTouchDevice
+
+# Простой Menu с поддельным тачскрином: считаем пробуждения потоков меню
+# в простое (voluntary_ctxt_switches из /proc) и задержку тач -> process_touch.
+
+def make_menu(device):
+    # Menu без шрифтов, картинок и /dev/fb0 — только цикл событий
+    menu = Menu.__new__(Menu)
+    menu.touch_device = device
+    menu.running = True
+    menu.is_in_main_menu = True
+    menu.is_in_diagnostics = False
+    menu.is_in_telemetry = False
+    menu.calibrating = False
+    menu.main_menu_image = None
+    menu.main_menu_frame = None
+    menu.param_menu_images = {}
+    menu.param_menu_frames = {}
+    menu.dirty_rects = []
+    menu.touch_queue = queue.Queue()
+    menu.redraw_needed = threading.Event()
+    menu._wake_r, menu._wake_w = os.pipe()
+    menu.update_screen = lambda *args: None
+    menu.sync_settings = lambda: None
+    menu.touches = []
+    menu.process_touch = lambda x, y: menu.touches.append(time.perf_counter())
+    return menu
+
+def ctx_switches(tid: int) -> int:
+    with open(f"/proc/self/task/{tid}/status") as f:
+        for line in f:
+            if line.startswith("voluntary_ctxt_switches"):
+                return int(line.split()[1])
+    return 0
+
+def main():
+    idle_s = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    device = FakeTouchDevice()
+    menu = make_menu(device)
+    run_thread = threading.Thread(target=menu.run, daemon=True)
+    run_thread.start()
+    time.sleep(0.2)
+    tids = [t.native_id for t in threading.enumerate()
+            if t is run_thread or "touch_listener" in t.name]
+
+    before = sum(ctx_switches(tid) for tid in tids)
+    cpu_before = time.process_time()
+    time.sleep(idle_s)
+    wakeups = sum(ctx_switches(tid) for tid in tids) - before
+    cpu = time.process_time() - cpu_before
+    print(f"простой {idle_s:.1f} с: {wakeups / idle_s:.1f} пробуждений/с, CPU {cpu * 1000:.1f} мс")
+
+    latencies = []
+    for i in range(200):
+        start = time.perf_counter()
+        device.inject(100 + i, 100)
+        while len(menu.touches) <= i:
+            time.sleep(0)
+        latencies.append((menu.touches[i] - start) * 1e6)
+        time.sleep(0.002)
+    latencies.sort()
+    print(f"тач -> process_touch: медиана {latencies[len(latencies) // 2]:.0f} мкс, "
+          f"p99 {latencies[int(len(latencies) * 0.99)]:.0f} мкс")
+    menu.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("MOTION_CORE", "process")  # GPIO здесь не нужен
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import axes
+import menu
+import menu_telemetry
+import stats
+from framebuffer import to_rgb565
+from menu_render import HitGrid, MenuRenderer, draw_centered_text
+from menu_telemetry import TelemetryPage
+from settings_store import SettingsStore
+
+# Сравнение прежнего рисования (эллипс на каждый пиксель радиуса при каждом
+# построении экрана) со спрайтами/слоями MenuRenderer и поиска касания
+# перебором кругов с HitGrid. Холодное построение — и без слоёв на диске
+# (первый запуск), и со слоями из MENU_CACHE_DIR (каждый следующий). Кадр
+# страницы телеметрии: целиком через PIL (create_*_image + update_screen)
+# против перерисовки изменившихся виджетов.
+
+FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+FONTS = {
+    "large": ImageFont.truetype(FONT_PATH, 50),
+    "medium": ImageFont.truetype(FONT_PATH, 30),
+    "small": ImageFont.truetype(FONT_PATH, 24),
+}
+SIZE = (menu.WIDTH, menu.HEIGHT)
+
+# ===== ПРЕЖНИЙ СПОСОБ =====
+def legacy_button(draw, x, y, radius):
+    for i in range(radius):
+        factor = i / radius
+        shade = 150 + int(80 * factor)
+        draw.ellipse([x - radius + i, y - radius + i, x + radius - i, y + radius - i],
+                     fill=(shade, shade, shade))
+    draw.ellipse([x - radius - 5, y - radius - 5, x + radius + 5, y + radius + 5],
+                 outline=menu.BUTTON_OUTLINE_COLOR, width=3)
+
+def legacy_screen(buttons, texts=()):
+    image = Image.new("RGB", SIZE, menu.BACKGROUND_COLOR)
+    draw = ImageDraw.Draw(image)
+    for b in buttons:
+        legacy_button(draw, b.x, b.y, b.radius)
+        draw_centered_text(draw, b.x, b.y + b.label_dy, b.label, FONTS[b.font], menu.TEXT_COLOR)
+    for x, y, text, font in texts:
+        draw_centered_text(draw, x, y, text, FONTS[font], menu.TEXT_COLOR)
+    return image
+
+def legacy_hit(buttons, x, y):
+    for b in buttons:
+        if math.sqrt((x - b.x) ** 2 + (y - b.y) ** 2) < b.radius + menu.TOUCH_TOLERANCE:
+            return b
+    return None
+
+# ===== НОВЫЙ СПОСОБ =====
+def new_screen(renderer, name, buttons, texts=()):
+    image = renderer.compose(name, buttons)
+    draw = ImageDraw.Draw(image)
+    for x, y, text, font in texts:
+        draw_centered_text(draw, x, y, text, FONTS[font], menu.TEXT_COLOR)
+    return image
+
+def make_renderer(cache_dir: str = ""):
+    return MenuRenderer(SIZE, menu.BACKGROUND_COLOR, menu.TEXT_COLOR, menu.BUTTON_OUTLINE_COLOR, FONTS,
+                        cache_dir)
+
+def cold_build(texts, cache_dir: str = ""):
+    # с пустым кэшем в памяти: слои рисуются заново или читаются с диска
+    renderer = make_renderer(cache_dir)
+    new_screen(renderer, "main", menu.MAIN_MENU_BUTTONS)
+    new_screen(renderer, "param", menu.PARAM_MENU_BUTTONS, texts)
+
+# ===== ТЕЛЕМЕТРИЯ =====
+class Motion:
+    # две оси едут, остальные стоят; кадр пульта с живым каналом 6
+    def __init__(self):
+        self.n = 0
+        self.positions = [0] * axes.COUNT
+        self.targets = [0] * axes.COUNT
+        self.channels = [1500] * 14
+        self.channels[6] = 1900
+
+    def advance(self):
+        self.n += 1
+        self.positions[0] = int(10000 * math.sin(self.n / 20))
+        self.targets[0] = int(12000 * math.sin(self.n / 20 + 0.3))
+        self.positions[1] = int(8000 * abs(math.sin(self.n / 31)))
+
+def full_telemetry_frame(renderer, motion, screen):
+    # как прежние страницы: весь экран через PIL и целиком в RGB565
+    image = renderer.compose("telemetry_full", menu.TELEMETRY_BUTTONS)
+    draw = ImageDraw.Draw(image)
+    for i, top in enumerate(range(70, 70 + 57 * axes.COUNT, 57)):
+        draw_centered_text(draw, 100, top, axes.TABLE[i]["label"], FONTS["small"], menu.TEXT_COLOR)
+        draw.rectangle([200, top, 779, top + 29], outline=(255, 255, 255))
+        x = 490 + motion.positions[i] * 280 // 15000
+        draw.rectangle([min(490, x), top + 5, max(490, x), top + 24], fill=menu_telemetry.POSITION_COLOR)
+    for n in range(3):
+        draw.text((220, 320 + n * 45), f"строка {n}: {motion.n}", font=FONTS["small"], fill=menu.TEXT_COLOR)
+    screen[:] = to_rgb565(image)
+
+def telemetry(repeat: int):
+    renderer = make_renderer()
+    motion = Motion()
+    screen = np.zeros((menu.HEIGHT, menu.WIDTH), dtype=np.uint16)
+    store = SettingsStore(os.devnull, [axis["settings"] for axis in axes.TABLE])
+    stats.register("rc", lambda: {"protocol": "ibus", "frames_ok": motion.n})
+    page = TelemetryPage(renderer, menu.TELEMETRY_BUTTONS, FONTS["small"], lambda: motion.positions,
+                         lambda: motion.targets, lambda: motion.channels, lambda: 0, store)
+
+    def present(frame, rects):
+        if rects is None:
+            screen[:] = frame
+        else:
+            for x0, y0, x1, y1 in rects:
+                screen[y0:y1, x0:x1] = frame[y0:y1, x0:x1]
+
+    def partial(texts: bool):
+        motion.advance()
+        if texts:
+            page._text_due = 0.0
+            motion.channels[6] = 1900 + motion.n % 50  # строка связи меняется
+        rects = page.render(time.monotonic())
+        present(page.frame, rects)
+
+    page.show(present)
+    full_ms = timed(lambda: (motion.advance(), full_telemetry_frame(renderer, motion, screen)), repeat)
+    bars_ms = timed(lambda: partial(False), repeat * 10)
+    texts_ms = timed(lambda: partial(True), repeat * 10)
+    # строки проверяются раз в TEXT_REFRESH, полосы — каждый кадр
+    fps = menu_telemetry.TELEMETRY_FPS
+    share = 1 / (fps * menu_telemetry.TEXT_REFRESH)
+    mean_ms = bars_ms + (texts_ms - bars_ms) * share
+    print(f"кадр страницы телеметрии (осей: {axes.COUNT}, две едут):")
+    print(f"  целиком PIL + RGB565  {full_ms:8.2f} мс")
+    print(f"  виджеты: полосы       {bars_ms:8.2f} мс")
+    print(f"  виджеты: полосы+текст {texts_ms:8.2f} мс")
+    print(f"  CPU при {fps:.0f} к/с: {full_ms * fps / 10:.1f}% против {mean_ms * fps / 10:.1f}%")
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    texts = [(menu.WIDTH // 2, 30, "Руль - Скорость", "large"),
+             (menu.WIDTH // 2, 130, "Текущее значение: 10000", "medium")]
+
+    print("построение меню (главный экран + страница параметра):")
+    legacy_ms = timed(lambda: (legacy_screen(menu.MAIN_MENU_BUTTONS),
+                               legacy_screen(menu.PARAM_MENU_BUTTONS, texts)), repeat)
+    cold_ms = timed(lambda: cold_build(texts), repeat)
+    cache_dir = tempfile.mkdtemp(prefix="menu_cache")
+    try:
+        cold_build(texts, cache_dir)
+        cached_ms = timed(lambda: cold_build(texts, cache_dir), repeat)
+    finally:
+        shutil.rmtree(cache_dir)
+    print(f"  прежний способ       {legacy_ms:8.2f} мс")
+    print(f"  MenuRenderer, холодный {cold_ms:6.2f} мс")
+    print(f"  холодный, слои с диска {cached_ms:6.2f} мс")
+
+    renderer = make_renderer()
+    new_screen(renderer, "param", menu.PARAM_MENU_BUTTONS, texts)
+    print("перерисовка страницы параметра на нажатие +/-:")
+    print(f"  прежний способ       {timed(lambda: legacy_screen(menu.PARAM_MENU_BUTTONS, texts), repeat):8.2f} мс")
+    print(f"  MenuRenderer         {timed(lambda: new_screen(renderer, 'param', menu.PARAM_MENU_BUTTONS, texts), repeat):8.2f} мс")
+
+    rnd = random.Random(3)
+    points = [(rnd.randrange(menu.WIDTH), rnd.randrange(menu.HEIGHT)) for _ in range(100000)]
+    grid = HitGrid(menu.PARAM_MENU_BUTTONS, menu.WIDTH, menu.HEIGHT, menu.TOUCH_TOLERANCE)
+    assert all(legacy_hit(menu.PARAM_MENU_BUTTONS, x, y) is grid.lookup(x, y) for x, y in points[:5000])
+    start = time.perf_counter()
+    for x, y in points:
+        legacy_hit(menu.PARAM_MENU_BUTTONS, x, y)
+    linear_us = (time.perf_counter() - start) / len(points) * 1e6
+    start = time.perf_counter()
+    for x, y in points:
+        grid.lookup(x, y)
+    grid_us = (time.perf_counter() - start) / len(points) * 1e6
+    print("поиск кнопки по касанию:")
+    print(f"  перебор кругов       {linear_us:8.2f} мкс")
+    print(f"  HitGrid              {grid_us:8.2f} мкс")
+
+    telemetry(repeat)
+
+if __name__ == "__main__":
+    main()
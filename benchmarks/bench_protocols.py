@@ -0,0 +1,153 @@
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import crsf
+import sbus
+from rc_protocols import PROTOCOLS
+
+# Разбор iBus, SBUS и CRSF: сначала проверка на синтетических потоках
+# (туда-обратно, мусор между кадрами, испорченные байты, служебные кадры;
+# ложных кадров из мусора между кадрами быть не должно ни у одного протокола),
+# затем скорость разбора порциями разного размера против наибольшей частоты
+# кадров протокола и скорости линии.
+
+CHUNKS = (16, 64, 256)  # FIFO UART, несколько кадров, полный буфер чтения
+TOLERANCE_US = 1        # 11-битные каналы SBUS/CRSF — шаг 0,625 мкс
+
+def random_channels(rnd):
+    return [rnd.randint(988, 2012) for _ in range(14)]
+
+def chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def same(decoded, sent) -> bool:
+    return decoded is not None and all(abs(a - b) <= TOLERANCE_US for a, b in zip(decoded, sent))
+
+def stream(protocol, frames: int, noise: float = 0.0, seed: int = 1, corrupt: bool = True):
+    # (байты, каналы неиспорченных кадров по порядку); corrupt=False — только
+    # мусор между кадрами, сами кадры целые
+    rnd = random.Random(seed)
+    out = bytearray()
+    expected = []
+    for _ in range(frames):
+        if noise and rnd.random() < noise:
+            out += bytes(rnd.getrandbits(8) for _ in range(rnd.randint(1, 40)))
+        channels = random_channels(rnd)
+        frame = bytearray(protocol.build_frame(channels))
+        if corrupt and noise and rnd.random() < noise / 2:
+            frame[rnd.randint(2, len(frame) - 2)] ^= 0xFF
+        else:
+            expected.append(channels)
+        out += frame
+        if protocol.name == "crsf" and rnd.random() < 0.1:
+            out += crsf.build_link_statistics(lq=rnd.randint(0, 100))
+    return bytes(out), expected
+
+def validate(protocol, frames: int):
+    result = {}
+    data, expected = stream(protocol, frames)
+    decoded = protocol.parser().feed(data)
+    result["clean_ok"] = len(decoded) == len(expected) and all(map(same, decoded, expected))
+
+    # порциями по байту — кадр собирается из кусков
+    parser = protocol.parser()
+    decoded = [frame for byte in chunks(data, 1) for frame in parser.feed(byte)]
+    result["bytewise_ok"] = len(decoded) == len(expected) and all(map(same, decoded, expected))
+
+    # мусор и испорченные кадры: сколько целых найдено, сколько ложных
+    data, expected = stream(protocol, frames, noise=0.2, seed=2)
+    parser = protocol.parser()
+    found, false = match(protocol, parser, data, expected)
+    result["noisy_found"] = f"{found}/{len(expected)}"
+    # у SBUS нет контрольной суммы: испорченные внутри кадра каналы проходят
+    result["noisy_extra_frames"] = false
+    result["frames_bad"] = parser.frames_bad
+
+    # только мусор между целыми кадрами: ложных кадров нет
+    data, expected = stream(protocol, frames, noise=0.2, seed=3, corrupt=False)
+    found, false = match(protocol, protocol.parser(), data, expected)
+    result["garbage_found"] = f"{found}/{len(expected)}"
+    result["garbage_extra_frames"] = false
+
+    if protocol.name == "sbus":
+        # одиночное окно 0x0F .. 0x00 — не кадр; флаги приёмника — нет связи
+        lone = sbus.build_frame([1500] * 14)
+        result["lone_frame_ignored"] = sbus.SBusParser().feed(lone) == []
+        frame = sbus.build_frame([1500] * 14)
+        result["failsafe_ok"] = all(
+            sbus.SBusParser().feed(frame + sbus.build_frame([1500] * 14, flags=flag)) == [sbus.unpack_channels(frame, 1), None]
+            for flag in (sbus.FLAG_FAILSAFE, sbus.FLAG_FRAME_LOST))
+    if protocol.name == "crsf":
+        # контрольное значение CRC-8/DVB-S2 для "123456789"
+        result["crc_check_ok"] = crsf.crc8(b"123456789") == 0xBC
+        parser = crsf.CrsfParser()
+        parser.feed(crsf.build_link_statistics(rssi1=60, lq=87, snr=-5))
+        result["link_statistics_ok"] = parser.link == (60, 50, 87, -5)
+    return result
+
+def match(protocol, parser, data: bytes, expected):
+    # (найдено целых кадров по порядку, ложных)
+    decoded = [frame for part in chunks(data, 64) for frame in parser.feed(part)]
+    found = false = 0
+    k = 0
+    for frame in decoded:
+        while k < len(expected) and not same(frame, expected[k]):
+            k += 1
+        if k < len(expected):
+            found += 1
+            k += 1
+        else:
+            false += 1
+            k = 0
+    return found, false
+
+def throughput(protocol, frames: int):
+    data, _ = stream(protocol, frames)
+    # байт в секунду на линии: старт, 8 бит, чётность, стоп-биты
+    bits = 1 + 8 + (1 if protocol.parity != "N" else 0) + protocol.stopbits
+    line_bytes_s = protocol.baudrate / bits
+    result = {"max_frame_rate": protocol.frame_rate, "line_bytes_per_s": round(line_bytes_s)}
+    for size in CHUNKS:
+        parts = chunks(data, size)
+        parser = protocol.parser()
+        start = time.perf_counter()
+        count = 0
+        for part in parts:
+            count += len(parser.feed(part))
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed
+        result[f"chunk_{size}"] = {"frames_per_s": round(rate), "us_per_frame": round(1e6 / rate, 2),
+                                   "headroom": round(rate / protocol.frame_rate, 1),
+                                   "bytes_per_s": round(len(data) / elapsed)}
+    return result
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    output = sys.argv[2] if len(sys.argv) > 2 else None
+    results = {}
+    for name, protocol in PROTOCOLS.items():
+        checks = validate(protocol, min(frames, 2000))
+        speed = throughput(protocol, frames)
+        results[name] = {"validation": checks, "throughput": speed}
+        print(f"{name}: " + ", ".join(f"{k} {v}" for k, v in checks.items()))
+        for size in CHUNKS:
+            r = speed[f"chunk_{size}"]
+            print(f"  порции {size:>3} байт: {r['frames_per_s']:>8} кадров/с ({r['us_per_frame']} мкс), "
+                  f"запас x{r['headroom']} к {protocol.frame_rate} Гц, "
+                  f"{r['bytes_per_s']} Б/с при линии {speed['line_bytes_per_s']} Б/с")
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+    for name, r in results.items():
+        checks = r["validation"]
+        assert checks["clean_ok"] and checks["bytewise_ok"], (name, checks)
+        assert checks["garbage_extra_frames"] == 0, (name, checks)
+        assert checks.get("failsafe_ok", True) and checks.get("lone_frame_ignored", True), (name, checks)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["STEP_BACKEND"] = "sim"
+os.environ["TRACE_FILE"] = ""
+
+import motor_control as motor
+import stats
+import step_loop
+from sim.ibus_gen import FRAME_PERIOD
+
+# Ожидание дедлайна в цикле шагов: прежний сон с постоянным запасом
+# (STEP_WAIT=fixed) против сна до дедлайна с подстраиваемым запасом и
+# пробуждением по новой уставке (adaptive). Уставки публикует поток с
+# частотой кадров пульта, как приёмник.
+#   idle   — цели не меняются, моторы стоят: CPU цикла и проходов в секунду
+#   moving — руль и газ ходят синусом: CPU, опоздание шагов и доля
+#            опоздавших больше чем на MISS_US
+
+MISS_US = 128  # граница корзины гистограммы опозданий
+
+def thread_cpu(thread) -> float:
+    return time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+
+def publisher(mailbox, seconds: float, moving: bool):
+    start = time.monotonic()
+    n = 0
+    targets = [0] * motor.AXIS_COUNT
+    while True:
+        t = n * FRAME_PERIOD
+        if t > seconds:
+            return
+        if moving:
+            targets[0] = int(3000 * math.sin(2 * math.pi * 0.5 * t))
+            targets[1] = int(2000 + 2000 * math.sin(2 * math.pi * 0.3 * t))
+        mailbox.publish(targets)
+        n += 1
+        delay = start + n * FRAME_PERIOD - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+def reset_motion():
+    motor.update_motor_settings(motor.MOTOR_SETTINGS)
+    for i in range(motor.AXIS_COUNT):
+        motor.target_positions[i] = 0
+        motor.set_position(i, 0)
+    stats.reset()
+
+def run(mode: str, scenario: str, seconds: float):
+    step_loop.STEP_WAIT = mode
+    reset_motion()
+    mailbox = step_loop.SetpointMailbox(motor.target_positions)
+    loop = step_loop.start_step_loop(motor, mailbox)
+    time.sleep(0.1)
+    stats.reset()
+    cpu_start = thread_cpu(loop)
+    wall_start = time.perf_counter()
+    publisher(mailbox, seconds, scenario == "moving")
+    wall = time.perf_counter() - wall_start
+    cpu = thread_cpu(loop) - cpu_start
+    passes = stats.STEP_LOOP_PERIOD.snapshot()["count"]
+    waiter = loop.waiter.snapshot()
+    loop.stop()
+    loop.join()
+
+    steps = missed = 0
+    worst = 0
+    miss_bucket = MISS_US.bit_length()
+    for h in stats.STEP_LATENESS:
+        snap = h.snapshot()
+        steps += snap["count"]
+        missed += sum(snap["buckets"][miss_bucket:])
+        worst = max(worst, snap["max_us"])
+    lateness = [h.snapshot() for h in stats.STEP_LATENESS[:2]]
+    return {"cpu_percent": cpu / wall * 100, "passes_per_s": passes / wall, "steps": steps,
+            "miss_rate": missed / steps if steps else 0.0, "max_late_us": worst,
+            "p99_late_us": [s["p99_us"] for s in lateness], "waiter": waiter}
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    output = sys.argv[2] if len(sys.argv) > 2 else None
+    motor.init_backend("sim")
+    results = {}
+    for scenario in ("idle", "moving"):
+        for mode in ("fixed", "adaptive"):
+            r = results[f"{scenario}_{mode}"] = run(mode, scenario, seconds)
+            line = (f"{scenario:<6} {mode:<8} CPU {r['cpu_percent']:5.1f}%, "
+                    f"проходов {r['passes_per_s']:8.0f}/с")
+            if r["steps"]:
+                line += (f", шагов {r['steps']}, опоздали >{MISS_US} мкс {r['miss_rate'] * 100:.2f}%, "
+                         f"p99 {r['p99_late_us']} мкс, макс {r['max_late_us']} мкс")
+            if mode == "adaptive":
+                line += f", запас {r['waiter']['spin_us']:.0f} мкс"
+            print(line)
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
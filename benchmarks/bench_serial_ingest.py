@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["STEP_BACKEND"] = "sim"
+
+import data_receiver
+import ibus
+import motor_control as motor
+import stats
+import step_loop
+from sim.ibus_gen import FRAME_PERIOD
+from sim.uart import PtyUart
+
+# Приём UART на PTY: прежний цикл read(in_waiting or 1) против poll() с VMIN.
+# Кадр пишется кусками по CHUNK байт с паузой на их передачу по линии
+# (115200 бод — 87 мкс на байт), как их отдаёт FIFO настоящего UART.
+# Задержка — от записи последнего куска кадра до publish() в ящик; номер
+# кадра — в канале 0. Затем кадры перестают идти: через сколько приёмник
+# сам переходит в безопасный режим.
+
+CHUNK = 16
+BYTE_NS = 87_000
+
+class RecordingMailbox(step_loop.SetpointMailbox):
+    __slots__ = ("published", "lost_at")
+
+    def __init__(self, targets=()):
+        super().__init__(targets)
+        self.published = {}
+        self.lost_at = None
+
+    def publish(self, targets, channels=None):
+        now = time.monotonic_ns()
+        super().publish(targets, channels)
+        if channels is None:
+            self.lost_at = now  # таймер связи
+        else:
+            self.published.setdefault(channels[0], now)
+
+def thread_cpu(thread) -> float:
+    return time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": values[-1],
+            "mean": sum(values) / len(values)}
+
+def send_frames(uart: PtyUart, count: int):
+    # кадр n: канал 0 = 1000 + n; время — конец последнего куска
+    sent = {}
+    deadline = time.monotonic_ns()
+    for n in range(count):
+        channels = [1500] * ibus.CHANNELS
+        channels[0] = 1000 + n
+        frame = ibus.build_frame(channels)
+        for pos in range(0, len(frame), CHUNK):
+            chunk = frame[pos:pos + CHUNK]
+            wire = deadline + len(chunk) * BYTE_NS
+            while time.monotonic_ns() < wire:
+                pass
+            deadline = uart.write(chunk)
+        sent[1000 + n] = deadline
+        deadline += int(FRAME_PERIOD * 1e9) - len(frame) * BYTE_NS
+        delay = deadline - time.monotonic_ns()
+        if delay > 0:
+            time.sleep(delay / 1e9)
+        deadline = max(deadline, time.monotonic_ns())
+    return sent
+
+def run(mode: str, frames: int):
+    data_receiver.SERIAL_INGEST = mode
+    uart = PtyUart()
+    data_receiver.UART_PORT = uart.port
+    mailbox = RecordingMailbox(motor.target_positions)
+    thread = threading.Thread(target=data_receiver.receive_data, args=(motor, mailbox),
+                              name=f"receiver-{mode}", daemon=True)
+    thread.start()
+    time.sleep(0.2)  # pyserial сбрасывает вход при открытии
+    reads_start = stats.RECEIVER_ITERATION.snapshot()["count"]
+    cpu_start = thread_cpu(thread)
+    wall_start = time.perf_counter()
+    sent = send_frames(uart, frames)
+    time.sleep(0.02)
+    wall = time.perf_counter() - wall_start
+    cpu = thread_cpu(thread) - cpu_start
+    reads = stats.RECEIVER_ITERATION.snapshot()["count"] - reads_start
+
+    latencies = [(mailbox.published[n] - t) / 1000 for n, t in sent.items() if n in mailbox.published]
+    stop_ns = max(sent.values())
+    time.sleep(data_receiver.LINK_TIMEOUT * 3)
+    lost = (mailbox.lost_at - stop_ns) / 1e6 if mailbox.lost_at else None
+    # PTY не закрываем: прежний цикл на закрытом порту падает с SerialException
+    uart.stop()
+    return {"frames": frames, "received": len(latencies), "latency_us": percentiles(latencies),
+            "reads_per_frame": reads / frames, "cpu_percent": cpu / wall * 100,
+            "link_loss_ms": lost}
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    output = sys.argv[2] if len(sys.argv) > 2 else None
+    motor.init_backend("sim")
+    results = {}
+    for mode in ("read", "event"):
+        r = results[mode] = run(mode, frames)
+        lat = r["latency_us"]
+        print(f"{mode:<6} задержка p50 {lat['p50']:7.1f} p99 {lat['p99']:7.1f} max {lat['max']:7.1f} мкс, "
+              f"чтений на кадр {r['reads_per_frame']:.2f}, CPU {r['cpu_percent']:.2f}%, "
+              f"кадров {r['received']}/{r['frames']}, потеря связи "
+              + (f"{r['link_loss_ms']:.0f} мс" if r["link_loss_ms"] is not None else "не замечена"))
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["STEP_BACKEND"] = "sim"
+
+import ibus
+import motor_control as motor
+import step_loop
+from channel_map import ChannelMap
+from setpoint_filter import SetpointFilter
+from sim.ibus_gen import IBusGenerator, FRAME_PERIOD
+
+# Уставки с пульта с дрожью ±NOISE мкс: сколько разворотов и пути уставки
+# снимает фильтр, чего он стоит на кадр и на сколько отстаёт. Затем те же
+# уставки в реальном времени через цикл шагов (SimBackend): шаги и смены
+# DIR моторов без фильтра и с ним. Отставание — и по рывку ручки без дрожи:
+# через сколько мс сдвинулась уставка и через сколько дошла до сырой.
+
+NOISE = 3
+AXES = (0, 1, 2)
+JUMP = 100  # мкс, рывок ручки для отставания
+
+def still_channels(t):
+    channels = [1500] * ibus.CHANNELS
+    channels[0], channels[1], channels[2] = 1600, 1700, 1000
+    return channels
+
+def scenario_frames(name: str, seconds: float):
+    generator = IBusGenerator(noise=NOISE)
+    count = int(seconds / FRAME_PERIOD)
+    if name == "still":
+        # ручки неподвижны, дрожь та же, что у генератора
+        frames = []
+        for n in range(count):
+            channels = still_channels(n * FRAME_PERIOD)
+            for ch in AXES:
+                channels[ch] += generator._random.randint(-NOISE, NOISE)
+            frames.append(channels)
+        return frames
+    return [generator.channels(n * FRAME_PERIOD) for n in range(count)]
+
+def setpoints(frames, filtered: bool):
+    mapping = ChannelMap()
+    mapping.compile(motor.MOTOR_SETTINGS)
+    setpoint_filter = SetpointFilter()
+    targets = [0] * motor.AXIS_COUNT
+    out = []
+    start = time.perf_counter_ns()
+    for channels in frames:
+        mapping.apply(channels, targets)
+        if filtered:
+            setpoint_filter.apply(targets)
+        out.append(tuple(targets))
+    per_frame_us = (time.perf_counter_ns() - start) / len(frames) / 1000
+    return out, per_frame_us, setpoint_filter
+
+def path_stats(series, axis: int):
+    travel = reversals = last_dir = 0
+    for a, b in zip(series, series[1:]):
+        delta = b[axis] - a[axis]
+        if delta:
+            travel += abs(delta)
+            direction = 1 if delta > 0 else -1
+            if direction == -last_dir:
+                reversals += 1
+            last_dir = direction
+    return travel, reversals
+
+def drive(series):
+    # уставки раз в кадр через ящик в цикл шагов, как в reed.py
+    backend = motor.init_backend("sim")
+    motor.update_motor_settings(motor.MOTOR_SETTINGS)
+    for i in range(motor.AXIS_COUNT):
+        motor.plans[i] = None
+        motor.set_position(i, 0)
+        motor.target_positions[i] = 0
+    backend.edges.clear()
+    mailbox = step_loop.SetpointMailbox(motor.target_positions)
+    loop = step_loop.start_step_loop(motor, mailbox)
+    start = time.monotonic()
+    for n, targets in enumerate(series):
+        mailbox.publish(targets)
+        delay = start + (n + 1) * FRAME_PERIOD - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+    # последние уставки моторы дорабатывают
+    deadline = time.monotonic() + 5.0
+    while any(plan is not None for plan in motor.plans) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    loop.stop()
+    loop.join()
+    steps = [len(backend.step_times(motor.STEP_PINS[i])) for i in AXES]
+    dir_changes = [sum(1 for _, pin, _ in backend.edges if pin == motor.DIR_PINS[i]) for i in AXES]
+    return steps, dir_changes
+
+def step_response():
+    # рывок на JUMP мкс после секунды покоя
+    before = int(1.0 / FRAME_PERIOD)
+    frames = []
+    for n in range(before + int(2.0 / FRAME_PERIOD)):
+        channels = still_channels(0)
+        if n >= before:
+            for ch in AXES:
+                channels[ch] += JUMP
+        frames.append(channels)
+    raw, _, _ = setpoints(frames, False)
+    filtered, _, _ = setpoints(frames, True)
+    result = {}
+    for axis in AXES:
+        moved = next((n for n in range(before, len(frames))
+                      if filtered[n][axis] != filtered[before - 1][axis]), None)
+        reached = next((n for n in range(before, len(frames))
+                        if filtered[n][axis] == raw[n][axis]), None)
+        result[axis] = {"first_move_ms": None if moved is None else round((moved - before) * FRAME_PERIOD * 1000, 1),
+                        "reached_ms": None if reached is None else round((reached - before) * FRAME_PERIOD * 1000, 1)}
+    return result
+
+def run(name: str, seconds: float, drive_seconds: float):
+    frames = scenario_frames(name, seconds)
+    raw, raw_us, _ = setpoints(frames, False)
+    filtered, filter_us, setpoint_filter = setpoints(frames, True)
+    result = {"frames": len(frames), "filter_us_per_frame": round(filter_us - raw_us, 3), "axes": {}}
+    for axis in AXES:
+        raw_travel, raw_rev = path_stats(raw, axis)
+        travel, rev = path_stats(filtered, axis)
+        lag = max(abs(a[axis] - b[axis]) for a, b in zip(raw, filtered))
+        result["axes"][axis] = {"raw_path": raw_travel, "path": travel,
+                                "raw_reversals": raw_rev, "reversals": rev, "max_deviation": lag}
+    result["filter_snapshot"] = setpoint_filter.snapshot()
+    if drive_seconds:
+        count = int(drive_seconds / FRAME_PERIOD)
+        raw_steps, raw_dirs = drive(raw[:count])
+        steps, dirs = drive(filtered[:count])
+        result["motors"] = {"raw_steps": raw_steps, "steps": steps,
+                            "raw_dir_changes": raw_dirs, "dir_changes": dirs}
+    return result
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    drive_seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    output = sys.argv[3] if len(sys.argv) > 3 else None
+    results = {}
+    for name in ("still", "moving"):
+        results[name] = run(name, seconds, drive_seconds)
+        r = results[name]
+        print(f"{name}: фильтр {r['filter_us_per_frame']:.2f} мкс/кадр")
+        for axis, a in r["axes"].items():
+            print(f"  ось {axis}: путь {a['raw_path']:>8} -> {a['path']:>8}, "
+                  f"развороты {a['raw_reversals']:>5} -> {a['reversals']:>5}, "
+                  f"макс. отклонение {a['max_deviation']}")
+        if "motors" in r:
+            m = r["motors"]
+            print(f"  моторы: шаги {m['raw_steps']} -> {m['steps']}, DIR {m['raw_dir_changes']} -> {m['dir_changes']}")
+    results["step_response"] = step_response()
+    print(f"рывок ручки на {JUMP} мкс:")
+    for axis, a in results["step_response"].items():
+        print(f"  ось {axis}: уставка сдвинулась через {a['first_move_ms']} мс, "
+              f"дошла до сырой через {a['reached_ms']} мс")
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["STEP_BACKEND"] = "sim"
+
+import motor_control as motor
+from step_backends import SimBackend
+
+# Батчевый бэкенд (волны pigpio) в симуляции: импульсы сегмента уходят в
+# очередь раньше, чем звучат. Разворот с места и смена цели на ходу не
+# должны выставлять DIR, пока в очереди ещё импульсы прежнего хода: каждый
+# такой импульс — шаг не в ту сторону и тихий уход позиции. Считаем
+# импульсы прежнего хода после нового фронта DIR и расхождение позиции,
+# восстановленной по фронтам, с motor_control.positions.
+
+AXIS = 0
+TRAVEL = 3000
+REVERSALS = 8
+
+def wait_until(predicate, timeout: float = 10.0):
+    end = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < end:
+        motor.step_all()
+        due = motor.next_due_ns()
+        gap = due - time.monotonic_ns() if due is not None else 1_000_000
+        if gap > 0:
+            time.sleep(min(gap, 1_000_000) / 1e9)
+
+def replayed_position(backend, i: int) -> int:
+    # позиция по фронтам: шаг — в сторону, куда смотрел DIR в его момент
+    forward = motor._dir_level(i, 1)
+    position = direction = 0
+    for _, pin, level in sorted(backend.edges, key=lambda e: e[0]):
+        if pin == motor.DIR_PINS[i]:
+            direction = 1 if level == forward else -1
+        elif pin == motor.STEP_PINS[i]:
+            position += direction
+    return position
+
+def run(mode: str):
+    # standstill — новая цель, когда прежний ход уже целиком в очереди;
+    # moving — на полпути
+    backend = SimBackend(motor.STEP_PULSE_US, batched=True)
+    backend.setup_outputs(motor.DIR_PINS + motor.STEP_PINS)
+    motor.backend = backend
+    motor.update_motor_settings(motor.MOTOR_SETTINGS)
+    for i in range(motor.AXIS_COUNT):
+        motor.set_position(i, 0)
+        motor.target_positions[i] = 0
+    motor.directions[AXIS] = 0
+    motor.segment_end_ns = 0
+
+    late = 0
+    goal = TRAVEL
+    for n in range(REVERSALS):
+        motor.target_positions[AXIS] = goal
+        if mode == "standstill":
+            wait_until(lambda: motor.plans[AXIS] is None and motor.planned_targets[AXIS] == goal)
+        else:
+            wait_until(lambda: abs(motor.positions[AXIS]) * 2 >= TRAVEL and motor.plans[AXIS] is not None)
+        queued = len(backend.edges)
+        old_steps = [t for t, pin, _ in backend.edges if pin == motor.STEP_PINS[AXIS]]
+        goal = -goal
+        motor.target_positions[AXIS] = goal
+        wait_until(lambda: any(pin == motor.DIR_PINS[AXIS] for _, pin, _ in backend.edges[queued:]))
+        flips = [t for t, pin, _ in backend.edges[queued:] if pin == motor.DIR_PINS[AXIS]]
+        if flips:
+            late += sum(1 for t in old_steps if t > flips[0])
+    wait_until(lambda: motor.plans[AXIS] is None and motor.planned_targets[AXIS] == goal)
+    wait_until(lambda: time.monotonic_ns() > motor.segment_end_ns, 1.0)
+    drift = replayed_position(backend, AXIS) - motor.positions[AXIS]
+    return {"reversals": REVERSALS, "old_steps_after_dir": late, "position_drift": drift}
+
+def main():
+    output = sys.argv[1] if len(sys.argv) > 1 else None
+    results = {mode: run(mode) for mode in ("standstill", "moving")}
+    for mode, r in results.items():
+        print(f"{mode}: разворотов {r['reversals']}, импульсов прежнего хода после DIR "
+              f"{r['old_steps_after_dir']}, уход позиции {r['position_drift']}")
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+    for r in results.values():
+        assert r["old_steps_after_dir"] == 0 and r["position_drift"] == 0, r
+
+if __name__ == "__main__":
+    main()
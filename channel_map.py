@@ -0,0 +1,118 @@
+import json
+import os
+from array import array
+
+# ===== КАНАЛЫ ПУЛЬТА -> ЦЕЛИ МОТОРОВ =====
+# Разметка каналов описывается данными (channel_map.json или CHANNEL_MAP),
+# а не кодом: для каждой оси — канал, диапазон импульса, режим, кривая,
+# мёртвая зона. По ней и настройкам моторов строятся целочисленные таблицы
+# на все 12-битные значения канала, так что кадр разбирается индексами.
+#
+# Режимы:
+#   bipolar  — от центра диапазона в обе стороны: -scale..+scale (руль)
+#   unipolar — от нижней границы диапазона: 0..scale (газ, тормоз)
+#   bands    — ступени: [[верхняя граница (не включая), значение], ...,
+#              [null, значение]] (АКПП R/N/D)
+# scale и значения ступеней — число или ключ настроек оси ("-ключ" — со знаком
+# минус). expo — доля кубической составляющей (0 — линейно).
+
+CHANNEL_MAP_FILE = "channel_map.json"
+
+PULSE_MIN = 1000
+PULSE_MAX = 2000
+TABLE_SIZE = 4096  # значения канала iBus — 12 бит
+
+# канал наличия связи: ниже порога — пульт потерян
+SIGNAL_CHANNEL = 6
+SIGNAL_MIN = 800
+
+CHANNEL_MAP = [
+    {"axis": 0, "channel": 0, "mode": "bipolar", "range": [1000, 2000],
+     "scale": "distance", "deadband": 0, "expo": 0.0},
+    {"axis": 1, "channel": 1, "mode": "unipolar", "range": [1500, 2000],
+     "scale": "distance", "deadband": 0, "expo": 0.0},
+    {"axis": 2, "channel": 2, "mode": "unipolar", "range": [1000, 2000],
+     "scale": "distance", "deadband": 0, "expo": 0.0},
+    {"axis": 3, "channel": 5, "mode": "bands",
+     "bands": [[1200, "-distance_R"], [1801, 0], [None, "distance_D"]]},
+]
+
+def load_channel_map(path: str = CHANNEL_MAP_FILE):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return CHANNEL_MAP
+
+def _resolve(spec, cfg):
+    if isinstance(spec, str):
+        if spec.startswith("-"):
+            return -cfg[spec[1:]]
+        return cfg[spec]
+    return spec
+
+def _shape(offset, span, scale, deadband, expo):
+    # offset — смещение от нуля оси в мкс (со знаком), span — ход до края
+    mag = abs(offset) - deadband
+    if mag <= 0:
+        return 0
+    span -= deadband
+    if expo:
+        x = mag / span
+        out = ((1 - expo) * x + expo * x * x * x) * scale
+    else:
+        # тот же порядок действий, что в прежнем (c - 1500) * (max / 500)
+        out = mag * (scale / span)
+    return int(out) if offset > 0 else -int(out)
+
+def _band_value(bands, pulse, cfg):
+    for upper, value in bands:
+        if upper is None or pulse < upper:
+            return _resolve(value, cfg)
+    return 0
+
+def build_table(entry, cfg) -> array:
+    # за пределами диапазона — значения его краёв
+    mode = entry["mode"]
+    lo, hi = entry.get("range", (PULSE_MIN, PULSE_MAX))
+    deadband = entry.get("deadband", 0)
+    expo = entry.get("expo", 0.0)
+    if mode == "bipolar":
+        scale = _resolve(entry["scale"], cfg)
+        center = entry.get("center", (lo + hi) / 2)
+        values = [_shape(p - center, (hi - lo) / 2, scale, deadband, expo) for p in range(lo, hi + 1)]
+    elif mode == "unipolar":
+        scale = _resolve(entry["scale"], cfg)
+        values = [_shape(p - lo, hi - lo, scale, deadband, expo) for p in range(lo, hi + 1)]
+    elif mode == "bands":
+        values = [_band_value(entry["bands"], p, cfg) for p in range(lo, hi + 1)]
+    else:
+        raise ValueError(f"неизвестный режим канала: {mode}")
+    return (array('l', values[:1]) * lo + array('l', values)
+            + array('l', values[-1:]) * (TABLE_SIZE - hi - 1))
+
+class ChannelMap:
+    # tables — кортеж (ось, канал, таблица); перестраиваются только оси,
+    # чьи настройки изменились
+
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else load_channel_map()
+        self.tables = ()
+        self.source = None
+        self._built = {}
+
+    def compile(self, settings, source=None):
+        tables = []
+        for n, entry in enumerate(self.entries):
+            axis = entry["axis"]
+            cfg = dict(settings[axis])
+            cached = self._built.get(n)
+            if cached is None or cached[0] != cfg:
+                cached = (cfg, build_table(entry, cfg))
+                self._built[n] = cached
+            tables.append((axis, entry["channel"], cached[1]))
+        self.tables = tuple(tables)
+        self.source = source
+
+    def apply(self, channels, targets):
+        for axis, channel, table in self.tables:
+            targets[axis] = table[channels[channel] & 0xFFF]
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import axes
+from settings_store import check_value
+
+# ===== API УПРАВЛЕНИЯ =====
+# Настройка без сенсорного меню (reed.py --headless): запрос-ответ строками
+# JSON на UNIX-сокете, в том числе по SSH с ноутбука. Запрос — объект
+# {"cmd": ..., аргументы}, ответ — {"ok": true, ...} или
+# {"ok": false, "error": ...}; на одном соединении — сколько угодно
+# запросов. subscribe превращает соединение в поток состояний с частотой
+# hz, пока клиент его не закроет.
+#
+#   axes                       — таблица осей: имена, подписи, ключи настроек
+#   settings                   — снимок настроек и его версия
+#   set axis key value         — правка через SettingsStore (ось — номер или имя)
+#   state                      — позиции и цели осей
+#   calibrate / calibration    — запуск поиска нуля (-> номер команды) / его
+#                                ход; calibration с command — и выполнена ли
+#                                команда циклом шагов (command_done)
+#   rezero axis                — текущая позиция оси становится нулём
+#   subscribe [hz]             — поток state
+#
+# Клиент: python control_api.py settings | set steer speed 12000 | watch 10 ...
+
+CONTROL_SOCKET = os.environ.get("CONTROL_SOCKET", "/tmp/tihon-control.sock")
+MAX_REQUEST = 65536
+MAX_HZ = 100.0
+
+class RequestError(Exception):
+    pass
+
+def _axis_index(value) -> int:
+    if isinstance(value, str) and not value.lstrip("-").isdigit():
+        i = axes.index(value)
+        if i is None:
+            raise RequestError(f"нет оси {value}")
+        return i
+    i = int(value)
+    if not 0 <= i < axes.COUNT:
+        raise RequestError(f"нет оси {i}")
+    return i
+
+class ControlServer(threading.Thread):
+    # motion — SetpointMailbox или MotionCore: calibrate(), rezero(), targets();
+    # positions() и calibration_status() — у потока и ядра разные
+
+    def __init__(self, store, motion, positions, calibration_status, path: str = CONTROL_SOCKET):
+        super().__init__(name="control-server", daemon=True)
+        self.store = store
+        self.motion = motion
+        self.positions = positions
+        self.calibration_status = calibration_status
+        self.path = path
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(path)
+        # управляет моторами: только владельцу и группе
+        os.chmod(path, 0o660)
+        self.sock.listen(4)
+
+    def run(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), name="control-client",
+                             daemon=True).start()
+
+    def _serve(self, conn):
+        with conn, conn.makefile("rb") as lines:
+            try:
+                while True:
+                    line = lines.readline(MAX_REQUEST)
+                    if not line:
+                        return
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                        if request.get("cmd") == "subscribe":
+                            self._stream(conn, float(request.get("hz", 10)))
+                            return
+                        reply = self.handle(request)
+                    except (RequestError, ValueError, TypeError, KeyError, AttributeError, RuntimeError) as e:
+                        reply = {"ok": False, "error": str(e) or type(e).__name__}
+                    conn.sendall(json.dumps(reply, ensure_ascii=False).encode() + b"\n")
+            except OSError:
+                pass
+
+    def handle(self, request) -> dict:
+        cmd = request["cmd"]
+        if cmd == "axes":
+            return {"ok": True, "axes": [{"name": a["name"], "label": a["label"],
+                                          "keys": axes.setting_keys(a)} for a in axes.TABLE]}
+        if cmd == "settings":
+            snapshot = self.store.snapshot
+            return {"ok": True, "version": snapshot.version, "settings": snapshot.as_list()}
+        if cmd == "set":
+            i = _axis_index(request["axis"])
+            key = request["key"]
+            if key not in axes.setting_keys(axes.TABLE[i]) and key != "jerk":
+                raise RequestError(f"у оси {axes.TABLE[i]['name']} нет параметра {key}")
+            value = request["value"]
+            if isinstance(value, str) and value.lstrip("-").isdigit():
+                value = int(value)
+            # те же пределы, что у меню и у файла на диске (ValueError — в ответ)
+            check_value(i, key, value)
+            snapshot = self.store.update(i, key, value)
+            return {"ok": True, "version": snapshot.version, "settings": snapshot.as_list()}
+        if cmd == "state":
+            return dict(self.state(), ok=True)
+        if cmd == "calibrate":
+            return {"ok": True, "command": self.motion.calibrate()}
+        if cmd == "calibration":
+            reply = {"ok": True, "calibration": self.calibration_status()}
+            if "command" in request:
+                reply["command_done"] = self.motion.command_done(int(request["command"]))
+            return reply
+        if cmd == "rezero":
+            return {"ok": True, "command": self.motion.rezero(_axis_index(request["axis"]))}
+        raise RequestError(f"неизвестная команда {cmd}")
+
+    def state(self) -> dict:
+        return {"time": time.monotonic(), "positions": list(self.positions()),
+                "targets": list(self.motion.targets())}
+
+    def _stream(self, conn, hz: float):
+        period = 1.0 / min(max(hz, 0.1), MAX_HZ)
+        due = time.monotonic()
+        while True:
+            conn.sendall(json.dumps(self.state()).encode() + b"\n")
+            due += period
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                due = time.monotonic()
+
+    def close(self):
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+def serve(store, motion, positions, calibration_status, path: str = CONTROL_SOCKET):
+    # без прав на каталог — живём без API
+    try:
+        server = ControlServer(store, motion, positions, calibration_status, path)
+    except OSError:
+        return None
+    server.start()
+    return server
+
+# ===== КЛИЕНТ =====
+def request(cmd: str, path: str = CONTROL_SOCKET, timeout: float = 2.0, **args) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(dict(args, cmd=cmd)).encode() + b"\n")
+        with sock.makefile("rb") as lines:
+            return json.loads(lines.readline())
+
+def subscribe(hz: float = 10.0, path: str = CONTROL_SOCKET):
+    # генератор состояний; закрытие генератора закрывает соединение
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps({"cmd": "subscribe", "hz": hz}).encode() + b"\n")
+        with sock.makefile("rb") as lines:
+            for line in lines:
+                yield json.loads(line)
+
+def _print_settings(reply):
+    for axis, cfg in zip(axes.TABLE, reply["settings"]):
+        values = "  ".join(f"{k}={v}" for k, v in cfg.items())
+        print(f"{axis['name']:<10} {values}")
+    print(f"версия {reply['version']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="управление без сенсорного меню")
+    parser.add_argument("--socket", default=CONTROL_SOCKET)
+    parser.add_argument("--json", action="store_true", help="ответ как есть")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("axes")
+    sub.add_parser("settings")
+    p = sub.add_parser("set")
+    p.add_argument("axis", help="номер или имя оси")
+    p.add_argument("key")
+    p.add_argument("value", type=int)
+    sub.add_parser("state")
+    p = sub.add_parser("calibrate")
+    p.add_argument("--wait", action="store_true", help="ждать окончания и показать итог")
+    sub.add_parser("calibration")
+    p = sub.add_parser("rezero")
+    p.add_argument("axis")
+    p = sub.add_parser("watch")
+    p.add_argument("hz", type=float, nargs="?", default=10.0)
+    args = parser.parse_args()
+
+    if args.command == "watch":
+        try:
+            for state in subscribe(args.hz, args.socket):
+                if args.json:
+                    print(json.dumps(state), flush=True)
+                else:
+                    cells = "  ".join(f"{a['name']} {p:>7}/{t:<7}" for a, p, t in
+                                      zip(axes.TABLE, state["positions"], state["targets"]))
+                    print(f"{state['time']:10.2f}  {cells}", flush=True)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    extra = {}
+    if args.command == "set":
+        extra = {"axis": args.axis, "key": args.key, "value": args.value}
+    elif args.command == "rezero":
+        extra = {"axis": args.axis}
+    reply = request(args.command, args.socket, **extra)
+    if args.command == "calibrate" and args.wait and reply.get("ok"):
+        # пока цикл шагов не выполнил команду, «не идёт» — это прежнее состояние
+        command = reply["command"]
+        while True:
+            reply = request("calibration", args.socket, command=command)
+            if not reply.get("ok"):
+                break
+            if reply["command_done"] and not reply["calibration"]["running"]:
+                break
+            time.sleep(0.05 if not reply["command_done"] else 0.2)
+    if args.json or not reply.get("ok"):
+        print(json.dumps(reply, indent=4, ensure_ascii=False))
+    elif args.command in ("settings", "set"):
+        _print_settings(reply)
+    elif args.command == "state":
+        for axis, p, t in zip(axes.TABLE, reply["positions"], reply["targets"]):
+            print(f"{axis['name']:<10} позиция {p:>7}  цель {t:>7}")
+    elif args.command == "axes":
+        for i, axis in enumerate(reply["axes"]):
+            print(f"{i} {axis['name']:<10} {axis['label']:<10} {', '.join(axis['keys'])}")
+    elif args.command in ("calibrate", "calibration") and "calibration" in reply:
+        print(json.dumps(reply["calibration"], ensure_ascii=False))
+    else:
+        print("ok")
+    sys.exit(0 if reply.get("ok") else 1)
+
+if __name__ == "__main__":
+    main()
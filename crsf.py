@@ -0,0 +1,111 @@
+from sbus import unpack_channels, pack_channels
+
+# ===== CRSF (TBS Crossfire, ExpressLRS) =====
+# Кадр: адрес 0xC8 (полётный контроллер — то, чем для приёмника является
+# Raspberry Pi), длина (тип + данные + CRC), тип, данные, CRC8 DVB-S2 по типу
+# и данным. Каналы (тип 0x16) — 22 байта, 16 каналов по 11 бит, упакованы
+# как у SBUS; статистика связи (тип 0x14) запоминается в link. 420000 бод,
+# 8N1; ELRS шлёт каналы с частотой пакетов (150-1000 Гц), при потере связи
+# кадры каналов просто прекращаются — это ловит таймер связи приёмника.
+
+ADDRESS = 0xC8
+TYPE_LINK_STATISTICS = 0x14
+TYPE_RC_CHANNELS = 0x16
+RC_FRAME_LEN = 26   # адрес, длина, тип, 22 байта каналов, CRC
+MAX_FRAME_LEN = 64
+
+def _crc_table(poly: int):
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+_CRC8 = _crc_table(0xD5)  # DVB-S2
+
+def crc8(data, start: int = 0, end: int = None) -> int:
+    crc = 0
+    table = _CRC8
+    for byte in data[start:end]:
+        crc = table[crc ^ byte]
+    return crc
+
+class CrsfParser:
+    # тот же интерфейс, что у IBusParser: feed() -> список кадров каналов
+
+    frame_len = RC_FRAME_LEN
+
+    def __init__(self, newest_only: bool = False):
+        self.newest_only = newest_only
+        self.buffer = bytearray()
+        self.frames_ok = 0
+        self.frames_bad = 0
+        self.bytes_skipped = 0
+        self.frames_other = 0  # верные кадры других типов (телеметрия)
+        # (RSSI 1, RSSI 2, LQ, SNR) восходящего канала из статистики связи
+        self.link = None
+
+    def feed(self, data) -> list:
+        buf = self.buffer
+        buf.extend(data)
+        frames = []
+        pos = 0
+        size = len(buf)
+        while pos + 2 <= size:
+            start = buf.find(ADDRESS, pos, size - 1)
+            if start < 0:
+                self.bytes_skipped += size - 1 - pos
+                pos = size - 1
+                break
+            self.bytes_skipped += start - pos
+            length = buf[start + 1]
+            if length < 2 or length > MAX_FRAME_LEN - 2:
+                self.frames_bad += 1
+                pos = start + 1
+                continue
+            end = start + 2 + length
+            if end > size:
+                pos = start  # кадр ещё не дошёл целиком
+                break
+            if crc8(buf, start + 2, end - 1) != buf[end - 1]:
+                self.frames_bad += 1
+                pos = start + 1
+                continue
+            frame_type = buf[start + 2]
+            if frame_type == TYPE_RC_CHANNELS and length == 24:
+                frames.append(unpack_channels(buf, start + 3))
+                self.frames_ok += 1
+            elif frame_type == TYPE_LINK_STATISTICS and length >= 12:
+                snr = buf[start + 6]
+                self.link = (buf[start + 3], buf[start + 4], buf[start + 5], snr - 256 if snr > 127 else snr)
+                self.frames_other += 1
+            else:
+                self.frames_other += 1
+            pos = end
+        if pos:
+            del buf[:pos]
+        if self.newest_only and len(frames) > 1:
+            return frames[-1:]
+        return frames
+
+    def needed(self) -> int:
+        # байт до конца начатого кадра: длина известна после второго байта
+        buf = self.buffer
+        pending = len(buf)
+        if pending >= 2 and buf[0] == ADDRESS and 2 <= buf[1] <= MAX_FRAME_LEN - 2:
+            return max(1, buf[1] + 2 - pending)
+        return RC_FRAME_LEN - pending if pending < RC_FRAME_LEN else 1
+
+    def reset(self):
+        self.buffer.clear()
+
+def build_frame(channels) -> bytes:
+    # кадр каналов для тестов/симуляции
+    body = bytes((TYPE_RC_CHANNELS,)) + pack_channels(channels)
+    return bytes((ADDRESS, len(body) + 1)) + body + bytes((crc8(body),))
+
+def build_link_statistics(rssi1: int = 50, rssi2: int = 50, lq: int = 100, snr: int = 10) -> bytes:
+    body = bytes((TYPE_LINK_STATISTICS, rssi1, rssi2, lq, snr & 0xFF, 0, 0, 0, 0, 0, 0))
+    return bytes((ADDRESS, len(body) + 1)) + body + bytes((crc8(body),))
@@ -1,109 +1,250 @@
+import os
+import select
 import serial
+import termios
 import time
+import rc_protocols
+import stats
+import uart_capture
+from channel_map import ChannelMap, SIGNAL_CHANNEL, SIGNAL_MIN
+from setpoint_filter import SetpointFilter
 
-def receive_data(motor_control):
+# в симуляции — ведомая сторона PTY (sim.uart.PtyUart)
+UART_PORT = os.environ.get("UART_PORT", "/dev/ttyAMA0")
+# ibus, sbus или crsf (rc_protocols); UART_BAUD — если скорость не по протоколу
+RC_PROTOCOL = os.environ.get("RC_PROTOCOL", "ibus")
+UART_BAUD = int(os.environ.get("UART_BAUD", 0))
+# event — ожидание кадра через poll() на дескрипторе порта, read — прежний
+# цикл uart.read(in_waiting or 1) (для сравнения задержек)
+SERIAL_INGEST = os.environ.get("SERIAL_INGEST", "event")
+# ни одного верного кадра дольше этого — связь потеряна (кроме канала 6)
+LINK_TIMEOUT = float(os.environ.get("LINK_TIMEOUT", 0.1))
+# период кадров для фильтра уставок — скользящее среднее промежутков
+# между кадрами; фильтр пересчитывается, когда оно уходит больше чем на
+# PERIOD_RETIME от прежнего
+PERIOD_ALPHA = 0.05
+PERIOD_RETIME = 0.1
+
+def receive_data(motor_control, mailbox=None, store=None, uart=None):
+    # mailbox — SetpointMailbox отдельного цикла шагов (step_loop);
+    # без него моторы шагают прямо отсюда, как раньше.
+    # store — SettingsStore: таблицы каналов пересобираются по смене снимка
+    # uart — готовый источник (uart_capture.ReplayUart); иначе порт UART_PORT
+    # и запись прочитанного, если задан UART_CAPTURE
+    protocol = rc_protocols.get_protocol(RC_PROTOCOL)
+    if uart is not None:
+        return _receive(uart, None, FrameHandler(motor_control, mailbox, store, protocol))
     try:
         uart = serial.Serial(
-            port='/dev/ttyAMA0',   # <— было /dev/serial0
-            baudrate=115200,
+            port=UART_PORT,   # <— было /dev/serial0
+            baudrate=UART_BAUD or protocol.baudrate,
             bytesize=serial.EIGHTBITS,
-            parity=serial.PARITY_NONE,
-            stopbits=serial.STOPBITS_ONE,
+            parity=protocol.parity,
+            stopbits=protocol.stopbits,
             timeout=0.01,
             write_timeout=0
         )
     except serial.SerialException:
         return
+    capture = uart_capture.open_capture()
+    handler = FrameHandler(motor_control, mailbox, store, protocol)
+    # без ящика моторы шагают из этого же цикла — ему нельзя спать в poll()
+    if SERIAL_INGEST == "event" and mailbox is not None:
+        _receive_events(uart, capture, handler)
+    else:
+        _receive(uart, capture, handler)
+
+class FrameHandler:
+    # Всё, что живёт дольше одного куска данных: разбор кадров протокола,
+    # таблицы каналов, фильтр уставок, состояние связи. feed() — прочитанные
+    # байты с моментом их прихода, link_timeout() — таймер связи истёк.
+
+    def __init__(self, motor_control, mailbox=None, store=None, protocol=None):
+        self.motor_control = motor_control
+        self.mailbox = mailbox
+        self.store = store
+        protocol = protocol or rc_protocols.get_protocol(RC_PROTOCOL)
+        self.parser = parser = protocol.parser()
+        self.mapping = ChannelMap()
+        # период кадров: сначала наибольшая частота протокола, дальше — по
+        # приходу кадров (CRSF шлёт от 150 до 1000 Гц), но не короче её
+        self.min_period = 1.0 / protocol.frame_rate
+        self.frame_period = self.min_period
+        # дрожь ручек не доходит до моторов: setpoint_filter.json или SETPOINT_FILTER
+        self.setpoint_filter = SetpointFilter(dt=self.frame_period)
+        stats.register("rc", lambda: {"protocol": protocol.name, "frames_ok": parser.frames_ok,
+                                      "frames_bad": parser.frames_bad, "bytes_skipped": parser.bytes_skipped,
+                                      "frame_period_ms": self.frame_period * 1000})
+        stats.register("setpoint_filter", self.setpoint_filter.snapshot)
+        self.targets = list(motor_control.target_positions) if mailbox is not None else None
+        self.connection_lost = False
+        self.first_run = True
+        self.last_frame_ns = None  # приход последнего верного кадра
+
+    def needed(self) -> int:
+        # байт до конца начатого кадра
+        return self.parser.needed()
+
+    def feed(self, data, arrived_ns: int) -> int:
+        motor_control = self.motor_control
+        mailbox = self.mailbox
+        mapping = self.mapping
+        setpoint_filter = self.setpoint_filter
+        targets = self.targets if mailbox is not None else motor_control.target_positions
+        frames = self.parser.feed(data)
+        if not frames:
+            return 0
+        last = self.last_frame_ns
+        if last is not None and not self.connection_lost:
+            self._measure_period((arrived_ns - last) / 1e9 / len(frames))
+        self.last_frame_ns = arrived_ns
+
+        # таблицы строятся заново, только когда сменились настройки
+        if self.store is not None:
+            source = self.store.snapshot
+            if source is not mapping.source:
+                mapping.compile(source.axes, source)
+                stats.counters.add(stats.CHANNEL_MAP_BUILDS)
+        else:
+            source = motor_control.get_motor_settings()
+            if source is not mapping.source:
+                mapping.compile(source, source)
+                stats.counters.add(stats.CHANNEL_MAP_BUILDS)
+
+        # все полные кадры из прочитанного, по порядку
+        # None — failsafe, о котором сообщил сам приёмник (SBUS)
+        for channels in frames:
+            signal_ok = channels is not None and channels[SIGNAL_CHANNEL] >= SIGNAL_MIN
+            if not signal_ok and not self.connection_lost:
+                motor_control.safety_mode(targets)
+                setpoint_filter.reset(targets)
+            self.connection_lost = not signal_ok
 
-    buffer = bytearray()
-    connection_lost = False
-    first_run = True
+            if signal_ok:
+                if self.first_run:
+                    if mailbox is None:
+                        motor_control.positions[0] = 0
+                    else:
+                        mailbox.rezero(0)
+                    self.first_run = False
+                else:
+                    # руль, газ, тормоз, АКПП — по таблицам channel_map
+                    mapping.apply(channels, targets)
+                    setpoint_filter.apply(targets)
+
+        if mailbox is not None:
+            mailbox.publish(targets, frames[-1])
+        return len(frames)
+
+    def _measure_period(self, gap: float):
+        # пауза дольше таймера связи — обрыв, а не темп пульта
+        if gap > LINK_TIMEOUT:
+            return
+        period = self.frame_period
+        period += PERIOD_ALPHA * (max(gap, self.min_period) - period)
+        self.frame_period = period
+        dt = self.setpoint_filter.dt
+        if abs(period - dt) > PERIOD_RETIME * dt:
+            self.setpoint_filter.retime(period)
 
+    def link_timeout(self):
+        # кадры перестали приходить совсем: то же, что пропавший канал 6
+        if self.connection_lost or self.last_frame_ns is None:
+            return
+        targets = self.targets if self.mailbox is not None else self.motor_control.target_positions
+        self.motor_control.safety_mode(targets)
+        self.setpoint_filter.reset(targets)
+        self.connection_lost = True
+        stats.counters.add(stats.LINK_TIMEOUTS)
+        if self.mailbox is not None:
+            self.mailbox.publish(targets)
+
+def _close(uart, capture):
+    try:
+        uart.close()
+    except Exception:
+        pass
+    if capture is not None:
+        capture.close()
+
+def _set_min_bytes(fd: int, count: int):
+    # VMIN у tty: poll() будит, только когда в буфере count байт (VTIME = 0)
+    attrs = termios.tcgetattr(fd)
+    if attrs[6][termios.VMIN] != count or attrs[6][termios.VTIME] != 0:
+        attrs[6][termios.VMIN] = count
+        attrs[6][termios.VTIME] = 0
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+
+def _receive_events(uart, capture, handler):
+    # Один poll() на кадр: VMIN — сколько байт не хватает до конца текущего
+    # кадра, так что пробуждение совпадает с приходом его последнего байта.
+    # Время прихода — сразу после poll(), до разбора. Таймаут poll() — срок
+    # таймера связи, а не частый опрос.
+    fd = uart.fileno()
+    poller = select.poll()
+    poller.register(fd, select.POLLIN | select.POLLERR | select.POLLHUP)
+    iteration = stats.RECEIVER_ITERATION
+    link_timeout_ns = int(LINK_TIMEOUT * 1e9)
+    try:
+        need = handler.needed()
+        _set_min_bytes(fd, need)
+        while True:
+            last = handler.last_frame_ns
+            if last is None or handler.connection_lost:
+                timeout = None  # связи ещё (или уже) нет — ждём без срока
+            else:
+                timeout = max(0, (last + link_timeout_ns - time.monotonic_ns()) // 1_000_000 + 1)
+            events = poller.poll(timeout)
+            arrived = time.monotonic_ns()
+            if not events:
+                handler.link_timeout()
+                continue
+            try:
+                data = os.read(fd, 4096)
+            except BlockingIOError:
+                continue
+            except OSError:
+                data = b""
+            if not data:
+                # порт пропал (USB, закрытый PTY)
+                handler.link_timeout()
+                return
+            if capture is not None:
+                capture.write(data, arrived)
+            handler.feed(data, arrived)
+            iteration.record_ns(time.monotonic_ns() - arrived)
+            count = handler.needed()
+            if count != need:
+                need = count
+                _set_min_bytes(fd, need)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _close(uart, capture)
+
+def _receive(uart, capture, handler):
+    # прежний цикл: чтение с таймаутом порта; без ящика — шаги отсюда же
+    iteration = stats.RECEIVER_ITERATION
+    motor_control = handler.motor_control
+    mailbox = handler.mailbox
     try:
         while True:
             data = uart.read(uart.in_waiting or 1)
             if data:
-                buffer.extend(data)
-
-                # разбор всех полных пакетов
-                while len(buffer) >= 32:
-                    # заголовок
-                    if buffer[0] == 0x20 and buffer[1] == 0x40:
-                        packet = buffer[:32]
-
-                        # контрольная сумма
-                        checksum = 0xFFFF
-                        for b in packet[:-2]:
-                            checksum -= b
-                        checksum &= 0xFFFF
-                        packet_checksum = packet[-2] | (packet[-1] << 8)
-
-                        if checksum == packet_checksum:
-                            # каналы
-                            channels = []
-                            for i in range(10):
-                                lo = packet[2 + i*2]
-                                hi = packet[3 + i*2]
-                                channels.append(lo | (hi << 8))
-
-                            signal_ok = channels[6] >= 800
-                            if not signal_ok and not connection_lost:
-                                motor_control.safety_mode()
-                            connection_lost = not signal_ok
-
-                            if signal_ok:
-                                if first_run:
-                                    motor_control.positions[0] = 0
-                                    first_run = False
-                                else:
-                                    settings = motor_control.get_motor_settings()
-
-                                    # Руль
-                                    max_steer = settings[0]["distance"]
-                                    motor_control.target_positions[0] = int((channels[0] - 1500) * (max_steer / 500))
-
-                                    # Газ
-                                    max_gas = settings[1]["distance"]
-                                    if channels[1] > 1500:
-                                        motor_control.target_positions[1] = int((channels[1] - 1500) * (max_gas / 500))
-                                    else:
-                                        motor_control.target_positions[1] = 0
-
-                                    # Тормоз
-                                    max_brake = settings[2]["distance"]
-                                    motor_control.target_positions[2] = int((channels[2] - 1000) * (max_brake / 1000))
-
-                                    # АКПП
-                                    akpp_value = channels[5]
-                                    if akpp_value < 1200:
-                                        motor_control.target_positions[3] = -settings[3]["distance_R"]
-                                    elif akpp_value > 1800:
-                                        motor_control.target_positions[3] = settings[3]["distance_D"]
-                                    else:
-                                        motor_control.target_positions[3] = 0
-
-                            # сдвиг буфера
-                            del buffer[:32]
-                            break
-                        else:
-                            del buffer[0]
-                    else:
-                        del buffer[0]
-            else:
+                started = time.monotonic_ns()
+                if capture is not None:
+                    capture.write(data)
+                handler.feed(data, started)
+                iteration.record_ns(time.monotonic_ns() - started)
+            elif mailbox is None:
                 time.sleep(0.001)
 
-            # обновление моторов
-            motor_control.update_step_intervals()
-            for i in range(4):
-                if i == 3:
-                    motor_control.move_motor_akpp()
-                else:
-                    motor_control.move_motor(i)
+            # обновление моторов (таблицы разгона уже посчитаны при смене настроек)
+            if mailbox is None:
+                motor_control.step_all()
 
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, EOFError):
+        # EOFError — конец воспроизводимой записи
         pass
     finally:
-        try:
-            uart.close()
-        except Exception:
-            pass
+        _close(uart, capture)
@@ -0,0 +1,73 @@
+import mmap
+import os
+
+import numpy as np
+
+# ===== FRAMEBUFFER RGB565 =====
+# Устройство (или обычный файл вместо него) мапится один раз; кадры
+# хранятся уже в RGB565, на экран копируются целиком или по прямоугольникам.
+
+FB_PATH = os.environ.get("FRAMEBUFFER", "/dev/fb0")
+
+def to_rgb565(image) -> np.ndarray:
+    rgb = np.asarray(image.convert("RGB"), dtype=np.uint16)
+    return ((rgb[..., 0] >> 3) << 11) | ((rgb[..., 1] >> 2) << 5) | (rgb[..., 2] >> 3)
+
+def rgb565(color) -> int:
+    r, g, b = color
+    return ((r >> 3) << 11) | ((g >> 2) << 5) | (b >> 3)
+
+def patch_rgb565(frame: np.ndarray, image, rect):
+    # перевод в RGB565 только изменившегося куска картинки
+    x0, y0, x1, y1 = rect
+    frame[y0:y1, x0:x1] = to_rgb565(image.crop(rect))
+
+def _line_length(path: str, width: int) -> int:
+    # у реального fb строка может быть длиннее width*2 (выравнивание)
+    name = os.path.basename(path)
+    try:
+        with open(f"/sys/class/graphics/{name}/stride") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return width * 2
+
+class Framebuffer:
+    def __init__(self, path: str = FB_PATH, width: int = 800, height: int = 480):
+        self.path = path
+        self.width = width
+        self.height = height
+        stride = _line_length(path, width)
+        size = stride * height
+        if os.path.exists(path) and not os.path.isfile(path):
+            self.fd = os.open(path, os.O_RDWR)
+        else:
+            # файл-заглушка: создаём и растягиваем до размера кадра
+            self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            if os.fstat(self.fd).st_size < size:
+                os.ftruncate(self.fd, size)
+        self.mm = mmap.mmap(self.fd, size)
+        self.pixels = np.ndarray((height, stride // 2), dtype=np.uint16,
+                                 buffer=self.mm)[:, :width]
+        self._shown = None
+
+    def present(self, frame: np.ndarray, rects=None):
+        # rects — (x0, y0, x1, y1); применяются, только если на экране уже
+        # этот же кадр (его меняли на месте), иначе копируется весь кадр
+        if rects is None or frame is not self._shown:
+            self.pixels[:] = frame
+        else:
+            for x0, y0, x1, y1 in rects:
+                self.pixels[y0:y1, x0:x1] = frame[y0:y1, x0:x1]
+        self._shown = frame
+
+    def close(self):
+        self._shown = None
+        self.pixels = None
+        self.mm.close()
+        os.close(self.fd)
+
+def open_framebuffer(width: int = 800, height: int = 480):
+    try:
+        return Framebuffer(FB_PATH, width, height)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,72 @@
+import struct
+
+# ===== FLYSKY iBUS =====
+# Кадр 32 байта: 0x20 0x40, 14 каналов uint16 LE, контрольная сумма uint16 LE
+# (0xFFFF минус сумма первых 30 байт).
+
+FRAME_LEN = 32
+HEADER = b"\x20\x40"
+CHANNELS = 14
+
+_channels = struct.Struct("<14H")
+_checksum = struct.Struct("<H")
+
+class IBusParser:
+    # Разбор за один проход: заголовок ищется через bytearray.find, буфер
+    # сдвигается один раз за feed(), каналы читаются struct'ом без копий.
+
+    frame_len = FRAME_LEN
+
+    def __init__(self, newest_only: bool = False):
+        self.newest_only = newest_only
+        self.buffer = bytearray()
+        self.frames_ok = 0
+        self.frames_bad = 0
+        self.bytes_skipped = 0
+
+    def feed(self, data) -> list:
+        buf = self.buffer
+        buf.extend(data)
+        frames = []
+        pos = 0
+        end = len(buf) - FRAME_LEN
+        view = memoryview(buf)
+        try:
+            while pos <= end:
+                start = buf.find(HEADER, pos, end + 2)
+                if start < 0:
+                    # хвост может оказаться началом заголовка — его оставляем
+                    self.bytes_skipped += end + 1 - pos
+                    pos = end + 1
+                    break
+                self.bytes_skipped += start - pos
+                checksum = (0xFFFF - sum(view[start:start + FRAME_LEN - 2])) & 0xFFFF
+                if checksum == _checksum.unpack_from(buf, start + FRAME_LEN - 2)[0]:
+                    frames.append(_channels.unpack_from(buf, start + 2))
+                    self.frames_ok += 1
+                    pos = start + FRAME_LEN
+                else:
+                    self.frames_bad += 1
+                    pos = start + 1
+        finally:
+            view.release()
+        if pos:
+            del buf[:pos]
+        if self.newest_only and len(frames) > 1:
+            return frames[-1:]
+        return frames
+
+    def needed(self) -> int:
+        # байт до конца начатого кадра (для VMIN приёмника)
+        pending = len(self.buffer)
+        return FRAME_LEN - pending if pending < FRAME_LEN else 1
+
+    def reset(self):
+        self.buffer.clear()
+
+def build_frame(channels) -> bytes:
+    # кадр для тестов/симуляции; недостающие каналы — 1500
+    values = list(channels)[:CHANNELS]
+    values += [1500] * (CHANNELS - len(values))
+    body = HEADER + _channels.pack(*values)
+    return body + _checksum.pack((0xFFFF - sum(body)) & 0xFFFF)
@@ -4,14 +4,19 @@ import time
 from PIL import Image, ImageDraw, ImageFont
 from evdev import InputDevice, categorize, ecodes
 import motor_control as motor
-import numpy as np
 import threading
 import signal
 from signal import SIGINT
 import evdev
-import math
 import queue
 import select
+import stats
+import axes
+import step_loop
+from settings_store import SettingsStore, value_range
+from framebuffer import open_framebuffer, to_rgb565, patch_rgb565
+from menu_render import Button, HitGrid, MenuRenderer, draw_centered_text
+from menu_telemetry import TelemetryPage
 
 WIDTH, HEIGHT = 800, 480
 BUTTON_RADIUS = 80
@@ -19,19 +24,30 @@ BUTTON_RADIUS_LARGE = 100
 BUTTON_RADIUS_SMALL = int(BUTTON_RADIUS * 0.7)
 STEP = 500
 TOUCH_TOLERANCE = 20
+# строка «Текущее значение» на странице параметра
+VALUE_RECT = (0, 120, WIDTH, 180)
+DIAGNOSTICS_REFRESH = 1.0  # с между обновлениями страницы диагностики
+# строка хода калибровки под кнопкой «КАЛИБРОВКА»
+STATUS_RECT = (WIDTH // 2 - 240, 400, WIDTH // 2 + 240, 440)
+CALIBRATION_REFRESH = 0.2
 
-MOTORS = ["Руль", "Газ", "Тормоз", "АКПП"]
+MOTORS = [axis["label"] for axis in axes.TABLE]
 
 BACKGROUND_COLOR = (50, 0, 100)
 BUTTON_OUTLINE_COLOR = (255, 255, 255)
 TEXT_COLOR = (255, 255, 255)
 
-PARAMETERS_BY_MOTOR = [
-    ["speed", "acceleration", "distance"],
-    ["speed", "acceleration", "distance"],
-    ["speed", "acceleration", "distance"],
-    ["speed", "acceleration", "distance_R", "distance_D"]
-]
+PARAMETERS_BY_MOTOR = [axes.setting_keys(axis) for axis in axes.TABLE]
+
+HOMING_PHASES_RUS = {
+    "idle": "-",
+    "approach": "подход",
+    "backoff": "отход",
+    "slow": "точно",
+    "retreat": "к нулю",
+    "done": "готово",
+    "failed": "нет концевика",
+}
 
 PARAMETERS_RUS = {
     "speed": "Скорость",
@@ -41,12 +57,65 @@ PARAMETERS_RUS = {
     "distance_D": "Дистанция D"
 }
 
+# ===== РАЗМЕТКА ЭКРАНОВ (рисование и поиск касания) =====
+def motor_buttons(names):
+    # два столбца по краям, слева направо и сверху вниз; до четырёх осей —
+    # прежние углы, больше — кнопки поменьше с равным шагом по высоте
+    rows = (len(names) + 1) // 2
+    if rows <= 2:
+        radius, ys = BUTTON_RADIUS, [150, HEIGHT - 150]
+    else:
+        radius = BUTTON_RADIUS_SMALL
+        top, bottom = radius + 40, HEIGHT - radius - 10
+        ys = [top + (bottom - top) * r // (rows - 1) for r in range(rows)]
+    return tuple(Button("motor", i, 150 if i % 2 == 0 else WIDTH - 150, ys[i // 2], radius,
+                        name, -radius - 20, "medium")
+                 for i, name in enumerate(names))
+
+MAIN_MENU_BUTTONS = motor_buttons(MOTORS) + (
+    Button("calibrate", None, WIDTH // 2, HEIGHT // 2, BUTTON_RADIUS_LARGE, "КАЛИБРОВКА",
+           BUTTON_RADIUS_LARGE + 20, "large"),
+    # две малые кнопки сверху, подписи над ними: под ними рядом не помещаются
+    Button("diagnostics", None, WIDTH // 2 - 100, 70, 30, "Диагностика", -62, "small"),
+    Button("telemetry", None, WIDTH // 2 + 100, 70, 30, "Телеметрия", -62, "small"),
+)
+
+PARAM_MENU_BUTTONS = (
+    Button("adjust", -STEP, 150, 245, BUTTON_RADIUS_SMALL, "-", -35, "large"),
+    Button("adjust", STEP, WIDTH - 150, 245, BUTTON_RADIUS_SMALL, "+", -35, "large"),
+    Button("switch", -1, 100, HEIGHT - 100, BUTTON_RADIUS, "<", -30, "large"),
+    Button("switch", 1, WIDTH - 100, HEIGHT - 100, BUTTON_RADIUS, ">", -30, "large"),
+    Button("save", None, WIDTH // 2, HEIGHT - 125, BUTTON_RADIUS, "Сохранить", 55, "small"),
+)
+
+DIAGNOSTICS_BUTTONS = (
+    Button("back", None, 100, HEIGHT - 100, BUTTON_RADIUS, "<", -30, "large"),
+)
+TELEMETRY_BUTTONS = DIAGNOSTICS_BUTTONS
+
 SETTINGS_FILE = "motor_settings.json"
 AKPP_FILE = "akpp_center.json"
 
 class Menu:
-    def __init__(self, motor_settings, akpp_center):
-        self.motor_settings = motor_settings
+    def __init__(self, motor_settings, akpp_center, calibrate=None, store=None,
+                 calibration_status=None, motion=None, positions=None):
+        # правки идут через хранилище: снимок — моторам, файл — с задержкой
+        if store is None:
+            store = SettingsStore(SETTINGS_FILE, motor_settings)
+            store.subscribe(motor.publish_snapshot)
+        self.store = store
+        self.motor_settings = store.snapshot.as_list()
+        # правка не из меню (файл на диске, API) — страницы параметров устарели:
+        # перестраиваются в потоке меню перед отрисовкой (sync_settings)
+        self.settings_version = store.snapshot.version
+        store.subscribe(lambda snapshot: self.request_redraw())
+        # калибровку запускает тот, кто владеет шагами (поток или процесс ядра)
+        self.calibrate = calibrate or motor.calibrate_motors
+        # ход калибровки: motor.homing_status или MotionCore.homing_status
+        self.calibration_status = calibration_status or motor.homing_status
+        self.calibrating = False
+        self.calibration_started = 0.0
+        self.calibration_text = None
         self.akpp_center = akpp_center
         self.BACKGROUND_COLOR = (50, 0, 100)
         self.TEXT_COLOR = (255, 255, 255)
@@ -54,6 +123,8 @@ class Menu:
         self.current_motor_index = 0
         self.current_param_index = 0
         self.is_in_main_menu = True
+        self.is_in_diagnostics = False
+        self.is_in_telemetry = False
         self.touch_device = self.find_touch_device()
         self.last_touch_time = 0
         self.touch_debounce = 0.1
@@ -61,15 +132,41 @@ class Menu:
         self.touch_queue = queue.Queue()
         self.redraw_needed = threading.Event()
         self.redraw_needed.set()
+        # самопайп: будит слушателя тача при остановке
+        self._wake_r, self._wake_w = os.pipe()
 
         font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
         self.font_large = ImageFont.truetype(font_path, 50)
         self.font_medium = ImageFont.truetype(font_path, 30)
         self.font_small = ImageFont.truetype(font_path, 24)
 
+        fonts = {"large": self.font_large, "medium": self.font_medium, "small": self.font_small}
+        self.renderer = MenuRenderer((WIDTH, HEIGHT), self.BACKGROUND_COLOR, self.TEXT_COLOR,
+                                     self.BUTTON_OUTLINE_COLOR, fonts)
+        self.main_menu_hits = HitGrid(MAIN_MENU_BUTTONS, WIDTH, HEIGHT, TOUCH_TOLERANCE)
+        self.param_menu_hits = HitGrid(PARAM_MENU_BUTTONS, WIDTH, HEIGHT, TOUCH_TOLERANCE)
+        self.diagnostics_hits = HitGrid(DIAGNOSTICS_BUTTONS, WIDTH, HEIGHT, TOUCH_TOLERANCE)
+        self.telemetry_hits = HitGrid(TELEMETRY_BUTTONS, WIDTH, HEIGHT, TOUCH_TOLERANCE)
+
+        # motion — SetpointMailbox или MotionCore (цели, кадр пульта, опоздание
+        # ядра); без него — прямо из motor_control, как в потоке шагов
+        if motion is None:
+            targets, channels = (lambda: motor.target_positions), (lambda: None)
+        else:
+            targets, channels = motion.targets, (lambda: motion.channels)
+        motion_lag = getattr(motion, "lag_ns", None) or (lambda: step_loop.lag_ns(motor))
+        self.telemetry = TelemetryPage(self.renderer, TELEMETRY_BUTTONS, self.font_small,
+                                       positions or (lambda: motor.positions), targets,
+                                       channels, motion_lag, store)
+
+        # framebuffer мапится один раз; рядом с картинками — готовые RGB565
+        self.framebuffer = open_framebuffer(WIDTH, HEIGHT)
         self.main_menu_image = self.create_main_menu_image()
+        self.main_menu_frame = to_rgb565(self.main_menu_image)
         self.param_menu_images = {}
-        self.update_screen(self.main_menu_image)
+        self.param_menu_frames = {}
+        self.dirty_rects = []
+        self.update_screen(self.main_menu_image, self.main_menu_frame)
 
     def find_touch_device(self):
         try:
@@ -86,73 +183,111 @@ class Menu:
         return None
 
     def create_main_menu_image(self):
-        image = Image.new("RGB", (WIDTH, HEIGHT), self.BACKGROUND_COLOR)
-        draw = ImageDraw.Draw(image)
-
-        buttons = [
-            {'name': 'Руль', 'x': 150, 'y': 150},
-            {'name': 'Газ', 'x': WIDTH - 150, 'y': 150},
-            {'name': 'Тормоз', 'x': 150, 'y': HEIGHT - 150},
-            {'name': 'АКПП', 'x': WIDTH - 150, 'y': HEIGHT - 150}
-        ]
-        for btn in buttons:
-            self.draw_metal_button(draw, btn['x'], btn['y'], BUTTON_RADIUS)
-            self.draw_text(draw, btn['x'], btn['y'] - BUTTON_RADIUS - 20, btn['name'], self.font_medium)
-
-        self.draw_metal_button(draw, WIDTH // 2, HEIGHT // 2, BUTTON_RADIUS_LARGE)
-        self.draw_text(draw, WIDTH // 2, HEIGHT // 2 + BUTTON_RADIUS_LARGE + 20, "КАЛИБРОВКА", self.font_large)
-        return image
+        return self.renderer.compose("main", MAIN_MENU_BUTTONS)
 
     def create_parameter_menu_image(self, motor_index, param_index):
-        image = Image.new("RGB", (WIDTH, HEIGHT), self.BACKGROUND_COLOR)
+        image = self.renderer.compose("param", PARAM_MENU_BUTTONS)
         draw = ImageDraw.Draw(image)
 
         motor_name = MOTORS[motor_index]
         param_key = PARAMETERS_BY_MOTOR[motor_index][param_index]
         param_value = self.motor_settings[motor_index].get(param_key, 0)
 
-        self.draw_text(draw, WIDTH // 2, 30, f"{motor_name} - {PARAMETERS_RUS[param_key]}", self.font_large)
+        self.draw_text(draw, WIDTH // 2, 30, f"{motor_name} - {PARAMETERS_RUS.get(param_key, param_key)}", self.font_large)
         self.draw_text(draw, WIDTH // 2, 130, f"Текущее значение: {param_value}", self.font_medium)
+        return image
 
-        self.draw_metal_button(draw, 150, 245, BUTTON_RADIUS_SMALL)
-        self.draw_text(draw, 150, 245 - 35, "-", self.font_large)
-
-        self.draw_metal_button(draw, WIDTH - 150, 245, BUTTON_RADIUS_SMALL)
-        self.draw_text(draw, WIDTH - 150, 245 - 35, "+", self.font_large)
-
-        self.draw_metal_button(draw, 100, HEIGHT - 100, BUTTON_RADIUS)
-        self.draw_text(draw, 100, HEIGHT - 130, "<", self.font_large)
-
-        self.draw_metal_button(draw, WIDTH - 100, HEIGHT - 100, BUTTON_RADIUS)
-        self.draw_text(draw, WIDTH - 100, HEIGHT - 130, ">", self.font_large)
-
-        self.draw_metal_button(draw, WIDTH // 2, HEIGHT - 125, BUTTON_RADIUS)
-        self.draw_text(draw, WIDTH // 2, HEIGHT - 70, "Сохранить", self.font_small)
-
+    def create_diagnostics_image(self):
+        image = self.renderer.compose("diagnostics", DIAGNOSTICS_BUTTONS)
+        draw = ImageDraw.Draw(image)
+        data = self.collect_diagnostics()
+        self.draw_text(draw, WIDTH // 2, 20, "Диагностика", self.font_medium)
+        lines = []
+        for name, h in zip(MOTORS, data["step_lateness"]):
+            lines.append(f"{name}: опоздание p50 {h['p50_us']} p99 {h['p99_us']} "
+                         f"max {h['max_us']} мкс")
+        period = data["step_loop_period"]
+        receiver = data["receiver_iteration"]
+        lines.append(f"Цикл шагов: p50 {period['p50_us']} p99 {period['p99_us']} мкс")
+        lines.append(f"Приёмник: p50 {receiver['p50_us']} p99 {receiver['p99_us']} мкс")
+        frames = data.get("rc", {})
+        lines.append(f"Кадры {frames.get('protocol', '')}: ок {frames.get('frames_ok', 0)}, "
+                     f"битые {frames.get('frames_bad', 0)}, "
+                     f"пропущено байт {frames.get('bytes_skipped', 0)}")
+        counters = data["counters"]
+        lines.append(f"Применений настроек: {counters['settings_reloads']}, "
+                     f"потерь связи по таймеру: {counters.get('link_timeouts', 0)}")
+        for n, line in enumerate(lines):
+            self.draw_text(draw, WIDTH // 2, 70 + n * 34, line, self.font_small)
         return image
 
+    def collect_diagnostics(self):
+        # шаги в отдельном процессе — их счётчики берём с сокета ядра
+        data = stats.snapshot()
+        if motor.MOTION_CORE == "process":
+            try:
+                core = stats.fetch(stats.STATS_SOCKET + ".core", timeout=0.2)
+            except (OSError, ValueError):
+                return data
+            for key in ("step_lateness", "step_loop_period", "counters"):
+                data[key] = core[key]
+        return data
+
     def draw_motor_selection(self):
         self.is_in_main_menu = True
-        self.update_screen(self.main_menu_image)
+        self.is_in_diagnostics = False
+        self.is_in_telemetry = False
+        self.redraw_needed.set()
 
-    def draw_metal_button(self, draw, x, y, radius):
-        for i in range(radius):
-            factor = i / radius
-            color = (150 + int(80 * factor), 150 + int(80 * factor), 150 + int(80 * factor))
-            draw.ellipse([x - radius + i, y - radius + i, x + radius - i, y + radius - i], fill=color)
-        draw.ellipse([x - radius - 5, y - radius - 5, x + radius + 5, y + radius + 5],
-                     outline=self.BUTTON_OUTLINE_COLOR, width=3)
+    def draw_diagnostics(self):
+        self.is_in_main_menu = False
+        self.is_in_diagnostics = True
+        self.redraw_needed.set()
+
+    def draw_telemetry(self):
+        self.is_in_main_menu = False
+        self.is_in_telemetry = True
+        self.redraw_needed.set()
 
     def draw_parameter_menu(self):
         self.is_in_main_menu = False
+        self.build_parameter_page()
+        self.redraw_needed.set()
+
+    def build_parameter_page(self):
         key = (self.current_motor_index, self.current_param_index)
         if key not in self.param_menu_images:
             self.param_menu_images[key] = self.create_parameter_menu_image(*key)
-        self.update_screen(self.param_menu_images[key])
+            self.param_menu_frames[key] = to_rgb565(self.param_menu_images[key])
 
-    def is_touch_in_circle(self, x, y, center_x, center_y, radius):
-        distance = math.sqrt((x - center_x) ** 2 + (y - center_y) ** 2)
-        return distance < (radius + TOUCH_TOLERANCE)
+    def sync_settings(self):
+        snapshot = self.store.snapshot
+        if snapshot.version == self.settings_version:
+            return
+        self.settings_version = snapshot.version
+        self.motor_settings = snapshot.as_list()
+        self.param_menu_images.clear()
+        self.param_menu_frames.clear()
+        self.dirty_rects = []
+        if not (self.is_in_main_menu or self.is_in_diagnostics or self.is_in_telemetry):
+            self.build_parameter_page()
+
+    def request_redraw(self):
+        # из чужих потоков: флаг + пустой элемент, чтобы разбудить run()
+        self.redraw_needed.set()
+        self.touch_queue.put(None)
+
+    def render_current(self):
+        rects, self.dirty_rects = self.dirty_rects, []
+        if self.is_in_telemetry:
+            self.telemetry.show(self.present_frame)
+        elif self.is_in_diagnostics:
+            self.update_screen(self.create_diagnostics_image())
+        elif self.is_in_main_menu:
+            self.update_screen(self.main_menu_image, self.main_menu_frame, rects or None)
+        else:
+            key = (self.current_motor_index, self.current_param_index)
+            self.update_screen(self.param_menu_images[key], self.param_menu_frames[key], rects or None)
 
     def process_touch(self, x, y):
         current_time = time.time()
@@ -164,46 +299,66 @@ class Menu:
             x = int(x * WIDTH / 800)
             y = int(y * HEIGHT / 480)
 
-        if self.is_in_main_menu:
-            buttons = [
-                {'name': 'Руль', 'x': 150, 'y': 150, 'index': 0},
-                {'name': 'Газ', 'x': WIDTH - 150, 'y': 150, 'index': 1},
-                {'name': 'Тормоз', 'x': 150, 'y': HEIGHT - 150, 'index': 2},
-                {'name': 'АКПП', 'x': WIDTH - 150, 'y': HEIGHT - 150, 'index': 3}
-            ]
-            for btn in buttons:
-                if self.is_touch_in_circle(x, y, btn['x'], btn['y'], BUTTON_RADIUS):
-                    self.current_motor_index = btn['index']
-                    self.current_param_index = 0
-                    self.draw_parameter_menu()
-                    return
-
-            if self.is_touch_in_circle(x, y, WIDTH // 2, HEIGHT // 2, BUTTON_RADIUS_LARGE):
+        if self.is_in_diagnostics:
+            button = self.diagnostics_hits.lookup(x, y)
+            if button is not None and button.action == "back":
+                self.draw_motor_selection()
+        elif self.is_in_telemetry:
+            button = self.telemetry_hits.lookup(x, y)
+            if button is not None and button.action == "back":
+                self.draw_motor_selection()
+        elif self.is_in_main_menu:
+            button = self.main_menu_hits.lookup(x, y)
+            if button is None:
+                return
+            if button.action == "motor":
+                self.current_motor_index = button.arg
+                self.current_param_index = 0
+                self.draw_parameter_menu()
+            elif button.action == "calibrate":
+                self.calibrating = True
+                self.calibration_started = time.monotonic()
                 threading.Thread(target=self.start_calibration, daemon=True).start()
+            elif button.action == "diagnostics":
+                self.draw_diagnostics()
+            elif button.action == "telemetry":
+                self.draw_telemetry()
         else:
-            if self.is_touch_in_circle(x, y, 150, 245, BUTTON_RADIUS_SMALL):
-                self.adjust_parameter(-STEP)
-            elif self.is_touch_in_circle(x, y, WIDTH - 150, 245, BUTTON_RADIUS_SMALL):
-                self.adjust_parameter(STEP)
-            elif self.is_touch_in_circle(x, y, 100, HEIGHT - 100, BUTTON_RADIUS):
-                self.switch_parameter(-1)
-            elif self.is_touch_in_circle(x, y, WIDTH - 100, HEIGHT - 100, BUTTON_RADIUS):
-                self.switch_parameter(1)
-            elif self.is_touch_in_circle(x, y, WIDTH // 2, HEIGHT - 125, BUTTON_RADIUS):
+            button = self.param_menu_hits.lookup(x, y)
+            if button is None:
+                return
+            if button.action == "adjust":
+                self.adjust_parameter(button.arg)
+            elif button.action == "switch":
+                self.switch_parameter(button.arg)
+            elif button.action == "save":
                 self.save_settings()
                 self.draw_motor_selection()
 
     def adjust_parameter(self, delta):
         param = PARAMETERS_BY_MOTOR[self.current_motor_index][self.current_param_index]
         current_value = self.motor_settings[self.current_motor_index].get(param, 0)
-        current_value = max(0, current_value + delta)
-        self.motor_settings[self.current_motor_index][param] = current_value
-        # Сохраняем изменения и сразу применяем к моторам
-        self.save_settings()
+        # скорость и разгон не ниже 1, скорость не выше max_speed оси
+        lo, hi = value_range(self.current_motor_index, param)
+        current_value = max(lo, current_value + delta)
+        if hi is not None:
+            current_value = min(hi, current_value)
+        # без записи на диск в потоке UI: хранилище само сольёт частые нажатия
+        snapshot = self.store.update(self.current_motor_index, param, current_value)
+        self.motor_settings = snapshot.as_list()
+        self.settings_version = snapshot.version
 
         key = (self.current_motor_index, self.current_param_index)
-        self.param_menu_images[key] = self.create_parameter_menu_image(*key)
-        self.update_screen(self.param_menu_images[key])
+        image = self.create_parameter_menu_image(*key)
+        self.param_menu_images[key] = image
+        frame = self.param_menu_frames.get(key)
+        if frame is None:
+            self.param_menu_frames[key] = to_rgb565(image)
+        else:
+            # изменилось только число — переводим и копируем одну полосу
+            patch_rgb565(frame, image, VALUE_RECT)
+            self.dirty_rects.append(VALUE_RECT)
+        self.redraw_needed.set()
 
     def switch_parameter(self, direction):
         self.current_param_index = (self.current_param_index + direction) % len(
@@ -211,36 +366,42 @@ class Menu:
         self.draw_parameter_menu()
 
     def start_calibration(self):
-        motor.calibrate_motors()
+        self.calibrate()
+
+    def poll_calibration(self):
+        status = self.calibration_status()
+        if status["running"]:
+            names = [f"{MOTORS[i]}: {HOMING_PHASES_RUS[phase]}" for i, phase in status["phases"].items()]
+            text = "  ".join(names)
+        elif time.monotonic() - self.calibration_started < 1.0:
+            return  # команда ещё не дошла до цикла шагов
+        else:
+            self.calibrating = False
+            failed = [MOTORS[i] for i, phase in status["phases"].items() if phase != "done"]
+            if failed:
+                text = "Нет концевика: " + ", ".join(failed)
+            else:
+                text = f"Калибровка: {status['elapsed']:.1f} с"
+        if text != self.calibration_text:
+            self.calibration_text = text
+            self.draw_calibration_status(text)
+
+    def draw_calibration_status(self, text):
+        # строка поверх главного экрана: переводится и копируется одна полоса
+        image = self.create_main_menu_image()
+        self.draw_text(ImageDraw.Draw(image), WIDTH // 2, STATUS_RECT[1] + 5, text, self.font_small)
+        self.main_menu_image = image
+        patch_rgb565(self.main_menu_frame, image, STATUS_RECT)
+        if self.is_in_main_menu:
+            self.dirty_rects.append(STATUS_RECT)
+            self.redraw_needed.set()
 
     def save_settings(self):
-        correct_motor_settings = []
-        for i, motor_setting in enumerate(self.motor_settings):
-            if i < 3:
-                correct_motor_settings.append({
-                    "speed": motor_setting["speed"],
-                    "acceleration": motor_setting["acceleration"],
-                    "distance": motor_setting.get("distance", 1000)
-                })
-            else:
-                correct_motor_settings.append({
-                    "speed": motor_setting["speed"],
-                    "acceleration": motor_setting["acceleration"],
-                    "distance_R": motor_setting.get("distance_R", 1000),
-                    "distance_D": motor_setting.get("distance_D", 4000)
-                })
-
-        with open(SETTINGS_FILE, "w") as f:
-            json.dump(correct_motor_settings, f, indent=4)
-            # Гарантируем немедленную запись на диск
-            f.flush()
-            os.fsync(f.fileno())
-
-        self.motor_settings = correct_motor_settings
+        # немедленная запись накопленных правок (кнопка «Сохранить», выход)
+        self.store.flush()
         self.apply_motor_settings()
 
     def apply_motor_settings(self):
-        motor.update_motor_settings(self.motor_settings)
         if len(self.motor_settings) > 3:
             motor.akpp_center_value = self.akpp_center
 
@@ -250,31 +411,43 @@ class Menu:
         if self.touch_device:
             self.touch_device.ungrab()
         self.running = False
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+        self.touch_queue.put(None)
 
     def draw_text(self, draw, x, y, text, font):
+        draw_centered_text(draw, x, y, text, font, self.TEXT_COLOR)
+
+    def update_screen(self, image, frame=None, rects=None):
+        if self.framebuffer is None:
+            return
         try:
-            bbox = draw.textbbox((0, 0), text, font=font)
-            w = bbox[2] - bbox[0]
-            draw.text((x - w // 2, y), text, font=font, fill=self.TEXT_COLOR)
-        except AttributeError:
-            w, _ = draw.textsize(text, font=font)
-            draw.text((x - w // 2, y), text, font=font, fill=self.TEXT_COLOR)
-
-    def update_screen(self, image):
-        try:
-            fb_image = np.array(image.convert('RGB')).astype('uint16')
-            fb_image = ((fb_image[:, :, 0] >> 3) << 11) | ((fb_image[:, :, 1] >> 2) << 5) | (fb_image[:, :, 2] >> 3)
-            with open("/dev/fb0", "wb") as fb:
-                fb.write(fb_image.tobytes())
+            if frame is None:
+                frame = to_rgb565(image)
+            self.framebuffer.present(frame, rects)
         except Exception:
             pass
 
+    def present_frame(self, frame, rects=None):
+        # готовый кадр RGB565 (страница телеметрии)
+        self.update_screen(None, frame, rects)
+
     def touch_listener_thread(self):
         last_x = None
         last_y = None
 
+        # ждём событий в epoll без таймаута: в простое поток не просыпается
+        poller = select.epoll()
+        poller.register(self.touch_device.fd, select.EPOLLIN)
+        poller.register(self._wake_r, select.EPOLLIN)
+
         while self.running and self.touch_device:
             try:
+                ready = poller.poll()
+                if not self.running or any(fd == self._wake_r for fd, _ in ready):
+                    break
                 events = self.touch_device.read()
                 if events:
                     touch_detected = False
@@ -296,9 +469,10 @@ class Menu:
                         last_x = None
                         last_y = None
             except BlockingIOError:
-                time.sleep(0.001)
+                continue
             except Exception:
                 time.sleep(0.1)
+        poller.close()
 
     def run(self):
         self.draw_motor_selection()
@@ -307,13 +481,37 @@ class Menu:
 
         while self.running:
             try:
-                last_touch = None
+                if self.redraw_needed.is_set():
+                    last_touch = None
+                elif self.is_in_diagnostics or self.calibrating or self.is_in_telemetry:
+                    # диагностика, ход калибровки и телеметрия обновляются по таймауту;
+                    # темп телеметрии задаёт сама страница
+                    if self.is_in_telemetry:
+                        refresh = min(self.telemetry.delay(), CALIBRATION_REFRESH)
+                    else:
+                        refresh = DIAGNOSTICS_REFRESH if self.is_in_diagnostics else CALIBRATION_REFRESH
+                    try:
+                        last_touch = self.touch_queue.get(timeout=refresh)
+                    except queue.Empty:
+                        last_touch = None
+                        if self.is_in_diagnostics:
+                            self.redraw_needed.set()
+                else:
+                    # блокирующее ожидание: тач или request_redraw()
+                    last_touch = self.touch_queue.get()
+                if self.calibrating:
+                    self.poll_calibration()
                 while not self.touch_queue.empty():
-                    last_touch = self.touch_queue.get_nowait()
+                    last_touch = self.touch_queue.get_nowait() or last_touch
                 if last_touch:
                     x, y = last_touch
                     self.process_touch(x, y)
-                time.sleep(0.01)
+                if self.redraw_needed.is_set():
+                    self.redraw_needed.clear()
+                    self.sync_settings()
+                    self.render_current()
+                elif self.is_in_telemetry:
+                    self.telemetry.tick(self.present_frame)
             except Exception:
                 pass
 
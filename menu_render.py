@@ -0,0 +1,152 @@
+import hashlib
+import os
+from collections import namedtuple
+
+import PIL
+from PIL import Image, ImageDraw
+
+# ===== РАЗМЕТКА =====
+# Одна таблица кнопок на экран: по ней рисуем и по ней же ищем касание.
+# label_dy — смещение подписи от центра кнопки, font — "large"/"medium"/"small".
+Button = namedtuple("Button", "action arg x y radius label label_dy font")
+
+def draw_centered_text(draw, x, y, text, font, fill):
+    try:
+        bbox = draw.textbbox((0, 0), text, font=font)
+        w = bbox[2] - bbox[0]
+    except AttributeError:
+        w, _ = draw.textsize(text, font=font)
+    draw.text((x - w // 2, y), text, font=font, fill=fill)
+
+# статичные слои переживают перезапуск: готовые RGB лежат в MENU_CACHE_DIR
+# под ключом от разметки, цветов, шрифтов и версии PIL; "" — без диска
+MENU_CACHE_DIR = os.environ.get("MENU_CACHE_DIR", "menu_cache")
+
+# ===== СПРАЙТЫ И СЛОИ =====
+class MenuRenderer:
+    # Градиент кнопки (radius эллипсов) рисуется один раз на радиус,
+    # статичный слой экрана (фон + кнопки + подписи) — один раз на разметку
+    # и сохраняется на диск: холодный запуск его уже не рисует. Дальше
+    # экраны собираются копией слоя и вставкой спрайтов.
+
+    OUTLINE = 5
+
+    def __init__(self, size, background, text_color, outline_color, fonts,
+                 cache_dir: str = MENU_CACHE_DIR):
+        self.size = size
+        self.background = background
+        self.text_color = text_color
+        self.outline_color = outline_color
+        self.fonts = fonts
+        self.cache_dir = cache_dir
+        self._sprites = {}
+        self._layers = {}
+
+    def sprite(self, radius: int):
+        sprite = self._sprites.get(radius)
+        if sprite is None:
+            pad = self.OUTLINE
+            side = 2 * (radius + pad) + 1
+            sprite = Image.new("RGBA", (side, side), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(sprite)
+            c = radius + pad
+            for i in range(radius):
+                shade = 150 + int(80 * i / radius)
+                draw.ellipse([c - radius + i, c - radius + i, c + radius - i, c + radius - i],
+                             fill=(shade, shade, shade, 255))
+            draw.ellipse([0, 0, side - 1, side - 1], outline=self.outline_color + (255,), width=3)
+            self._sprites[radius] = sprite
+        return sprite
+
+    def paste_button(self, image, x: int, y: int, radius: int):
+        sprite = self.sprite(radius)
+        offset = radius + self.OUTLINE
+        image.paste(sprite, (x - offset, y - offset), sprite)
+
+    def layer(self, name: str, buttons):
+        layer = self._layers.get(name)
+        if layer is None:
+            path = self._layer_path(name, buttons)
+            layer = self._load_layer(path) if path else None
+            if layer is None:
+                layer = Image.new("RGB", self.size, self.background)
+                draw = ImageDraw.Draw(layer)
+                for b in buttons:
+                    self.paste_button(layer, b.x, b.y, b.radius)
+                    draw_centered_text(draw, b.x, b.y + b.label_dy, b.label,
+                                       self.fonts[b.font], self.text_color)
+                if path:
+                    self._save_layer(path, layer)
+            self._layers[name] = layer
+        return layer
+
+    # ----- слои на диске -----
+    def _layer_path(self, name: str, buttons):
+        if not self.cache_dir:
+            return None
+        fonts = sorted((key, getattr(f, "path", None), getattr(f, "size", None))
+                       for key, f in self.fonts.items())
+        key = repr((PIL.__version__, self.size, self.background, self.text_color,
+                    self.outline_color, self.OUTLINE, fonts, tuple(buttons)))
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{name}-{digest}.rgb")
+
+    def _load_layer(self, path: str):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) != self.size[0] * self.size[1] * 3:
+            return None
+        return Image.frombytes("RGB", self.size, data)
+
+    def _save_layer(self, path: str, layer):
+        # без прав на каталог — просто рисуем при каждом запуске
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(layer.tobytes())
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def compose(self, name: str, buttons):
+        # копия статичного слоя — на неё дорисовывается только текст
+        return self.layer(name, buttons).copy()
+
+    def invalidate(self):
+        self._layers.clear()
+
+# ===== ПОИСК КАСАНИЯ =====
+class HitGrid:
+    # Сетка ячеек cell×cell: в каждой — кнопки, чей круг касания (радиус +
+    # допуск) её задевает, в порядке разметки (при перекрытии побеждает
+    # первая, как в прежней цепочке if/elif). Поиск — одна ячейка.
+
+    def __init__(self, buttons, width: int, height: int, tolerance: int, cell: int = 40):
+        self.cell = cell
+        self.cols = (width + cell - 1) // cell
+        self.rows = (height + cell - 1) // cell
+        self.cells = [[] for _ in range(self.cols * self.rows)]
+        for b in buttons:
+            reach = b.radius + tolerance
+            for row in range(max(0, (b.y - reach) // cell), min(self.rows - 1, (b.y + reach) // cell) + 1):
+                for col in range(max(0, (b.x - reach) // cell), min(self.cols - 1, (b.x + reach) // cell) + 1):
+                    self.cells[row * self.cols + col].append((b, reach * reach))
+
+    def lookup(self, x: int, y: int):
+        col = x // self.cell
+        row = y // self.cell
+        if not (0 <= col < self.cols and 0 <= row < self.rows):
+            return None
+        for b, reach2 in self.cells[row * self.cols + col]:
+            dx = x - b.x
+            dy = y - b.y
+            if dx * dx + dy * dy < reach2:
+                return b
+        return None
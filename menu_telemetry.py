@@ -0,0 +1,231 @@
+import os
+import time
+
+from PIL import ImageDraw
+
+import axes
+import stats
+from channel_map import SIGNAL_CHANNEL, SIGNAL_MIN
+from framebuffer import rgb565, to_rgb565
+from menu_render import draw_centered_text
+
+# ===== СТРАНИЦА ТЕЛЕМЕТРИИ =====
+# Живая страница меню: позиция и цель каждой оси полосами, связь по каналу 6,
+# частота кадров пульта. Статика (фон, кнопка, подписи, рамки полос)
+# рисуется PIL один раз и хранится уже в RGB565. На кадр перерисовываются
+# только изменившиеся виджеты: полосы — заливкой срезов numpy прямо в RGB565
+# (сравниваются позиции в пикселях, не в шагах), строки текста — PIL по
+# своему прямоугольнику и не чаще TEXT_REFRESH. На экран копируются только
+# их прямоугольники.
+# Своё время страница ограничивает сама: не чаще TELEMETRY_FPS, доля CPU
+# потока меню на кадры — не больше TELEMETRY_CPU (дорогой кадр отодвигает
+# следующий), а пока цикл шагов опаздывает больше TELEMETRY_LAG_US, кадры
+# пропускаются.
+
+TELEMETRY_FPS = float(os.environ.get("TELEMETRY_FPS", 25))
+TELEMETRY_CPU = float(os.environ.get("TELEMETRY_CPU", 0.1))
+TELEMETRY_LAG_US = int(os.environ.get("TELEMETRY_LAG_US", 1000))
+TEXT_REFRESH = 0.25  # с между проверками строк текста
+RATE_WINDOW = 1.0    # с, окно подсчёта частот
+
+POSITION_COLOR = (0, 200, 120)
+TARGET_COLOR = (255, 200, 0)
+TRACK_COLOR = (255, 255, 255)
+ZERO_COLOR = (150, 150, 150)
+
+# разметка 800×480: полосы над кнопкой «назад», строки текста справа от неё
+LABEL_X = 100
+BAR_X0, BAR_X1 = 200, 780
+ROWS_Y0, ROWS_Y1 = 60, 290
+BAR_HEIGHT = 30
+TEXT_X0, TEXT_X1 = 220, 780
+TEXT_Y0, TEXT_LINE = 320, 45
+TEXT_LINES = 3
+
+def _bar_rows(count: int):
+    pitch = (ROWS_Y1 - ROWS_Y0) // max(count, 1)
+    height = min(BAR_HEIGHT, pitch - 6)
+    return [ROWS_Y0 + i * pitch + (pitch - height) // 2 for i in range(count)], height
+
+class TelemetryPage:
+    # positions(), targets() — по осям; channels() — последний кадр пульта
+    # или None; motion_lag() — опоздание цикла шагов, нс (step_loop.lag_ns,
+    # MotionCore.lag_ns); store — SettingsStore: из снимка берётся ход осей
+
+    def __init__(self, renderer, buttons, font, positions, targets, channels, motion_lag, store):
+        self.renderer = renderer
+        self.buttons = buttons
+        self.font = font
+        self.positions = positions
+        self.targets = targets
+        self.channels = channels
+        self.motion_lag = motion_lag
+        self.store = store
+        self.period = 1.0 / TELEMETRY_FPS
+        self.lag_limit_ns = TELEMETRY_LAG_US * 1000
+        self.tops, self.bar_height = _bar_rows(axes.COUNT)
+        self.text_rects = [(TEXT_X0, TEXT_Y0 + n * TEXT_LINE, TEXT_X1, TEXT_Y0 + (n + 1) * TEXT_LINE - 5)
+                           for n in range(TEXT_LINES)]
+        self.position_565 = rgb565(POSITION_COLOR)
+        self.target_565 = rgb565(TARGET_COLOR)
+        self._snapshot = None
+        self.base_image = None
+        self.base = None
+        self.frame = None
+        self.due = 0.0
+        self.frames = 0
+        self.skipped = 0      # цикл шагов опаздывал
+        self.stretched = 0    # кадр дороже бюджета CPU — следующий позже
+        self.max_frame_us = 0
+        self.rc_rate = None
+        self.page_rate = None
+        self._window = None
+        stats.register("telemetry", self.snapshot)
+
+    # ----- статичный слой -----
+    def _layout(self):
+        # ход осей из снимка настроек; при правке — новый статичный слой
+        snapshot = self.store.snapshot
+        if snapshot is self._snapshot:
+            return False
+        self._snapshot = snapshot
+        self.limits = []
+        for axis, cfg in zip(axes.TABLE, snapshot.axes):
+            lo, hi = (axes.resolve(spec, cfg) for spec in axis["travel"])
+            self.limits.append((lo, hi if hi > lo else lo + 1))
+        self.zero_x = [self._x(i, 0) for i in range(axes.COUNT)]
+
+        image = self.renderer.compose("telemetry", self.buttons)
+        draw = ImageDraw.Draw(image)
+        draw_centered_text(draw, self.renderer.size[0] // 2, 15, "Телеметрия",
+                           self.renderer.fonts["medium"], self.renderer.text_color)
+        h = self.bar_height
+        for i, (axis, top) in enumerate(zip(axes.TABLE, self.tops)):
+            draw_centered_text(draw, LABEL_X, top + (h - 24) // 2, axis["label"], self.font,
+                               self.renderer.text_color)
+            draw.rectangle([BAR_X0, top, BAR_X1 - 1, top + h - 1], outline=TRACK_COLOR)
+            draw.line([self.zero_x[i], top + 1, self.zero_x[i], top + h - 2], fill=ZERO_COLOR)
+        self.base_image = image
+        self.base = to_rgb565(image)
+        return True
+
+    def _x(self, i: int, value: int) -> int:
+        lo, hi = self.limits[i]
+        x0, x1 = BAR_X0 + 1, BAR_X1 - 2
+        x = x0 + (value - lo) * (x1 - x0) // (hi - lo)
+        return x0 if x < x0 else x1 if x > x1 else x
+
+    # ----- виджеты -----
+    def _paint_bar(self, i: int, pos_x: int, target_x: int):
+        frame = self.frame
+        top = self.tops[i]
+        y0, y1 = top + 1, top + self.bar_height - 1
+        x0, x1 = BAR_X0 + 1, BAR_X1 - 1
+        frame[y0:y1, x0:x1] = self.base[y0:y1, x0:x1]
+        zero = self.zero_x[i]
+        a, b = (zero, pos_x) if zero <= pos_x else (pos_x, zero)
+        frame[y0 + 4:y1 - 4, a:b + 1] = self.position_565
+        frame[y0:y1, max(x0, target_x - 1):min(x1, target_x + 2)] = self.target_565
+        return (x0, y0, x1, y1)
+
+    def _paint_text(self, n: int, text: str):
+        rect = self.text_rects[n]
+        x0, y0, x1, y1 = rect
+        crop = self.base_image.crop(rect)
+        ImageDraw.Draw(crop).text((0, 5), text, font=self.font, fill=self.renderer.text_color)
+        self.frame[y0:y1, x0:x1] = to_rgb565(crop)
+        return rect
+
+    def _texts(self):
+        rc = stats.read("rc")
+        channels = self.channels()
+        if rc is None:
+            link = "Связь: приёмника нет"
+        elif channels is None or self.rc_rate == 0:
+            link = "Связь: кадров нет"
+        else:
+            value = channels[SIGNAL_CHANNEL]
+            state = "есть" if value >= SIGNAL_MIN else "нет"
+            link = f"Связь: {state} (канал {SIGNAL_CHANNEL}: {value})"
+        rate = "-" if self.rc_rate is None else f"{self.rc_rate:.0f}"
+        protocol = rc["protocol"] if rc is not None else ""
+        page = "-" if self.page_rate is None else f"{self.page_rate:.0f}"
+        return (link, f"Пульт {protocol}: {rate} кадров/с",
+                f"Экран: {page} к/с, пропущено {self.skipped}")
+
+    def _rates(self, now: float):
+        rc = stats.read("rc")
+        frames_ok = rc["frames_ok"] if rc is not None else 0
+        if self._window is not None:
+            start, drawn, received = self._window
+            dt = now - start
+            if dt < RATE_WINDOW:
+                return
+            self.page_rate = (self.frames - drawn) / dt
+            self.rc_rate = (frames_ok - received) / dt
+        self._window = (now, self.frames, frames_ok)
+
+    def render(self, now: float):
+        # перерисовка изменившихся виджетов; -> их прямоугольники
+        rects = []
+        if self._layout():
+            self.frame = self.base.copy()
+            self._drawn = [None] * axes.COUNT
+            self._shown_texts = [None] * TEXT_LINES
+            self._text_due = 0.0
+        x = self._x
+        for i, (p, t) in enumerate(zip(self.positions(), self.targets())):
+            key = (x(i, p), x(i, t))
+            if key != self._drawn[i]:
+                self._drawn[i] = key
+                rects.append(self._paint_bar(i, *key))
+        if now >= self._text_due:
+            self._text_due = now + TEXT_REFRESH
+            self._rates(now)
+            for n, text in enumerate(self._texts()):
+                if text != self._shown_texts[n]:
+                    self._shown_texts[n] = text
+                    rects.append(self._paint_text(n, text))
+        self.frames += 1
+        return rects
+
+    # ----- темп -----
+    def show(self, present):
+        # вход на страницу: новый кадр целиком, все виджеты заново
+        self._snapshot = None
+        self._window = None
+        self.rc_rate = self.page_rate = None
+        now = time.monotonic()
+        self.render(now)
+        present(self.frame, None)
+        self.due = now + self.period
+
+    def delay(self) -> float:
+        return max(0.0, self.due - time.monotonic())
+
+    def tick(self, present):
+        # очередной кадр, если пора и цикл шагов успевает
+        now = time.monotonic()
+        if now < self.due:
+            return
+        if self.motion_lag() > self.lag_limit_ns:
+            self.skipped += 1
+            self.due = now + self.period
+            return
+        cpu = time.thread_time()
+        frame = self.frame
+        rects = self.render(now)
+        if rects:
+            # слой сменился (правка хода) — кадр новый, копируется целиком
+            present(self.frame, rects if self.frame is frame else None)
+        cost = time.thread_time() - cpu
+        self.max_frame_us = max(self.max_frame_us, int(cost * 1e6))
+        interval = self.period
+        if cost > interval * TELEMETRY_CPU:
+            interval = cost / TELEMETRY_CPU
+            self.stretched += 1
+        self.due = max(self.due + self.period, now + interval)
+
+    def snapshot(self):
+        return {"frames": self.frames, "skipped": self.skipped, "stretched": self.stretched,
+                "max_frame_us": self.max_frame_us}
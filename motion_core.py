@@ -0,0 +1,333 @@
+import multiprocessing
+import os
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+import axes
+import motion_trace
+import stats
+import step_loop
+
+# ===== ОБЩАЯ ПАМЯТЬ =====
+# Каждый блок пишет ровно одна сторона и защищает его счётчиком (seqlock):
+# нечётный seq — идёт запись, читатель повторяет попытку. В родителе пишут
+# несколько потоков (приёмник, меню, API) — по очереди, под одним замком.
+# Писатель, умерший посреди записи, оставляет seq нечётным навсегда: после
+# READ_SPINS попыток читатель проверяет, жив ли он.
+# Команды — кольцо на COMMAND_SLOTS: родитель пишет слот и сдвигает голову,
+# ядро выполняет всё до головы и пишет в ACK, сколько выполнено. Две команды
+# до опроса ядра не затирают друг друга.
+AXES = axes.COUNT
+COMMAND_SLOTS = 16
+COMMAND_WAIT = 1.0  # с, ожидание свободного слота, пока ядро живо
+READ_SPINS = 10000
+# по оси: скорость, ускорение, до двух ключей хода из таблицы осей, рывок
+SETTING_FIELDS = ("speed", "acceleration", "travel0", "travel1", "jerk")
+TRAVEL_KEYS = [axes.travel_keys(axis) for axis in axes.TABLE]
+
+_seq = struct.Struct("<Q")
+_axes = struct.Struct(f"<{AXES}q")
+_settings = struct.Struct(f"<{AXES * len(SETTING_FIELDS)}d")
+_command = struct.Struct("<qq")
+_homing = struct.Struct(f"<{2 + AXES}q")  # motor_control.homing_state()
+_channels = struct.Struct(f"<{motion_trace.CHANNELS}H")
+
+TARGETS_OFF   = 0                                   # пишет родитель
+POSITIONS_OFF = TARGETS_OFF + 8 + _axes.size        # пишет ядро
+SETTINGS_OFF  = POSITIONS_OFF + 8 + _axes.size      # пишет родитель
+COMMAND_OFF   = SETTINGS_OFF + 8 + _settings.size   # пишет родитель: голова кольца, слоты
+ACK_OFF       = COMMAND_OFF + 8 + COMMAND_SLOTS * _command.size  # пишет ядро: выполнено команд
+HEARTBEAT_OFF = ACK_OFF + 8                         # пишет ядро: monotonic_ns
+DUE_OFF       = HEARTBEAT_OFF + 8                   # пишет ядро: срок ближайшего шага (0 — стоят)
+HOMING_OFF    = DUE_OFF + 8                         # пишет ядро: ход калибровки
+STOP_OFF      = HOMING_OFF + 8 + _homing.size       # пишет родитель
+CHANNELS_OFF  = STOP_OFF + 8                        # пишет родитель: кадр для записи движения
+LAYOUT_SIZE   = CHANNELS_OFF + 8 + _channels.size
+
+COMMANDS = {"rezero": 1, "calibrate": 2}
+COMMAND_NAMES = {code: name for name, code in COMMANDS.items()}
+
+class WriterGone(RuntimeError):
+    # вторая сторона умерла, блок недописан
+    pass
+
+def _command_slot(n: int) -> int:
+    return COMMAND_OFF + 8 + (n % COMMAND_SLOTS) * _command.size
+
+def _write_block(buf, off: int, packer, values):
+    seq = _seq.unpack_from(buf, off)[0] + 1
+    _seq.pack_into(buf, off, seq)
+    packer.pack_into(buf, off + 8, *values)
+    _seq.pack_into(buf, off, seq + 1)
+
+def _read_block(buf, off: int, packer, alive=None):
+    # alive() — жив ли писатель блока
+    spins = 0
+    while True:
+        seq = _seq.unpack_from(buf, off)[0]
+        if not seq & 1:
+            values = packer.unpack_from(buf, off + 8)
+            if _seq.unpack_from(buf, off)[0] == seq:
+                return seq, values
+        spins += 1
+        if spins >= READ_SPINS:
+            if alive is not None and not alive():
+                raise WriterGone(f"блок {off}: писатель умер посреди записи")
+            spins = 0
+            time.sleep(0)  # на одном CPU писатель не допишет, пока мы крутимся
+
+def _block_seq(buf, off: int) -> int:
+    return _seq.unpack_from(buf, off)[0]
+
+def pack_settings(settings):
+    values = []
+    for cfg, keys in zip(settings[:AXES], TRAVEL_KEYS):
+        values.append(float(cfg["speed"]))
+        values.append(float(cfg["acceleration"]))
+        travel = [float(cfg[key]) for key in keys]
+        values.extend(travel + [0.0] * (2 - len(travel)))
+        values.append(float(cfg.get("jerk", 0)))
+    return values
+
+def unpack_settings(values):
+    settings = []
+    n = len(SETTING_FIELDS)
+    for i, keys in enumerate(TRAVEL_KEYS):
+        speed, accel, travel0, travel1, jerk = values[i * n:(i + 1) * n]
+        cfg = {"speed": int(speed), "acceleration": int(accel)}
+        for key, value in zip(keys, (travel0, travel1)):
+            cfg[key] = int(value)
+        if jerk:
+            cfg["jerk"] = int(jerk)
+        settings.append(cfg)
+    return settings
+
+# ===== ЯДРО (дочерний процесс) =====
+def _isolate(cpu, rt_priority: int):
+    # isolcpus=N в cmdline + SCHED_FIFO; без прав — работаем как есть
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except OSError:
+            pass
+    if rt_priority:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(rt_priority))
+        except (OSError, AttributeError):
+            pass
+
+def _core_main(buf, backend_name, cpu, rt_priority, trace_path, waker):
+    import motor_control
+    _isolate(cpu, rt_priority)
+    motor_control.init_backend(backend_name)
+    # запись движения — здесь же, где шаги; каналы берутся из общей памяти
+    recorder = motion_trace.open_trace(trace_path) if trace_path else None
+
+    targets = motor_control.target_positions
+    positions = motor_control.positions
+    targets_seq = settings_seq = -1
+    done = _block_seq(buf, ACK_OFF)
+    parent = os.getppid()
+    parent_alive = lambda: os.getppid() == parent
+    published = None
+    homing = None
+    # у ядра свои счётчики — и свой сокет рядом с основным
+    server = stats.serve(stats.STATS_SOCKET + ".core")
+    period = stats.STEP_LOOP_PERIOD
+    # спит до дедлайна или до пробуждения от родителя (пайп создан до fork)
+    adaptive = step_loop.STEP_WAIT == "adaptive"
+    waiter = step_loop.DeadlineWaiter(waker)
+    stats.register("step_wait", waiter.snapshot)
+    if adaptive:
+        step_loop.tighten_timer_slack()
+    last = time.monotonic_ns()
+    try:
+        while not _seq.unpack_from(buf, STOP_OFF)[0]:
+            now = time.monotonic_ns()
+            period.record_ns(now - last)
+            last = now
+            if _block_seq(buf, TARGETS_OFF) != targets_seq:
+                targets_seq, values = _read_block(buf, TARGETS_OFF, _axes, parent_alive)
+                targets[:] = values
+            if _block_seq(buf, SETTINGS_OFF) != settings_seq:
+                settings_seq, values = _read_block(buf, SETTINGS_OFF, _settings, parent_alive)
+                motor_control.update_motor_settings(unpack_settings(values))
+            head = _block_seq(buf, COMMAND_OFF)
+            while done < head:
+                code, arg = _command.unpack_from(buf, _command_slot(done))
+                step_loop.run_command(motor_control, COMMAND_NAMES.get(code, ""), arg)
+                done += 1
+                _seq.pack_into(buf, ACK_OFF, done)
+
+            motor_control.step_all()
+            if recorder is not None and now >= recorder.due:
+                recorder.sample(motor_control, now, _read_block(buf, CHANNELS_OFF, _channels, parent_alive)[1])
+
+            if positions != published:
+                published = list(positions)
+                _write_block(buf, POSITIONS_OFF, _axes, published)
+            if motor_control.homing_active or homing is None or homing[0]:
+                state = motor_control.homing_state()
+                if state != homing:
+                    homing = state
+                    _write_block(buf, HOMING_OFF, _homing, state)
+            _seq.pack_into(buf, HEARTBEAT_OFF, time.monotonic_ns())
+            _seq.pack_into(buf, DUE_OFF, motor_control.next_due_ns() or 0)
+            if adaptive:
+                waiter.wait(motor_control, recorder.due if recorder is not None else None)
+            else:
+                step_loop.wait_until_due(motor_control)
+    finally:
+        if server is not None:
+            server.close()
+        if recorder is not None:
+            recorder.close()
+        motor_control.cleanup()
+
+# ===== ИНТЕРФЕЙС ДЛЯ main =====
+class MotionCore:
+    # Генератор шагов в отдельном процессе на выделенном ядре. Снаружи
+    # выглядит как SetpointMailbox (publish/rezero/calibrate), поэтому
+    # приёмник работает с ним без изменений. После stop() запись ничего не
+    # делает, чтение отдаёт последнее прочитанное.
+
+    def __init__(self, settings, backend=None, cpu=None, rt_priority=50, trace_path=None):
+        self.backend = backend
+        self.cpu = cpu
+        self.rt_priority = rt_priority
+        self.trace_path = trace_path  # кольцо motion_trace пишет ядро
+        self.waker = step_loop.Waker()  # будит ядро на новых целях и командах
+        self._published = None
+        self._lock = threading.Lock()  # один писатель на блок среди потоков
+        self._last = {}  # смещение блока -> последние прочитанные значения
+        self.channels = None  # последний кадр каналов, как у SetpointMailbox
+        self.shm = shared_memory.SharedMemory(create=True, size=LAYOUT_SIZE)
+        self.buf = self.shm.buf
+        self.buf[:LAYOUT_SIZE] = bytes(LAYOUT_SIZE)
+        self.update_settings(settings)
+        self.process = None
+
+    def start(self):
+        # fork до запуска остальных потоков: spawn заново импортировал бы main
+        ctx = multiprocessing.get_context("fork")
+        self.process = ctx.Process(target=_core_main, name="motion-core", daemon=True,
+                                   args=(self.buf, self.backend, self.cpu, self.rt_priority,
+                                         self.trace_path, self.waker))
+        self.process.start()
+        return self
+
+    def publish(self, targets, channels=None):
+        values = [int(t) for t in targets[:AXES]]
+        with self._lock:
+            buf = self.buf
+            if buf is None:
+                return
+            _write_block(buf, TARGETS_OFF, _axes, values)
+            if channels is not None:
+                self.channels = channels
+                if self.trace_path:
+                    _write_block(buf, CHANNELS_OFF, _channels, channels)
+        if values != self._published:
+            self._published = values
+            self.waker.wake()
+
+    def update_settings(self, settings):
+        values = pack_settings(settings)
+        with self._lock:
+            if self.buf is None:
+                return
+            _write_block(self.buf, SETTINGS_OFF, _settings, values)
+        self.waker.wake()
+
+    def command(self, name: str, arg: int = 0) -> int:
+        # -> номер команды для command_done(); слот пишется до сдвига
+        # головы, поэтому ядро читает его целым
+        code = COMMANDS[name]
+        with self._lock:
+            buf = self.buf
+            if buf is None:
+                return 0
+            head = _block_seq(buf, COMMAND_OFF)
+            deadline = time.monotonic() + COMMAND_WAIT
+            while head - _block_seq(buf, ACK_OFF) >= COMMAND_SLOTS:
+                if not self.is_alive() or time.monotonic() > deadline:
+                    raise WriterGone("ядро движения не забирает команды")
+                time.sleep(0.001)
+            _command.pack_into(buf, _command_slot(head), code, arg)
+            _seq.pack_into(buf, COMMAND_OFF, head + 1)
+        self.waker.wake()
+        return head + 1
+
+    def rezero(self, axis: int):
+        return self.command("rezero", axis)
+
+    def calibrate(self):
+        return self.command("calibrate")
+
+    def command_done(self, seq: int) -> bool:
+        return self._word(ACK_OFF) >= seq
+
+    def _word(self, off: int) -> int:
+        buf = self.buf
+        if buf is None:
+            return 0
+        try:
+            return _seq.unpack_from(buf, off)[0]
+        except ValueError:  # stop() освободил память между проверкой и чтением
+            return 0
+
+    def _read(self, off: int, packer):
+        # ядро умерло посреди записи или уже остановлено — последнее прочитанное
+        buf = self.buf
+        if buf is not None:
+            try:
+                self._last[off] = _read_block(buf, off, packer, self.is_alive)[1]
+            except (WriterGone, ValueError):
+                pass
+        values = self._last.get(off)
+        return values if values is not None else packer.unpack(bytes(packer.size))
+
+    def positions(self):
+        return self._read(POSITIONS_OFF, _axes)
+
+    def targets(self):
+        return self._read(TARGETS_OFF, _axes)
+
+    def homing_status(self):
+        import motor_control
+        return motor_control.describe_homing(self._read(HOMING_OFF, _homing))
+
+    def heartbeat_age_ns(self) -> int:
+        return time.monotonic_ns() - self._word(HEARTBEAT_OFF)
+
+    def lag_ns(self) -> int:
+        # как step_loop.lag_ns: срок шага, записанный ядром, уже прошёл
+        due = self._word(DUE_OFF)
+        if not due:
+            return 0
+        return max(0, time.monotonic_ns() - due)
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def stop(self, timeout: float = 2.0):
+        with self._lock:
+            if self.buf is None:
+                return
+            _seq.pack_into(self.buf, STOP_OFF, 1)
+        self.waker.wake()
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout)
+            self.process = None
+        # последнее состояние — для тех, кто спросит после остановки
+        for off, packer in ((POSITIONS_OFF, _axes), (TARGETS_OFF, _axes), (HOMING_OFF, _homing)):
+            self._read(off, packer)
+        with self._lock:
+            self.buf = None
+        self.shm.close()
+        self.shm.unlink()
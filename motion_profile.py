@@ -0,0 +1,171 @@
+import math
+from array import array
+
+NS_PER_S = 1_000_000_000
+
+# ===== РАМПЫ РАЗГОНА =====
+# Рампа — таблица интервалов (нс) между шагами при разгоне с места:
+# ramp[n] — пауза после шага, сделанного на «уровне скорости» n.
+# Торможение — та же таблица в обратном порядке, поэтому её хватает
+# и для разгона, и для остановки, и для смены цели на ходу.
+
+def trapezoid_ramp(max_pps: float, accel_pps2: float, min_interval_ns: int):
+    # без разгона ось не едет (cruise None), а не срывается сразу на крейсер
+    cruise_ns = cruise_interval_ns(max_pps, min_interval_ns)
+    ramp = array('q')
+    if accel_pps2 <= 0 or cruise_ns is None:
+        return ramp, None
+    # s(t) = a*t^2/2  ->  шаг k приходится на t_k = sqrt(2k/a)
+    k2a = 2.0 / accel_pps2
+    prev_t = 0.0
+    k = 1
+    while True:
+        t = math.sqrt(k * k2a)
+        interval = int((t - prev_t) * NS_PER_S)
+        if interval <= cruise_ns:
+            break
+        ramp.append(interval)
+        prev_t = t
+        k += 1
+    return ramp, cruise_ns
+
+def scurve_ramp(max_pps: float, accel_pps2: float, jerk_pps3: float, min_interval_ns: int):
+    if jerk_pps3 <= 0:
+        return trapezoid_ramp(max_pps, accel_pps2, min_interval_ns)
+    cruise_ns = cruise_interval_ns(max_pps, min_interval_ns)
+    ramp = array('q')
+    if accel_pps2 <= 0 or cruise_ns is None:
+        return ramp, None
+    v_max = NS_PER_S / cruise_ns
+
+    # фазы: нарастание ускорения (T1), постоянное ускорение (T2), спад (T1)
+    if v_max >= accel_pps2 * accel_pps2 / jerk_pps3:
+        t1 = accel_pps2 / jerk_pps3
+        a_peak = accel_pps2
+        t2 = (v_max - a_peak * t1) / a_peak
+    else:
+        t1 = math.sqrt(v_max / jerk_pps3)
+        a_peak = jerk_pps3 * t1
+        t2 = 0.0
+    j = jerk_pps3
+    v1 = j * t1 * t1 / 2
+    s1 = j * t1 ** 3 / 6
+    v2 = v1 + a_peak * t2
+    s2 = s1 + v1 * t2 + a_peak * t2 * t2 / 2
+    ta, tb = t1, t1 + t2
+    t_end = tb + t1
+
+    def pos_vel(t):
+        if t <= ta:
+            return j * t ** 3 / 6, j * t * t / 2
+        if t <= tb:
+            u = t - ta
+            return s1 + v1 * u + a_peak * u * u / 2, v1 + a_peak * u
+        u = min(t, t_end) - tb
+        return (s2 + v2 * u + a_peak * u * u / 2 - j * u ** 3 / 6,
+                v2 + a_peak * u - j * u * u / 2)
+
+    s_end = pos_vel(t_end)[0]
+    # первый шаг — точно в фазе нарастания, дальше Ньютон от предыдущего
+    prev_t = 0.0
+    t = (6.0 / j) ** (1.0 / 3.0)
+    k = 1
+    while k < s_end:
+        for _ in range(8):
+            s, v = pos_vel(t)
+            if v <= 0:
+                break
+            dt = (s - k) / v
+            t -= dt
+            if abs(dt) < 1e-9:
+                break
+        interval = int((t - prev_t) * NS_PER_S)
+        if interval <= cruise_ns:
+            break
+        ramp.append(interval)
+        v = pos_vel(t)[1]
+        prev_t = t
+        t += 1.0 / v if v > 0 else 1e-3
+        k += 1
+    return ramp, cruise_ns
+
+def cruise_interval_ns(max_pps: float, min_interval_ns: int):
+    if max_pps <= 0:
+        return None
+    return max(int(NS_PER_S / max_pps), min_interval_ns)
+
+# ===== ПЛАН ДВИЖЕНИЯ =====
+
+class MotionPlan:
+    # interval(k) — пауза после шага k; направление меняется на шаге flip.
+    # План — только участки (start, n, d): паузы берутся из рампы по уровню
+    # шага в цикле шагов, массив на каждую смену цели не строится.
+    __slots__ = ("ramp", "cruise_ns", "direction", "flip", "target", "_legs", "_len")
+
+    def __init__(self, ramp, cruise_ns, direction, flip, target, legs):
+        self.ramp = ramp
+        self.cruise_ns = cruise_ns
+        self.direction = direction
+        self.flip = flip
+        self.target = target
+        self._legs = legs
+        start, _, d = legs[-1]
+        self._len = start + d
+
+    def __len__(self):
+        return self._len
+
+    def interval(self, index: int) -> int:
+        # то же, что level_at, но без второго вызова: это каждый шаг
+        for start, n, d in self._legs:
+            if index < start + d:
+                k = index - start
+                if n < 0:
+                    level = -n - 1 - k
+                else:
+                    level = n + k
+                    if level > d - 1 - k:
+                        level = d - 1 - k
+                ramp = self.ramp
+                # уровни за рампой — крейсер
+                return ramp[level] if level < len(ramp) else self.cruise_ns
+        return self.cruise_ns
+
+    def level_at(self, index: int) -> int:
+        # уровень скорости, на котором будет сделан шаг index
+        for start, n, d in self._legs:
+            if index < start + d:
+                k = index - start
+                if n < 0:
+                    return -n - 1 - k  # чистое торможение
+                return min(n + k, d - 1 - k)
+        return 0
+
+def plan_move(ramp, cruise_ns: int, position: int, target: int,
+              direction: int = 0, level: int = 0):
+    # direction/level — текущее движение мотора (0/0 — стоит на месте)
+    if cruise_ns is None or target == position and level == 0:
+        return None
+    delta = target - position
+    # уровни выше рампы — это уже крейсер, тормозить с них столько же
+    level = min(level, len(ramp))
+    if level == 0 or direction == 0:
+        d = abs(delta)
+        if d == 0:
+            return None
+        sign = 1 if delta > 0 else -1
+        return MotionPlan(ramp, cruise_ns, sign, -1, target, ((0, 0, d),))
+
+    ahead = delta * direction
+    if ahead >= level + 1:
+        # успеваем затормозить в цель — продолжаем с текущего уровня
+        return MotionPlan(ramp, cruise_ns, direction, -1, target,
+                          ((0, level, ahead),))
+
+    # цель позади или слишком близко: тормозим с перебегом и возвращаемся
+    back = level - ahead
+    legs = [(0, -level, level)]
+    if back > 0:
+        legs.append((level, 0, back))
+    return MotionPlan(ramp, cruise_ns, direction, level if back > 0 else -1,
+                      target, tuple(legs))
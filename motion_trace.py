@@ -0,0 +1,224 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+import axes as axis_table
+
+# ===== ЗАПИСЬ ДВИЖЕНИЯ =====
+# Кольцо фиксированного размера в файле, отображённом в память: цикл шагов
+# с частотой TRACE_HZ кладёт туда упакованную запись (время, позиции, цели,
+# скорости осей, сырые каналы) — одна pack_into в готовый буфер, без
+# объектов на отсчёт. Страницы пишет ядро ОС: падение процесса запись не
+# теряет, от пропажи питания — fdatasync раз в TRACE_SYNC_S в своём потоке.
+# Прежнее кольцо при запуске уходит в path.prev — то, что было до сбоя.
+
+TRACE_FILE = os.environ.get("TRACE_FILE", "motion_trace.ring")  # пусто — выключено
+TRACE_HZ = float(os.environ.get("TRACE_HZ", 100))
+TRACE_RECORDS = int(os.environ.get("TRACE_RECORDS", 65536))
+TRACE_SYNC_S = float(os.environ.get("TRACE_SYNC_S", 1.0))
+
+AXES = axis_table.COUNT
+CHANNELS = 14
+MAGIC = b"MTRACE01"
+
+# магия, размер записи, ёмкость, осей, каналов, time_ns и monotonic_ns открытия
+_header = struct.Struct("<8sIIIIQQ")
+_head = struct.Struct("<Q")  # сколько записей сделано всего
+HEAD_OFF = _header.size
+DATA_OFF = 64
+def _record_struct(axes: int, channels: int):
+    # t_ns, позиции, цели, скорости (шаг/с со знаком), каналы
+    return struct.Struct(f"<Q{axes}i{axes}i{axes}i{channels}H")
+
+_record = _record_struct(AXES, CHANNELS)
+NO_CHANNELS = (0,) * CHANNELS
+
+class TraceRecorder:
+    __slots__ = ("path", "capacity", "period_ns", "due", "head", "_fd", "_mm", "_sync")
+
+    def __init__(self, path: str = TRACE_FILE, hz: float = TRACE_HZ, records: int = TRACE_RECORDS,
+                 sync_s: float = TRACE_SYNC_S):
+        self.path = path
+        self.capacity = records
+        self.period_ns = int(1e9 / hz)
+        self.due = 0
+        self.head = 0
+        if os.path.exists(path):
+            os.replace(path, path + ".prev")
+        size = DATA_OFF + records * _record.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self._fd, size)
+        self._mm = mmap.mmap(self._fd, size)
+        _header.pack_into(self._mm, 0, MAGIC, _record.size, records, AXES, CHANNELS,
+                          time.time_ns(), time.monotonic_ns())
+        self._sync = None
+        if sync_s > 0:
+            self._sync = threading.Thread(target=self._sync_loop, args=(sync_s,),
+                                          name="trace-sync", daemon=True)
+            self._sync.start()
+
+    def record(self, now: int, positions, targets, speeds, channels):
+        # запись кладётся до сдвига head: недописанная при сбое — за head
+        head = self.head
+        _record.pack_into(self._mm, DATA_OFF + (head % self.capacity) * _record.size,
+                          now, *positions, *targets, *speeds, *channels)
+        self.head = head + 1
+        _head.pack_into(self._mm, HEAD_OFF, head + 1)
+        self.due = now + self.period_ns
+
+    def sample(self, motor_control, now: int, channels=None):
+        # из цикла шагов: if now >= recorder.due
+        self.record(now, motor_control.positions, motor_control.target_positions,
+                    motor_control.current_speeds(), channels or NO_CHANNELS)
+
+    def _sync_loop(self, sync_s: float):
+        # fdatasync отпускает GIL и сбрасывает и страницы mmap (mmap.flush — нет)
+        while self._mm is not None:
+            time.sleep(sync_s)
+            try:
+                os.fdatasync(self._fd)
+            except (OSError, ValueError):
+                return
+
+    def close(self):
+        mm, self._mm = self._mm, None
+        if mm is None:
+            return
+        mm.flush()
+        mm.close()
+        os.close(self._fd)
+
+def open_trace(path: str = TRACE_FILE):
+    # TRACE_FILE пустой или каталог недоступен — живём без записи
+    if not path:
+        return None
+    try:
+        return TraceRecorder(path)
+    except (OSError, ValueError):
+        return None
+
+# ===== РАЗБОР =====
+def read_header(data):
+    magic, record_size, capacity, axes, channels, time_ns, monotonic_ns = _header.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("не запись движения")
+    return {"record_size": record_size, "capacity": capacity, "axes": axes, "channels": channels,
+            "time_ns": time_ns, "monotonic_ns": monotonic_ns,
+            "head": _head.unpack_from(data, HEAD_OFF)[0]}
+
+def _ordered_slots(header):
+    # от старых к новым; после переполнения слот head % capacity мог быть
+    # недописан в момент сбоя — его пропускаем
+    head, capacity = header["head"], header["capacity"]
+    if head < capacity:
+        return list(range(head))
+    start = head % capacity
+    return list(range(start + 1, capacity)) + list(range(start))
+
+def read_records(path: str):
+    # (t_ns, позиции, цели, скорости, каналы) кортежами, без numpy; число
+    # осей — из заголовка, а не из текущей таблицы осей
+    with open(path, "rb") as f:
+        data = f.read()
+    header = read_header(data)
+    n = header["axes"]
+    record = _record_struct(n, header["channels"])
+    if header["record_size"] != record.size:
+        raise ValueError("другой формат записи")
+    records = []
+    for slot in _ordered_slots(header):
+        values = record.unpack_from(data, DATA_OFF + slot * record.size)
+        if values[0] == 0:
+            continue  # страница не дошла до диска
+        records.append((values[0], values[1:1 + n], values[1 + n:1 + 2 * n],
+                        values[1 + 2 * n:1 + 3 * n], values[1 + 3 * n:]))
+    return header, records
+
+def load(path: str):
+    # структурированный массив numpy: t_ns, position, target, speed, channels
+    import numpy as np
+    with open(path, "rb") as f:
+        data = f.read()
+    header = read_header(data)
+    n, channels = header["axes"], header["channels"]
+    dtype = np.dtype([("t_ns", "<u8"), ("position", "<i4", (n,)), ("target", "<i4", (n,)),
+                      ("speed", "<i4", (n,)), ("channels", "<u2", (channels,))])
+    if header["record_size"] != dtype.itemsize:
+        raise ValueError("другой формат записи")
+    ring = np.frombuffer(data, dtype, count=header["capacity"], offset=DATA_OFF)
+    trace = ring[_ordered_slots(header)]
+    return header, trace[trace["t_ns"] != 0]
+
+def write_csv(path: str, out):
+    header, records = read_records(path)
+    n = header["axes"]
+    names = (["t_s"] + [f"position{i}" for i in range(n)] + [f"target{i}" for i in range(n)]
+             + [f"speed{i}" for i in range(n)] + [f"ch{i}" for i in range(header["channels"])])
+    out.write(",".join(names) + "\n")
+    start = header["monotonic_ns"]
+    for t_ns, positions, targets, speeds, channels in records:
+        row = [f"{(t_ns - start) / 1e9:.6f}"] + [str(v) for v in (*positions, *targets, *speeds, *channels)]
+        out.write(",".join(row) + "\n")
+    return len(records)
+
+def plot(path: str, output: str = None):
+    # позиция и цель по осям; время — секунды до последней записи
+    import matplotlib
+    if output:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    header, trace = load(path)
+    if not len(trace):
+        raise ValueError("запись пуста")
+    t = (trace["t_ns"].astype("i8") - int(trace["t_ns"][-1])) / 1e9
+    n = header["axes"]
+    # подписи из таблицы осей, если запись сделана с тем же числом осей
+    if n == axis_table.COUNT:
+        names = [axis["label"] for axis in axis_table.TABLE]
+    else:
+        names = [f"ось {i}" for i in range(n)]
+    fig, axes = plt.subplots(n, 1, sharex=True, figsize=(10, 2.2 * n), squeeze=False)
+    axes = axes[:, 0]
+    for i, ax in enumerate(axes):
+        ax.plot(t, trace["target"][:, i], label="цель", drawstyle="steps-post")
+        ax.plot(t, trace["position"][:, i], label="позиция")
+        ax.set_ylabel(names[i])
+        ax.grid(True)
+    axes[0].legend(loc="upper left")
+    axes[-1].set_xlabel("с до конца записи")
+    fig.tight_layout()
+    if output:
+        fig.savefig(output)
+    else:
+        plt.show()
+
+def main():
+    parser = argparse.ArgumentParser(description="разбор записи движения")
+    parser.add_argument("command", choices=["info", "csv", "npy", "plot"])
+    parser.add_argument("path", help="файл кольца (после сбоя — path.prev)")
+    parser.add_argument("-o", "--output", help="куда писать (csv — по умолчанию stdout)")
+    args = parser.parse_args()
+    if args.command == "info":
+        header, records = read_records(args.path)
+        span = (records[-1][0] - records[0][0]) / 1e9 if records else 0.0
+        print(f"записей {len(records)} из {header['capacity']}, всего сделано {header['head']}, "
+              f"охват {span:.1f} с")
+    elif args.command == "csv":
+        if args.output:
+            with open(args.output, "w") as out:
+                write_csv(args.path, out)
+        else:
+            write_csv(args.path, sys.stdout)
+    elif args.command == "npy":
+        import numpy as np
+        _, trace = load(args.path)
+        np.save(args.output or os.path.splitext(args.path)[0] + ".npy", trace)
+    else:
+        plot(args.path, args.output)
+
+if __name__ == "__main__":
+    main()
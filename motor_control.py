@@ -1,186 +1,582 @@
-import RPi.GPIO as GPIO
 import time
 import os
 import atexit
+from array import array
+import axes
+import motion_profile
+import stats
+import step_backends
+from step_backends import HIGH, LOW
 
 # ===== ПАРАМЕТРЫ =====
-MOTOR_SETTINGS = [
-    {"speed": 10000, "acceleration": 100, "distance": 15000},  # 0: Руль
-    {"speed": 10000, "acceleration": 100, "distance": 10000},  # 1: Газ
-    {"speed": 10000, "acceleration": 100, "distance": 10000},  # 2: Тормоз
-    {"speed": 10000, "acceleration": 100, "distance_R": 4000, "distance_D": 7000}  # 3: АКПП
-]
-
-MAX_STEERING_SPEED = 25000
+# оси — из таблицы axes (axes.json): 0 руль, 1 газ, 2 тормоз, 3 АКПП, далее — что добавлено
+AXIS_TABLE = axes.TABLE
+AXIS_COUNT = len(AXIS_TABLE)
+MOTOR_SETTINGS = axes.default_settings(AXIS_TABLE)
+
+# верхняя граница speed по осям (у руля), None — без неё
+MAX_SPEEDS = [axis.get("max_speed") for axis in AXIS_TABLE]
 PULSES_PER_REVOLUTION = int(os.environ.get("PULSES_PER_REVOLUTION", 800))
 HYSTERESIS = 50
 
 # Реалистичные ограничения для userspace:
 MIN_STEP_INTERVAL = 0.00020  # 200 мкс (≈5 кГц максимум)
 STEP_PULSE_US     = 3        # ширина строба STEP в микросекундах (busy-wait)
+# шаги разных осей, чьи дедлайны ближе этого к текущему, идут одним стробом
+STEP_TICK_NS      = 20_000
+# DIR выставляется не позже чем за столько до фронта STEP (батчевый бэкенд)
+DIR_SETUP_NS      = 5_000
+
+# gpio — RPi.GPIO, pigpio — волны DMA, sim — запись фронтов без железа
+STEP_BACKEND = os.environ.get("STEP_BACKEND", "gpio")
+# thread — шаги в потоке этого процесса, process — в отдельном процессе
+# (motion_core); во втором случае здесь GPIO не трогаем
+MOTION_CORE = os.environ.get("MOTION_CORE", "thread")
+# длина сегмента, который батчевый бэкенд получает за один вызов
+SEGMENT_NS = int(float(os.environ.get("STEP_SEGMENT_MS", 10)) * 1_000_000)
+
+DIR_PINS  = [axis["dir_pin"] for axis in AXIS_TABLE]
+STEP_PINS = [axis["step_pin"] for axis in AXIS_TABLE]
+LIMIT_SWITCH_PINS = [axis.get("limit_pin") for axis in AXIS_TABLE]
+
+# обратная полярность DIR (у газа и тормоза)
+DIR_INVERTED = [bool(axis.get("dir_inverted")) for axis in AXIS_TABLE]
+# ход и цель при потере связи — спецификации таблицы, числа — в _update_axis
+TRAVEL_SPECS = [axis["travel"] for axis in AXIS_TABLE]
+SAFE_SPECS = [axis.get("safe") for axis in AXIS_TABLE]
+
+# ===== ПОИСК НУЛЯ (оси с homing: газ, тормоз) =====
+# Все оси одновременно: быстрый подход к концевику, отход, медленный подход,
+# отъезд на HOMING_HOME_OFFSET — там ноль. Идёт внутри step_all(), так что
+# руль и приёмник работают как обычно.
+HOMING_AXES        = tuple(i for i, axis in enumerate(AXIS_TABLE) if axis.get("homing"))
+HOMING_FAST_RPM    = 300
+HOMING_SLOW_RPM    = 30
+HOMING_ACCEL_RPM   = 1500
+HOMING_BACKOFF     = 200    # шагов отхода после быстрого подхода
+HOMING_HOME_OFFSET = 100    # ноль — столько шагов от концевика
+HOMING_MAX_TRAVEL  = 10000  # концевик не найден за столько шагов — ось пропускаем
+
+IDLE, APPROACH, BACKOFF, SLOW, RETREAT, DONE, FAILED = range(7)
+HOMING_PHASES = ("idle", "approach", "backoff", "slow", "retreat", "done", "failed")
+
+positions        = [0] * AXIS_COUNT
+target_positions = [0] * AXIS_COUNT
+
+# ===== ПЛАНЫ ДВИЖЕНИЯ (время — целые нс monotonic) =====
+MIN_STEP_INTERVAL_NS = int(MIN_STEP_INTERVAL * 1_000_000_000)
 
-DIR_PINS  = [26, 6, 0, 11]
-STEP_PINS = [20, 12, 1, 8]
-LIMIT_SWITCH_PINS = [None, 19, 13, None]
+# Состояние — параллельными списками по осям. В цикле шагов обходятся не
+# все оси, а только active (у кого есть план), а цели сверяются одним
+# сравнением списков с goals_seen: стоящие оси цикл не дорожают.
+ramps            = [array('q') for _ in range(AXIS_COUNT)]
+cruise_intervals = [None] * AXIS_COUNT
+travel_limits    = [(0, 0)] * AXIS_COUNT
+safe_targets     = [None] * AXIS_COUNT
+plans            = [None] * AXIS_COUNT
+plan_index       = [0] * AXIS_COUNT
+next_deadline    = [0] * AXIS_COUNT
+directions       = [0] * AXIS_COUNT
+# батчевый бэкенд: новый DIR ждёт начала следующего сегмента — импульсы
+# прежнего хода ещё в очереди DMA
+dir_pending      = [False] * AXIS_COUNT
+planned_targets  = [None] * AXIS_COUNT
+speeds           = [0] * AXIS_COUNT  # шаг/с со знаком, заполняет current_speeds()
+active           = []   # оси с планом; без плана вычищаются лениво
+goals_seen       = [None] * AXIS_COUNT  # target_positions на последней сверке
+replan_pending   = True  # сменилась цель не через target_positions
 
-positions              = [0] * 4
-target_positions       = [0] * 4
-speeds                 = [0.0] * 4
-last_step_time         = [time.time()] * 4
-last_speed_update_time = [time.time()] * 4
-step_intervals         = [float('inf')] * 4
+segment_end_ns   = 0
 
-GPIO.setmode(GPIO.BCM)
-GPIO.setwarnings(False)
-for dir_pin, step_pin in zip(DIR_PINS, STEP_PINS):
-    GPIO.setup(dir_pin, GPIO.OUT)
-    GPIO.setup(step_pin, GPIO.OUT)
+# опоздание шагов относительно плана (stats)
+step_lateness    = stats.STEP_LATENESS
+
+# калибровка: пока у оси есть homing_goals[i], она едет к нему с рампой
+# homing_profiles[i] и без ограничения хода, а target_positions[i] ждёт
+homing_goals     = [None] * AXIS_COUNT
+homing_profiles  = [None] * AXIS_COUNT
+homing_phase     = [IDLE] * AXIS_COUNT
+limit_hit        = [False] * AXIS_COUNT
+limit_watched    = [False] * AXIS_COUNT
+homing_active    = False
+homing_started_ns  = 0
+homing_finished_ns = 0
+_homing_fast = _homing_slow = None
+
+# снимки SettingsStore: новый кладётся заменой ссылки из любого потока,
+# применяется в потоке шагов в начале step_all()
+settings_snapshot = None
+pending_snapshot  = None
+
+backend = step_backends.NullBackend(STEP_PULSE_US)
+limit_inputs_ready = None
+
+def init_backend(name=None):
+    global backend
+    if backend.name == "null":
+        backend = step_backends.create_backend(name or STEP_BACKEND, STEP_PULSE_US)
+        backend.setup_outputs(DIR_PINS + STEP_PINS)
+    return backend
 
 def setup_limit_switch_pins():
-    for pin in LIMIT_SWITCH_PINS:
-        if pin is not None:
-            GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+    # один раз на бэкенд: калибровку можно запускать повторно
+    global limit_inputs_ready
+    if limit_inputs_ready is not backend:
+        backend.setup_inputs([pin for pin in LIMIT_SWITCH_PINS if pin is not None])
+        limit_inputs_ready = backend
 
 def update_motor_settings(new_settings):
-    global MOTOR_SETTINGS, last_step_time, last_speed_update_time
-    if new_settings and new_settings[0].get("speed", 0) > MAX_STEERING_SPEED:
-        new_settings[0]["speed"] = MAX_STEERING_SPEED
+    global MOTOR_SETTINGS
+    old_settings = MOTOR_SETTINGS
+    everything = new_settings is old_settings
+    # предел скорости — на копии оси: список вызывающего (снимок хранилища,
+    # настройки меню) не меняется
+    new_settings = list(new_settings)
+    for i, (cfg, limit) in enumerate(zip(new_settings, MAX_SPEEDS)):
+        if limit is not None and cfg.get("speed", 0) > limit:
+            new_settings[i] = dict(cfg, speed=limit)
     MOTOR_SETTINGS = new_settings
-    now = time.time()
-    for i in range(4):
-        last_step_time[i] = now
-        last_speed_update_time[i] = now
-    update_step_intervals()
+    stats.counters.add(stats.SETTINGS_RELOADS)
+    # пересчитываем только оси, чьи параметры изменились
+    for i in range(AXIS_COUNT):
+        if everything or new_settings[i] != old_settings[i]:
+            _update_axis(i)
+
+def publish_snapshot(snapshot):
+    global pending_snapshot
+    pending_snapshot = snapshot
+
+def _apply_pending_settings():
+    global settings_snapshot
+    snapshot = pending_snapshot
+    settings_snapshot = snapshot
+    update_motor_settings(snapshot.as_list())
 
 def get_motor_settings():
     return MOTOR_SETTINGS
 
-# ===== ВСПОМОГАТЕЛЬНОЕ: быстрый микропаузер на ЦП =====
-def _busy_wait_us(us: int):
-    # минимальная точность на Pi в userspace — единицы микросекунд
-    start = time.perf_counter()
-    target = start + us / 1_000_000.0
-    while time.perf_counter() < target:
-        pass
-
 # ===== ДИНАМИКА СКОРОСТИ =====
+def _rpm_to_pps(rpm):
+    return float(rpm) * PULSES_PER_REVOLUTION / 60.0
+
 def update_step_intervals():
-    global step_intervals, speeds, last_speed_update_time
-    t = time.time()
-    for i in range(4):
-        target_speed = float(MOTOR_SETTINGS[i]["speed"])        # RPM
-        acceleration = float(MOTOR_SETTINGS[i]["acceleration"]) # RPM/s
-
-        dt = t - last_speed_update_time[i]
-        if dt > 0:
-            dv = acceleration * dt
-            if speeds[i] < target_speed:
-                speeds[i] = min(speeds[i] + dv, target_speed)
-            elif speeds[i] > target_speed:
-                speeds[i] = max(speeds[i] - dv, target_speed)
-            last_speed_update_time[i] = t
-
-        if speeds[i] > 0:
-            pps = (speeds[i] * PULSES_PER_REVOLUTION) / 60.0
-            step_intervals[i] = 1.0 / pps if pps > 0 else float('inf')
-            if step_intervals[i] < MIN_STEP_INTERVAL:
-                step_intervals[i] = MIN_STEP_INTERVAL
-        else:
-            step_intervals[i] = float('inf')
+    # Таблицы разгона пересчитываются только при смене настроек; в цикле
+    # шагов остаётся сравнение одного дедлайна и сдвиг индекса по плану.
+    for i in range(AXIS_COUNT):
+        _update_axis(i)
+
+def _update_axis(i: int):
+    global replan_pending
+    cfg = MOTOR_SETTINGS[i]
+    max_pps = _rpm_to_pps(cfg["speed"])
+    accel = _rpm_to_pps(cfg["acceleration"])
+    jerk = _rpm_to_pps(cfg.get("jerk", 0))
+    if jerk > 0:
+        ramp, cruise = motion_profile.scurve_ramp(max_pps, accel, jerk, MIN_STEP_INTERVAL_NS)
+    else:
+        ramp, cruise = motion_profile.trapezoid_ramp(max_pps, accel, MIN_STEP_INTERVAL_NS)
+    ramps[i] = ramp
+    cruise_intervals[i] = cruise
+    lo, hi = TRAVEL_SPECS[i]
+    travel_limits[i] = (axes.resolve(lo, cfg), axes.resolve(hi, cfg))
+    safe = SAFE_SPECS[i]
+    safe_targets[i] = None if safe is None else axes.resolve(safe, cfg)
+    # текущий план доживает до следующей сверки целей и перестраивается
+    planned_targets[i] = None
+    replan_pending = True
 
 # ===== ШАГИ =====
 def _do_step(i: int):
-    GPIO.output(STEP_PINS[i], GPIO.HIGH)
-    _busy_wait_us(STEP_PULSE_US)
-    GPIO.output(STEP_PINS[i], GPIO.LOW)
-    # без задержки на LOW: период задаётся step_intervals[i]
+    # без задержки на LOW: период задаётся планом движения
+    backend.step(STEP_PINS[i])
 
-def move_motor(i: int):
-    global positions, speeds, last_step_time
+def _dir_level(i: int, direction: int):
+    return LOW if (direction > 0) == DIR_INVERTED[i] else HIGH
+
+def _write_dir(i: int):
+    backend.set_dir(DIR_PINS[i], _dir_level(i, directions[i]))
+
+def _replan(i: int, target: int):
+    planned_targets[i] = target
+    profile = homing_profiles[i]
+    if profile is None:
+        ramp, cruise = ramps[i], cruise_intervals[i]
+        lo, hi = travel_limits[i]
+        if target > hi:
+            target = hi
+        elif target < lo:
+            target = lo
+    else:
+        ramp, cruise = profile
 
-    max_distance = MOTOR_SETTINGS[i]["distance"] if i < 3 else MOTOR_SETTINGS[i]["distance_R"]
+    plan = plans[i]
+    if plan is None:
+        if abs(target - positions[i]) < HYSTERESIS:
+            return
+        direction, level = 0, 0
+    else:
+        direction, level = directions[i], plan.level_at(plan_index[i])
 
-    if target_positions[i] > max_distance:
-        target_positions[i] = max_distance
-    elif target_positions[i] < -max_distance:
-        target_positions[i] = -max_distance
+    plan = motion_profile.plan_move(ramp, cruise, positions[i], target, direction, level)
+    plans[i] = plan
+    plan_index[i] = 0
+    if plan is None:
+        return
+    if i not in active:
+        active.append(i)
+    if plan.direction != directions[i]:
+        directions[i] = plan.direction
+        if backend.batched:
+            dir_pending[i] = True
+        else:
+            _write_dir(i)
+    if level == 0:
+        # с места — сразу, но не раньше паузы после последнего шага
+        now = time.monotonic_ns()
+        if next_deadline[i] < now:
+            next_deadline[i] = now
 
-    steps_to_move = target_positions[i] - positions[i]
-    if abs(steps_to_move) < HYSTERESIS:
-        speeds[i] = 0.0
+def move_motor(i: int):
+    goal = homing_goals[i]
+    if goal is None:
+        goal = target_positions[i]
+    if goal != planned_targets[i]:
+        _replan(i, goal)
+    plan = plans[i]
+    if plan is None:
         return False
 
-    if i in [1, 2]:
-        direction = GPIO.LOW if steps_to_move > 0 else GPIO.HIGH
-    else:
-        direction = GPIO.HIGH if steps_to_move > 0 else GPIO.LOW
-    GPIO.output(DIR_PINS[i], direction)
-
-    now = time.time()
-    if now - last_step_time[i] >= step_intervals[i]:
-        _do_step(i)
-        positions[i] += 1 if steps_to_move > 0 else -1
-        last_step_time[i] = now
-        return True
-    return False
-
-def move_motor_akpp():
-    i = 3
-    max_R = MOTOR_SETTINGS[i]["distance_R"]
-    max_D = MOTOR_SETTINGS[i]["distance_D"]
-
-    if target_positions[i] < -max_R:
-        target_positions[i] = -max_R
-    elif target_positions[i] > max_D:
-        target_positions[i] = max_D
-
-    steps_to_move = target_positions[i] - positions[i]
-    if abs(steps_to_move) < HYSTERESIS:
-        speeds[i] = 0.0
+    now = time.monotonic_ns()
+    if now < next_deadline[i]:
         return False
+    step_lateness[i].record_ns(now - next_deadline[i])
+    _advance(i, plan, now)
+    _do_step(i)
+    return True
 
-    direction = GPIO.HIGH if steps_to_move > 0 else GPIO.LOW
-    GPIO.output(DIR_PINS[i], direction)
+def _advance(i: int, plan, now: int):
+    # шаг по плану без самого импульса: DIR на смене направления, позиция, дедлайн
+    k = plan_index[i]
+    if k == plan.flip:
+        directions[i] = -directions[i]
+        _write_dir(i)
+    positions[i] += directions[i]
 
-    now = time.time()
-    if now - last_step_time[i] >= step_intervals[i]:
-        _do_step(i)
-        positions[i] += 1 if steps_to_move > 0 else -1
-        last_step_time[i] = now
-        return True
-    return False
+    interval = plan.interval(k)
+    deadline = next_deadline[i] + interval
+    # опоздание не догоняем пачкой: до следующего шага не меньше полуинтервала
+    next_deadline[i] = deadline if deadline - now > interval >> 1 else now + interval
+    k += 1
+    if k < len(plan):
+        plan_index[i] = k
+    else:
+        plans[i] = None
 
-def safety_mode():
-    target_positions[0] = 0
-    target_positions[1] = 0
-    target_positions[2] = MOTOR_SETTINGS[2]["distance"]
+def _sync_goals():
+    # Сверка целей всех осей разом: пока target_positions не изменился и
+    # никто не поднял replan_pending, это одно сравнение списков (в C).
+    # goals_seen обновляется до чтения целей: уставка, пришедшая во время
+    # сверки, попадёт в следующую.
+    global replan_pending
+    if not replan_pending and target_positions == goals_seen:
+        return
+    replan_pending = False
+    goals_seen[:] = target_positions
+    for i in range(AXIS_COUNT):
+        goal = homing_goals[i]
+        if goal is None:
+            goal = target_positions[i]
+        if goal != planned_targets[i]:
+            _replan(i, goal)
 
-def calibrate_motors():
-    global positions, target_positions, speeds
-    setup_limit_switch_pins()
-    for motor_index in [1, 2]:
-        direction_to_switch = GPIO.LOW
-        GPIO.output(DIR_PINS[motor_index], direction_to_switch)
-        limit_triggered = False
-        max_steps = 10000
-        step_count = 0
-        while not limit_triggered and step_count < max_steps:
-            if GPIO.input(LIMIT_SWITCH_PINS[motor_index]) == GPIO.LOW:
-                limit_triggered = True
+def _prune_active():
+    active[:] = [i for i in active if plans[i] is not None]
+
+def _step_due():
+    # Один проход по дедлайнам движущихся осей: все шаги, наступившие к
+    # now + STEP_TICK_NS, собираются в группу и выходят одним стробом (одна
+    # запись HIGH на все пины, одно ожидание ширины импульса, одна запись
+    # LOW). Для нескольких осей линейный проход дешевле кучи.
+    _sync_goals()
+    now = time.monotonic_ns()
+    horizon = now + STEP_TICK_NS
+    pins = None
+    ended = False
+    for i in active:
+        plan = plans[i]
+        if plan is None:
+            ended = True
+            continue
+        if next_deadline[i] > horizon:
+            continue
+        late = now - next_deadline[i]
+        step_lateness[i].record_ns(late if late > 0 else 0)
+        _advance(i, plan, now)
+        if plans[i] is None:
+            ended = True
+        if pins is None:
+            pins = [STEP_PINS[i]]
+        else:
+            pins.append(STEP_PINS[i])
+    if pins is not None:
+        backend.step_many(pins)
+    if ended:
+        _prune_active()
+
+def set_position(i: int, value: int):
+    global replan_pending
+    positions[i] = value
+    plans[i] = None
+    planned_targets[i] = None
+    replan_pending = True
+
+# ===== СЕГМЕНТЫ ДЛЯ БАТЧЕВОГО БЭКЕНДА =====
+def _queue_segment(i: int, start: int, end: int):
+    plan = plans[i]
+    interval = plan.interval
+    n = len(plan)
+    k = plan_index[i]
+    deadline = next_deadline[i]
+    if deadline < start:
+        deadline = start
+    if dir_pending[i]:
+        # после всех импульсов прежних сегментов и до первого своего
+        dir_pending[i] = False
+        backend.queue_level(DIR_PINS[i], _dir_level(i, directions[i]), 0)
+        if deadline < start + DIR_SETUP_NS:
+            deadline = start + DIR_SETUP_NS
+    offsets = []
+    while deadline < end and k < n:
+        at = deadline - start
+        if k == plan.flip:
+            # DIR меняем сразу после предыдущего импульса, до следующего
+            if offsets:
+                backend.queue_pulses(STEP_PINS[i], offsets)
+                flip_at = offsets[-1] + STEP_PULSE_US * 1000
+                offsets = []
             else:
-                _do_step(motor_index)
-                step_count += 1
-        if not limit_triggered:
+                # предыдущий импульс — в прошлом сегменте
+                flip_at = 0
+                if at < DIR_SETUP_NS:
+                    deadline = start + DIR_SETUP_NS
+                    at = DIR_SETUP_NS
+            directions[i] = -directions[i]
+            backend.queue_level(DIR_PINS[i], _dir_level(i, directions[i]), flip_at)
+        offsets.append(at)
+        positions[i] += directions[i]
+        deadline += interval(k)
+        k += 1
+    if offsets:
+        backend.queue_pulses(STEP_PINS[i], offsets)
+    next_deadline[i] = deadline
+    if k < n:
+        plan_index[i] = k
+    else:
+        plans[i] = None
+
+def next_due_ns():
+    # ближайший момент, когда step_all() будет что делать; None — все стоят
+    if backend.batched:
+        if any(plan is not None for plan in plans):
+            return segment_end_ns - SEGMENT_NS
+        return None
+    due = None
+    for i in active:
+        if plans[i] is not None and (due is None or next_deadline[i] < due):
+            due = next_deadline[i]
+    return due
+
+def current_speeds():
+    # скорость по текущему интервалу плана (для записи движения, не для шагов)
+    for i in range(AXIS_COUNT):
+        plan = plans[i]
+        if plan is None:
+            speeds[i] = 0
+        else:
+            interval = plan.interval(plan_index[i] - 1 if plan_index[i] else 0)
+            speeds[i] = directions[i] * 1_000_000_000 // interval if interval else 0
+    return speeds
+
+def step_all():
+    # один проход цикла: поштучные шаги или очередной сегмент импульсов
+    global segment_end_ns
+    if pending_snapshot is not settings_snapshot:
+        _apply_pending_settings()
+    if homing_active:
+        _homing_tick()
+    if not backend.batched:
+        _step_due()
+        return
+
+    now = time.monotonic_ns()
+    if segment_end_ns - now > SEGMENT_NS:
+        return  # в DMA уже есть сегмент про запас
+    start = segment_end_ns if segment_end_ns > now else now
+    end = start + SEGMENT_NS
+    _sync_goals()
+    queued = False
+    for i in active:
+        if plans[i] is not None:
+            _queue_segment(i, start, end)
+            queued = True
+    _prune_active()
+    if queued:
+        backend.flush(start, SEGMENT_NS)
+        segment_end_ns = end
+
+def safety_mode(targets=None):
+    # цели safe из таблицы осей: руль и газ в ноль, тормоз нажат, АКПП как есть
+    if targets is None:
+        targets = target_positions
+    for i, target in enumerate(safe_targets):
+        if target is not None:
+            targets[i] = target
+
+# ===== ПОИСК НУЛЯ =====
+def _homing_profile(rpm):
+    return motion_profile.trapezoid_ramp(_rpm_to_pps(rpm), _rpm_to_pps(HOMING_ACCEL_RPM),
+                                         MIN_STEP_INTERVAL_NS)
+
+def _toward_switch(i: int) -> int:
+    # концевик там, куда DIR = LOW (как в прежней калибровке)
+    return 1 if _dir_level(i, 1) == LOW else -1
+
+def _limit_callback(i: int):
+    # зовётся из потока событий GPIO: только флаг, остальное — в step_all()
+    def callback():
+        limit_hit[i] = True
+    return callback
+
+def _homing_move(i: int, phase: int, profile, goal: int):
+    global replan_pending
+    homing_phase[i] = phase
+    homing_profiles[i] = profile
+    homing_goals[i] = goal
+    planned_targets[i] = None
+    replan_pending = True
+
+def _homing_release(i: int, phase: int):
+    global replan_pending
+    if limit_watched[i]:
+        backend.unwatch(LIMIT_SWITCH_PINS[i])
+        limit_watched[i] = False
+    homing_phase[i] = phase
+    homing_profiles[i] = None
+    homing_goals[i] = None
+    planned_targets[i] = None
+    replan_pending = True
+
+def _limit_pressed(i: int) -> bool:
+    # без событий от бэкенда — опрос входа, но раз за проход, а не на шаг
+    if limit_watched[i]:
+        return limit_hit[i]
+    return backend.read(LIMIT_SWITCH_PINS[i]) == LOW
+
+def start_homing():
+    # неблокирующий старт; дальше всё делает step_all()
+    global homing_active, homing_started_ns, homing_finished_ns, _homing_fast, _homing_slow
+    if homing_active:
+        return False
+    setup_limit_switch_pins()
+    _homing_fast = _homing_profile(HOMING_FAST_RPM)
+    _homing_slow = _homing_profile(HOMING_SLOW_RPM)
+    for i in HOMING_AXES:
+        limit_watched[i] = backend.watch_falling(LIMIT_SWITCH_PINS[i], _limit_callback(i))
+        # уже стоит на концевике — спада не будет; уровень читаем после
+        # подписки, чтобы не потерять нажатие между ними
+        limit_hit[i] = backend.read(LIMIT_SWITCH_PINS[i]) == LOW
+        _homing_move(i, APPROACH, _homing_fast, positions[i] + _toward_switch(i) * HOMING_MAX_TRAVEL)
+    homing_started_ns = time.monotonic_ns()
+    homing_finished_ns = 0
+    homing_active = True
+    return True
+
+def _homing_tick():
+    global homing_active, homing_finished_ns
+    running = False
+    for i in HOMING_AXES:
+        phase = homing_phase[i]
+        if phase == DONE or phase == FAILED:
             continue
-        time.sleep(0.1)
-        GPIO.output(DIR_PINS[motor_index], not direction_to_switch)
-        for _ in range(100):
-            _do_step(motor_index)
-        positions[motor_index] = 0
-        target_positions[motor_index] = 0
-        speeds[motor_index] = 0.0
+        running = True
+        # «доехал» — план исчерпан, и новой цели он не ждёт
+        arrived = plans[i] is None and homing_goals[i] == planned_targets[i]
+        toward = _toward_switch(i)
+        if phase == APPROACH:
+            if _limit_pressed(i):
+                # сразу стоп, как и раньше: точку уточнит медленный подход
+                plans[i] = None
+                _homing_move(i, BACKOFF, _homing_fast, positions[i] - toward * HOMING_BACKOFF)
+            elif arrived:
+                _homing_release(i, FAILED)
+        elif phase == BACKOFF:
+            if arrived:
+                limit_hit[i] = backend.read(LIMIT_SWITCH_PINS[i]) == LOW
+                _homing_move(i, SLOW, _homing_slow, positions[i] + toward * 2 * HOMING_BACKOFF)
+        elif phase == SLOW:
+            if _limit_pressed(i):
+                plans[i] = None
+                _homing_move(i, RETREAT, _homing_slow, positions[i] - toward * HOMING_HOME_OFFSET)
+            elif arrived:
+                _homing_release(i, FAILED)
+        elif phase == RETREAT:
+            if arrived:
+                set_position(i, 0)
+                target_positions[i] = 0
+                _homing_release(i, DONE)
+    if not running:
+        homing_active = False
+        homing_finished_ns = time.monotonic_ns()
+
+def abort_homing():
+    global homing_active, homing_finished_ns
+    for i in HOMING_AXES:
+        if homing_phase[i] not in (DONE, FAILED, IDLE):
+            plans[i] = None
+            _homing_release(i, FAILED)
+    homing_active = False
+    homing_finished_ns = time.monotonic_ns()
+
+def homing_state():
+    # (идёт ли, мс с начала, фазы осей) — целыми, для общей памяти ядра
+    end = homing_finished_ns if not homing_active else time.monotonic_ns()
+    elapsed_ms = (end - homing_started_ns) // 1_000_000 if homing_started_ns else 0
+    return (int(homing_active), elapsed_ms) + tuple(homing_phase)
+
+def describe_homing(state):
+    active, elapsed_ms = state[0], state[1]
+    phases = {i: HOMING_PHASES[state[2 + i]] for i in HOMING_AXES}
+    return {
+        "running": bool(active),
+        "elapsed": elapsed_ms / 1000,
+        "phases": phases,
+        "ok": not active and all(p == "done" for p in phases.values()),
+    }
+
+def homing_status():
+    return describe_homing(homing_state())
+
+def calibrate_motors(timeout: float = 60.0):
+    # блокирующий вариант для тех, у кого нет своего цикла шагов
+    if not start_homing():
+        return homing_status()
+    end = time.monotonic() + timeout
+    while homing_active:
+        if time.monotonic() > end:
+            abort_homing()
+            break
+        step_all()
+        due = next_due_ns()
+        gap = due - time.monotonic_ns() if due is not None else 1_000_000
+        if gap > 0:
+            time.sleep(min(gap, 1_000_000) / 1e9)
+    return homing_status()
+
+update_step_intervals()
+if MOTION_CORE != "process":
+    init_backend()
 
 def cleanup():
-    GPIO.cleanup()
+    backend.cleanup()
 
 atexit.register(cleanup)
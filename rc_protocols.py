@@ -0,0 +1,32 @@
+from collections import namedtuple
+
+import serial
+
+import crsf
+import ibus
+import sbus
+
+# ===== ПРОТОКОЛЫ ПРИЁМНИКА =====
+# Общий интерфейс разбора: parser.feed(байты) -> список кадров, кадр — кортеж
+# первых 14 каналов в мкс (1000..2000, как у iBus) или None (приёмник сам
+# сообщил failsafe); parser.needed() — байт до конца начатого кадра; счётчики
+# frames_ok / frames_bad / bytes_skipped. Протокол и скорость порта —
+# RC_PROTOCOL и UART_BAUD (по умолчанию — скорость протокола).
+# frame_rate — наибольшая частота кадров протокола, под неё меряется разбор.
+
+Protocol = namedtuple("Protocol", "name parser build_frame baudrate parity stopbits frame_rate")
+
+PROTOCOLS = {
+    "ibus": Protocol("ibus", ibus.IBusParser, ibus.build_frame,
+                     115200, serial.PARITY_NONE, serial.STOPBITS_ONE, 143),
+    "sbus": Protocol("sbus", sbus.SBusParser, sbus.build_frame,
+                     100000, serial.PARITY_EVEN, serial.STOPBITS_TWO, 143),
+    "crsf": Protocol("crsf", crsf.CrsfParser, crsf.build_frame,
+                     420000, serial.PARITY_NONE, serial.STOPBITS_ONE, 1000),
+}
+
+def get_protocol(name: str) -> Protocol:
+    try:
+        return PROTOCOLS[name]
+    except KeyError:
+        raise ValueError(f"неизвестный протокол приёмника: {name}")
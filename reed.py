@@ -2,80 +2,221 @@ import os
 import time
 import signal
 import threading
-import RPi.GPIO as GPIO
+import fcntl
+import axes
 import motor_control as motor
 import data_receiver as receiver
-from menu import Menu
-import psutil
+import step_loop
+import stats
+import motion_trace
+import control_api
+import settings_watch
+from motion_core import MotionCore
+from settings_store import SettingsStore, normalize_settings, validate_settings, validate_akpp_center
 import json
 import sys
 
 SETTINGS_FILE = "motor_settings.json"
+AKPP_FILE = "akpp_center.json"
+# без меню (PIL, numpy, framebuffer): настройка через control_api по UNIX-сокету
+HEADLESS = "--headless" in sys.argv[1:] or os.environ.get("HEADLESS") == "1"
+# один экземпляр: flock на pid-файле, прежний владелец получает SIGTERM
+LOCK_FILE = os.environ.get("TIHON_LOCK", "/tmp/tihon-control.pid")
+LOCK_WAIT = 3.0
 
-def cleanup_pins_and_processes():
-    current_pid = os.getpid()
-    for proc in psutil.process_iter(['pid', 'name']):
+# ===== ВРЕМЯ ЗАПУСКА =====
+def _process_start():
+    # monotonic-время старта процесса (из /proc), чтобы в замер входил и
+    # импорт модулей; без /proc — момент импорта этого файла
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.monotonic() - (uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.monotonic()
+
+BOOT_START = _process_start()
+
+def boot_mark(name: str):
+    print(f"boot: {name} {(time.monotonic() - BOOT_START) * 1000:.0f} ms", file=sys.stderr, flush=True)
+
+def positions_of(motion):
+    # позиции осей: у ядра — из общей памяти, у потока — прямо из motor_control
+    return motion.positions if isinstance(motion, MotionCore) else lambda: list(motor.positions)
+
+def watch_first_step(motion, timeout: float = 60.0):
+    # первый шаг любой оси — по смене позиций
+    positions = positions_of(motion)
+    start = positions()
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if positions() != start:
+            boot_mark("first step")
+            return
+        time.sleep(0.001)
+
+# ===== ОДИН ЭКЗЕМПЛЯР =====
+def acquire_single_instance(path: str = LOCK_FILE, wait: float = LOCK_WAIT):
+    # вместо обхода всех python3: гасим только того, кто держит блокировку
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
         try:
-            if proc.info['name'] == 'python3' and proc.info['pid'] != current_pid:
-                os.kill(proc.info['pid'], signal.SIGTERM)
-        except Exception:
+            os.kill(int(os.pread(fd, 32, 0).split()[0]), signal.SIGTERM)
+        except (ValueError, IndexError, ProcessLookupError, PermissionError):
             pass
-    GPIO.cleanup()
+        end = time.monotonic() + wait
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() > end:
+                    os.close(fd)
+                    sys.exit("уже запущен другой экземпляр")
+                time.sleep(0.01)
+    os.ftruncate(fd, 0)
+    os.pwrite(fd, f"{os.getpid()}\n".encode(), 0)
+    return fd  # держим открытым до выхода: с ним держится и flock
 
-def initialize_gpio_pins():
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setwarnings(False)
-    for dir_pin, step_pin in zip(motor.DIR_PINS, motor.STEP_PINS):
-        GPIO.setup(dir_pin, GPIO.OUT)
-        GPIO.setup(step_pin, GPIO.OUT)
+def load_settings():
+    # по записи на ось таблицы: добавленные в axes.json оси — с настройками из неё
+    if os.path.exists(SETTINGS_FILE):
+        with open(SETTINGS_FILE, "r") as f:
+            return normalize_settings(json.load(f))
+    motor_settings = motor.MOTOR_SETTINGS
+    with open(SETTINGS_FILE, "w") as f:
+        json.dump(motor_settings, f, indent=4)
+    return motor_settings
 
-def graceful_exit(signum, frame, menu):
+def load_akpp_center(default: int) -> int:
+    # центр АКПП сохраняет меню; без файла (или с битым) — как раньше, distance_D
     try:
-        menu.cleanup()
+        with open(AKPP_FILE, "r") as f:
+            return validate_akpp_center(json.load(f))
+    except (OSError, ValueError):
+        return default
+
+def watch_settings(store, menu):
+    # правка файлов на диске — в работающие моторы без перезапуска: через
+    # хранилище, как правки меню (оси меняются по одной, позиции и текущее
+    # движение не сбрасываются)
+    def settings_changed(path):
+        with open(path, "r") as f:
+            store.reload(validate_settings(json.load(f)))
+
+    def akpp_changed(path):
+        with open(path, "r") as f:
+            value = validate_akpp_center(json.load(f))
+        motor.akpp_center_value = value
+        if menu is not None:
+            menu.akpp_center = value
+
+    return settings_watch.start({SETTINGS_FILE: settings_changed, AKPP_FILE: akpp_changed})
+
+def graceful_exit(signum, frame, store, menu, motion=None, control=None):
+    try:
+        store.flush()
     except Exception:
         pass
+    if control is not None:
+        control.close()
+    if menu is not None:
+        try:
+            menu.cleanup()
+        except Exception:
+            pass
+    stop_motion(motion)
     try:
         motor.cleanup()
     except Exception:
         pass
     sys.exit(0)
 
-cleanup_pins_and_processes()
-time.sleep(2)
-initialize_gpio_pins()
-
-if os.path.exists(SETTINGS_FILE):
-    with open(SETTINGS_FILE, "r") as f:
-        motor_settings = json.load(f)
-else:
-    motor_settings = motor.MOTOR_SETTINGS
-    with open(SETTINGS_FILE, "w") as f:
-        json.dump(motor_settings, f, indent=4)
-    motor.update_motor_settings(motor_settings)
+def stop_motion(motion):
+    if isinstance(motion, MotionCore):
+        try:
+            motion.stop()
+        except Exception:
+            pass
 
-motor.update_motor_settings(motor_settings)
+def start_motion(store):
+    # MOTION_CORE=process — шаги в отдельном процессе на выделенном ядре
+    # (MOTION_CORE_CPU, MOTION_CORE_PRIO), иначе — в потоке этого процесса
+    if motor.MOTION_CORE == "process":
+        cpu = os.environ.get("MOTION_CORE_CPU", "3")
+        core = MotionCore(motor.MOTOR_SETTINGS, backend=motor.STEP_BACKEND,
+                          cpu=int(cpu) if cpu else None,
+                          rt_priority=int(os.environ.get("MOTION_CORE_PRIO", 50)),
+                          trace_path=motion_trace.TRACE_FILE)
+        core.start()
+        store.subscribe(lambda snapshot: core.update_settings(snapshot.as_list()))
+        return core, None
+    store.subscribe(motor.publish_snapshot)
+    mailbox = step_loop.SetpointMailbox(motor.target_positions)
+    return mailbox, step_loop.start_step_loop(motor, mailbox, motion_trace.open_trace())
 
-akpp_center = motor.MOTOR_SETTINGS[3]["distance_D"]
+def raise_priorities(threads):
+    # renice через sudo — отдельными процессами, поэтому не на пути запуска
+    for thread, niceness in threads:
+        if thread is None:
+            continue
+        try:
+            os.setpriority(os.PRIO_PROCESS, thread.native_id, niceness)
+        except OSError:
+            os.system(f"sudo renice -n {niceness} -p {thread.native_id} >/dev/null 2>&1")
 
 if __name__ == "__main__":
-    menu = Menu(motor_settings, akpp_center)
+    lock_fd = acquire_single_instance()
+    boot_mark("lock")
+
+    # GPIO уже настроен при импорте motor_control (init_backend идемпотентен)
+    motor_settings = load_settings()
+    motor.update_motor_settings(motor_settings)
+    # ось АКПП — по имени: в axes.json она не обязательно четвёртая
+    akpp = axes.index("akpp")
+    akpp_center = load_akpp_center(motor.MOTOR_SETTINGS[akpp].get("distance_D", 0) if akpp is not None else 0)
+    motor.akpp_center_value = akpp_center
 
-    receiver_thread = threading.Thread(target=receiver.receive_data, args=(motor,))
+    # сначала движение и приёмник: ядро — первым, fork до остальных потоков
+    store = SettingsStore(SETTINGS_FILE, motor_settings)
+    mailbox, stepper_thread = start_motion(store)
+    threading.Thread(target=watch_first_step, args=(mailbox,), name="boot-watch", daemon=True).start()
+    receiver_thread = threading.Thread(target=receiver.receive_data, args=(motor, mailbox, store))
     receiver_thread.daemon = True
     receiver_thread.start()
+    boot_mark("motion")
 
-    signal.signal(signal.SIGINT, lambda s, f: graceful_exit(s, f, menu))
-    signal.signal(signal.SIGTERM, lambda s, f: graceful_exit(s, f, menu))
+    menu = None
+    control = None
+    signal.signal(signal.SIGINT, lambda s, f: graceful_exit(s, f, store, menu, mailbox, control))
+    signal.signal(signal.SIGTERM, lambda s, f: graceful_exit(s, f, store, menu, mailbox, control))
 
-    menu_thread = threading.Thread(target=menu.run)
-    menu_thread.daemon = True
-    menu_thread.start()
+    # счётчики и гистограммы — на UNIX-сокете STATS_SOCKET (python stats.py)
+    stats_server = stats.serve()
 
-    # по возможности повышаем приоритет (без вывода)
-    try:
-        os.system(f"sudo renice -n -5 -p {menu_thread.native_id} >/dev/null 2>&1")
-    except Exception:
-        pass
+    status = mailbox.homing_status if isinstance(mailbox, MotionCore) else motor.homing_status
+    menu_thread = None
+    if HEADLESS:
+        # вместо меню — CONTROL_SOCKET (python control_api.py ...)
+        control = control_api.serve(store, mailbox, positions_of(mailbox), status)
+        boot_mark("control")
+    else:
+        # UI (PIL, numpy, evdev) — только теперь, когда машина уже управляется
+        from menu import Menu
+        menu = Menu(motor_settings, akpp_center, calibrate=mailbox.calibrate, store=store,
+                    calibration_status=status, motion=mailbox, positions=positions_of(mailbox))
+        menu_thread = threading.Thread(target=menu.run)
+        menu_thread.daemon = True
+        menu_thread.start()
+        boot_mark("menu")
+    watcher = watch_settings(store, menu)
+
+    threading.Thread(target=raise_priorities, daemon=True,
+                     args=([(menu_thread, -5), (stepper_thread, -10)],)).start()
 
     try:
         while True:
@@ -83,4 +224,10 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         pass
 
+    if watcher is not None:
+        watcher.stop()
+    store.flush()
+    if control is not None:
+        control.close()
+    stop_motion(mailbox)
     motor.cleanup()
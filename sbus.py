@@ -0,0 +1,124 @@
+from array import array
+
+# ===== FUTABA SBUS =====
+# Кадр 25 байт: 0x0F, 16 каналов по 11 бит (младшими битами вперёд, 22 байта),
+# байт флагов (0x04 — кадр потерян, 0x08 — failsafe), завершающий 0x00
+# (у SBUS2 — 0x04/0x14/0x24/0x34). 100000 бод, 8E2, сигнал инвертирован —
+# на Raspberry Pi нужен внешний инвертор. Контрольной суммы нет, а пара
+# 0x0F .. 0x00 в шуме встречается часто, поэтому по одному окну с верными
+# заголовком и завершающим байтом кадр не признаётся: синхронизация — два
+# таких кадра подряд, дальше кадры идут строго через FRAME_LEN, и первый же
+# кадр не на своём месте сбрасывает синхронизацию.
+# Значения 172..1811 соответствуют 988..2012 мкс; наружу отдаются первые
+# CHANNELS каналов в мкс, как у iBus. Кадр с флагом «потерян» или failsafe —
+# None: приёмник сам говорит, что каналы не от передатчика.
+
+FRAME_LEN = 25
+HEADER = 0x0F
+FOOTERS = (0x00, 0x04, 0x14, 0x24, 0x34)
+CHANNELS = 14
+FLAG_FRAME_LOST = 0x04
+FLAG_FAILSAFE = 0x08
+
+_SHIFTS = tuple(range(0, 11 * CHANNELS, 11))
+# тики 11 бит -> мкс: (t - 992) * 5 / 8 + 1500
+TICKS_TO_US = array('H', ((t * 5 >> 3) + 880 for t in range(2048)))
+
+def unpack_channels(data, start: int):
+    # 22 байта упакованных 11-битных каналов (так же пакует и CRSF)
+    value = int.from_bytes(data[start:start + 22], "little")
+    return tuple([TICKS_TO_US[(value >> s) & 0x7FF] for s in _SHIFTS])
+
+def pack_channels(channels) -> bytes:
+    # обратное unpack_channels; недостающие до 16 каналы — 1500 мкс
+    values = list(channels)[:16]
+    values += [1500] * (16 - len(values))
+    value = 0
+    for n, us in enumerate(values):
+        ticks = min(2047, max(0, round((us - 880) * 8 / 5)))
+        value |= ticks << (11 * n)
+    return value.to_bytes(22, "little")
+
+class SBusParser:
+    # тот же интерфейс, что у IBusParser: feed() -> список кадров
+
+    frame_len = FRAME_LEN
+
+    def __init__(self, newest_only: bool = False):
+        self.newest_only = newest_only
+        self.buffer = bytearray()
+        self.frames_ok = 0
+        self.frames_bad = 0
+        self.bytes_skipped = 0
+        self.frames_lost = 0  # флаг приёмника «кадр потерян»
+        self.failsafe = 0
+        self.synced = False
+        self.sync_lost = 0
+
+    def feed(self, data) -> list:
+        buf = self.buffer
+        buf.extend(data)
+        frames = []
+        pos = 0
+        while True:
+            if self.synced:
+                if len(buf) - pos < FRAME_LEN:
+                    break
+                if _framed(buf, pos):
+                    frames.append(self._decode(buf, pos))
+                    pos += FRAME_LEN
+                    continue
+                self.synced = False
+                self.sync_lost += 1
+                self.frames_bad += 1
+                pos += 1
+            # поиск: окно кадра, за которым сразу второе
+            end = len(buf) - 2 * FRAME_LEN
+            if pos > end:
+                break
+            start = buf.find(HEADER, pos, end + 1)
+            if start < 0:
+                self.bytes_skipped += end + 1 - pos
+                pos = end + 1
+                break
+            self.bytes_skipped += start - pos
+            if _framed(buf, start) and _framed(buf, start + FRAME_LEN):
+                self.synced = True
+                pos = start
+            else:
+                self.frames_bad += 1
+                pos = start + 1
+        if pos:
+            del buf[:pos]
+        if self.newest_only and len(frames) > 1:
+            return frames[-1:]
+        return frames
+
+    def _decode(self, buf, start: int):
+        flags = buf[start + 23]
+        self.frames_ok += 1
+        if flags & FLAG_FAILSAFE:
+            self.failsafe += 1
+            return None
+        if flags & FLAG_FRAME_LOST:
+            self.frames_lost += 1
+            return None
+        return unpack_channels(buf, start + 1)
+
+    def needed(self) -> int:
+        # байт до конца начатого кадра (для VMIN приёмника); без синхронизации
+        # нужна пара кадров
+        need = FRAME_LEN if self.synced else 2 * FRAME_LEN
+        pending = len(self.buffer)
+        return need - pending if pending < need else 1
+
+    def reset(self):
+        self.buffer.clear()
+        self.synced = False
+
+def _framed(buf, start: int) -> bool:
+    return buf[start] == HEADER and buf[start + FRAME_LEN - 1] in FOOTERS
+
+def build_frame(channels, flags: int = 0) -> bytes:
+    # кадр для тестов/симуляции
+    return bytes((HEADER,)) + pack_channels(channels) + bytes((flags, 0x00))
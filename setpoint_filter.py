@@ -0,0 +1,161 @@
+import json
+import math
+import os
+
+# ===== ФИЛЬТР УСТАВОК =====
+# Между channel_map и моторами: цели осей с пульта дрожат на пару единиц
+# канала, а это десятки шагов и смена направления каждый кадр. Для каждой
+# оси по порядку:
+#   One-Euro  — низкочастотный фильтр, частота среза которого растёт со
+#               скоростью ручки: в покое дрожь гасится, резкий жест — почти
+#               без задержки (min_cutoff Гц, beta, d_cutoff Гц; min_cutoff 0 —
+#               без сглаживания)
+#   max_rate  — уставка меняется не быстрее max_rate шаг/с (0 — без предела)
+#   deadband  — выход держится, пока сглаженная цель не уйдёт от него на
+#               deadband шагов; когда ручка успокоилась (сырая цель не менялась
+#               STILL_FRAMES кадров и сглаженная с ней сошлась), выход встаёт
+#               точно в сырую цель — отпущенный газ доходит до нуля
+# Время — по номеру кадра: dt — период кадров пульта. Его задаёт приёмник
+# (data_receiver: по протоколу, затем по приходу кадров, не короче периода
+# протокола), поэтому ускоренное воспроизведение записи фильтрует так же,
+# как на машине. FRAME_PERIOD — период iBus, когда dt не задан.
+# Оси без записи (АКПП — ступени) проходят как есть.
+
+SETPOINT_FILTER_FILE = "setpoint_filter.json"
+FRAME_PERIOD = 0.007  # кадр iBus
+SETTLED = 1.0         # шагов между сглаженной и сырой целью — сошлись
+STILL_FRAMES = 4      # кадров без изменения сырой цели — ручка стоит
+
+SETPOINT_FILTER = [
+    {"axis": 0, "deadband": 30, "min_cutoff": 2.0, "beta": 0.002, "d_cutoff": 1.0, "max_rate": 0},
+    {"axis": 1, "deadband": 20, "min_cutoff": 3.0, "beta": 0.005, "d_cutoff": 1.0, "max_rate": 0},
+    {"axis": 2, "deadband": 20, "min_cutoff": 3.0, "beta": 0.005, "d_cutoff": 1.0, "max_rate": 0},
+]
+
+def load_setpoint_filter(path: str = SETPOINT_FILTER_FILE):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return SETPOINT_FILTER
+
+def _alpha(cutoff: float, dt: float) -> float:
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+class AxisFilter:
+    __slots__ = ("axis", "deadband", "min_cutoff", "beta", "d_cutoff", "max_rate", "d_alpha", "max_step",
+                 "smooth", "slope", "held", "raw", "still",
+                 "raw_dir", "out_dir", "raw_reversals", "out_reversals", "raw_travel", "out_travel")
+
+    def __init__(self, entry, dt: float = FRAME_PERIOD):
+        self.axis = entry["axis"]
+        self.deadband = entry.get("deadband", 0)
+        self.min_cutoff = entry.get("min_cutoff", 0.0)
+        self.beta = entry.get("beta", 0.0)
+        self.d_cutoff = entry.get("d_cutoff", 1.0)
+        self.max_rate = entry.get("max_rate", 0)
+        self.retime(dt)
+        self.smooth = None
+        self.slope = 0.0
+        self.held = 0
+        self.raw = 0
+        self.still = 0
+        self.raw_dir = self.out_dir = 0
+        self.raw_reversals = self.out_reversals = 0
+        self.raw_travel = self.out_travel = 0
+
+    def retime(self, dt: float):
+        # постоянные, зависящие от периода кадров
+        self.d_alpha = _alpha(self.d_cutoff, dt)
+        self.max_step = self.max_rate * dt if self.max_rate else 0.0
+
+    def reset(self, value: int):
+        # без сглаживания и предела скорости: безопасные цели при потере связи
+        self.smooth = float(value)
+        self.slope = 0.0
+        self.held = value
+        self.raw = value
+        self.still = 0
+
+    def update(self, raw: int, dt: float) -> int:
+        # сколько разворотов и шагов было бы без фильтра
+        delta = raw - self.raw
+        if delta:
+            self.raw_travel += abs(delta)
+            direction = 1 if delta > 0 else -1
+            if direction == -self.raw_dir:
+                self.raw_reversals += 1
+            self.raw_dir = direction
+            self.raw = raw
+            self.still = 0
+        else:
+            self.still += 1
+
+        smooth = self.smooth
+        if smooth is None:
+            self.reset(raw)
+            return raw
+        if self.min_cutoff:
+            slope = (raw - smooth) / dt
+            self.slope += self.d_alpha * (slope - self.slope)
+            cutoff = self.min_cutoff + self.beta * abs(self.slope)
+            smooth += _alpha(cutoff, dt) * (raw - smooth)
+        else:
+            smooth = float(raw)
+        self.smooth = smooth
+
+        held = self.held
+        if self.still >= STILL_FRAMES and abs(smooth - raw) < SETTLED:
+            goal = raw
+        elif abs(smooth - held) >= self.deadband:
+            goal = int(round(smooth))
+        else:
+            return held
+        step = goal - held
+        if self.max_step and abs(step) > self.max_step:
+            step = int(self.max_step) if step > 0 else -int(self.max_step)
+        if step:
+            self.out_travel += abs(step)
+            direction = 1 if step > 0 else -1
+            if direction == -self.out_dir:
+                self.out_reversals += 1
+            self.out_dir = direction
+            self.held = held + step
+        return self.held
+
+    def snapshot(self):
+        return {"raw_reversals": self.raw_reversals, "reversals": self.out_reversals,
+                "raw_steps": self.raw_travel, "steps": self.out_travel}
+
+class SetpointFilter:
+    # filters — кортеж AxisFilter; apply() правит список целей на месте
+
+    def __init__(self, entries=None, dt: float = FRAME_PERIOD):
+        entries = entries if entries is not None else load_setpoint_filter()
+        self.dt = dt
+        self.filters = tuple(AxisFilter(entry, dt) for entry in entries)
+
+    def retime(self, dt: float):
+        self.dt = dt
+        for f in self.filters:
+            f.retime(dt)
+
+    def apply(self, targets):
+        dt = self.dt
+        for f in self.filters:
+            targets[f.axis] = f.update(targets[f.axis], dt)
+
+    def reset(self, targets):
+        for f in self.filters:
+            f.reset(targets[f.axis])
+
+    def snapshot(self):
+        # saved_* — сбережённое фильтром: разворотов уставки и шагов пути
+        # (путь уставки — оценка сверху шагов, которые сделал бы мотор)
+        axes = {}
+        for f in self.filters:
+            s = f.snapshot()
+            s["saved_reversals"] = s["raw_reversals"] - s["reversals"]
+            s["saved_steps"] = s["raw_steps"] - s["steps"]
+            axes[str(f.axis)] = s
+        return axes
@@ -0,0 +1,208 @@
+import json
+import os
+import tempfile
+import threading
+from types import MappingProxyType
+
+from axes import TABLE as AXIS_TABLE, setting_keys
+
+# ===== НАСТРОЙКИ МОТОРОВ =====
+# Правки копятся в памяти и пишутся на диск с задержкой (debounce) атомарно:
+# временный файл + fsync + rename. Моторам отдаётся неизменяемый снимок с
+# номером версии; у неизменённых осей в новом снимке те же объекты, так что
+# изменившуюся ось видно простым сравнением ссылок.
+
+SAVE_DELAY = 1.0  # с тишины после последней правки до записи
+# не ноль: с нулевой скоростью или разгоном ось не едет вовсе
+POSITIVE_KEYS = ("speed", "acceleration")
+
+def value_range(axis: int, key: str):
+    # допустимые значения параметра оси: (наименьшее, наибольшее или None)
+    hi = AXIS_TABLE[axis].get("max_speed") if key == "speed" else None
+    return (1 if key in POSITIVE_KEYS else 0), hi
+
+def check_value(axis: int, key: str, value):
+    # одна проверка на все пути правки: меню, API, файл на диске
+    name = AXIS_TABLE[axis]["name"]
+    if type(value) is not int:
+        raise ValueError(f"{name}.{key}: ожидается целое, а не {value!r}")
+    lo, hi = value_range(axis, key)
+    if value < lo:
+        raise ValueError(f"{name}.{key}: меньше {lo}")
+    if hi is not None and value > hi:
+        raise ValueError(f"{name}.{key}: больше предела {hi}")
+
+def normalize_settings(settings):
+    # по оси на строку таблицы осей, только её ключи; недостающие оси и
+    # ключи (файл от машины с меньшим числом осей) — из настроек таблицы
+    result = []
+    for i, entry in enumerate(AXIS_TABLE):
+        defaults = entry["settings"]
+        cfg = settings[i] if i < len(settings) else defaults
+        axis = {key: cfg.get(key, defaults[key]) for key in setting_keys(entry)}
+        # рывок (S-кривая разгона) — необязательный параметр
+        if "jerk" in cfg:
+            axis["jerk"] = cfg["jerk"]
+        result.append(axis)
+    return result
+
+def validate_settings(data):
+    # файл, исправленный на ходу, — строго по таблице осей, иначе ValueError
+    # и моторы остаются на прежних настройках (при запуске хватает
+    # normalize_settings: лучше поехать с умолчаниями, чем не поехать)
+    if not isinstance(data, list):
+        raise ValueError("ожидается список настроек по осям")
+    if len(data) > len(AXIS_TABLE):
+        raise ValueError(f"осей {len(data)}, в таблице осей {len(AXIS_TABLE)}")
+    for i, (entry, cfg) in enumerate(zip(AXIS_TABLE, data)):
+        name = entry["name"]
+        if not isinstance(cfg, dict):
+            raise ValueError(f"{name}: ожидается объект")
+        allowed = setting_keys(entry) + ["jerk"]
+        for key, value in cfg.items():
+            if key not in allowed:
+                raise ValueError(f"{name}: неизвестный параметр {key}")
+            check_value(i, key, value)
+    return normalize_settings(data)
+
+def validate_akpp_center(data) -> int:
+    value = data.get("akpp_center_value") if isinstance(data, dict) else None
+    if type(value) is not int:
+        raise ValueError("akpp_center_value: ожидается целое")
+    return value
+
+class SettingsSnapshot:
+    __slots__ = ("version", "axes")
+
+    def __init__(self, version: int, axes: tuple):
+        self.version = version
+        self.axes = axes
+
+    def as_list(self):
+        return [dict(axis) for axis in self.axes]
+
+def _freeze(settings) -> tuple:
+    return tuple(MappingProxyType(dict(cfg)) for cfg in settings)
+
+def atomic_write_json(path: str, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    # rename надёжен только после fsync каталога
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+class SettingsStore:
+    def __init__(self, path: str, settings, save_delay: float = SAVE_DELAY):
+        self.path = path
+        self.save_delay = save_delay
+        self.snapshot = SettingsSnapshot(0, _freeze(normalize_settings(settings)))
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._notify_lock = threading.Lock()
+        self._timer = None
+        self._saved_version = 0
+        self._saved_axes = self.snapshot.axes  # что сейчас в файле (по нашим сведениям)
+
+    def subscribe(self, listener):
+        # listener(snapshot) зовётся в потоке, сделавшем правку
+        self.listeners.append(listener)
+
+    def update(self, axis: int, key: str, value):
+        check_value(axis, key, value)
+        with self._lock:
+            old = self.snapshot
+            if old.axes[axis].get(key) == value:
+                return old
+            cfg = dict(old.axes[axis])
+            cfg[key] = value
+            axes = old.axes[:axis] + (MappingProxyType(cfg),) + old.axes[axis + 1:]
+            snapshot = SettingsSnapshot(old.version + 1, axes)
+            self.snapshot = snapshot
+            self._schedule_save()
+        self._notify()
+        return snapshot
+
+    def replace(self, settings):
+        # целиком; неизменённые оси сохраняют объекты
+        return self._replace(_freeze(normalize_settings(settings)), from_file=False)
+
+    def reload(self, settings):
+        # файл изменили снаружи: снимок — из него, обратно на диск не пишем.
+        # Своя же запись (совпадает с последней сохранённой) пропускается —
+        # иначе её позднее прочтение откатило бы правки, сделанные после.
+        return self._replace(_freeze(normalize_settings(settings)), from_file=True)
+
+    def _replace(self, new_axes, from_file: bool):
+        with self._lock:
+            old = self.snapshot
+            if from_file and new_axes == self._saved_axes:
+                return old
+            axes = []
+            for i, cfg in enumerate(new_axes):
+                prev = old.axes[i] if i < len(old.axes) else None
+                axes.append(prev if prev == cfg else cfg)
+            axes = tuple(axes)
+            if len(axes) == len(old.axes) and all(a is b for a, b in zip(axes, old.axes)):
+                snapshot = None
+            else:
+                snapshot = self.snapshot = SettingsSnapshot(old.version + 1, axes)
+            if from_file:
+                # память и файл совпали: отложенная запись не нужна
+                self._saved_axes = axes
+                self._saved_version = self.snapshot.version
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            elif snapshot is not None:
+                self._schedule_save()
+        if snapshot is None:
+            return old
+        self._notify()
+        return snapshot
+
+    def _notify(self):
+        # слушатели — по одному и всегда с последним снимком: правки из
+        # разных потоков (меню, API, слежение за файлом) не применяются к
+        # моторам задом наперёд и не пишут общую память ядра одновременно
+        with self._notify_lock:
+            snapshot = self.snapshot
+            for listener in self.listeners:
+                listener(snapshot)
+
+    def _schedule_save(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.save_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            snapshot = self.snapshot
+            if snapshot.version == self._saved_version:
+                return
+            atomic_write_json(self.path, snapshot.as_list())
+            self._saved_version = snapshot.version
+            self._saved_axes = snapshot.axes
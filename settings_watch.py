@@ -0,0 +1,150 @@
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+
+import stats
+
+# ===== СЛЕЖЕНИЕ ЗА ФАЙЛАМИ НАСТРОЕК =====
+# motor_settings.json и akpp_center.json, исправленные на диске (редактор по
+# SSH, scp), применяются без перезапуска. inotify на каталогах файлов:
+# IN_CLOSE_WRITE — запись на месте, IN_MOVED_TO — атомарная замена
+# переименованием (так пишет и SettingsStore). После события — пауза SETTLE,
+# пока редактор дописывает, затем обработчик файла. Обработчик проверяет
+# содержимое; ValueError или OSError — файл отклонён, работают прежние
+# настройки. Без inotify (не Linux) — опрос mtime раз в WATCH_POLL.
+
+SETTINGS_WATCH = os.environ.get("SETTINGS_WATCH", "inotify")  # inotify, poll или off
+WATCH_POLL = 1.0
+SETTLE = 0.1
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_event = struct.Struct("iIII")  # wd, mask, cookie, len; дальше имя
+
+def _stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+class SettingsWatcher(threading.Thread):
+    # handlers — {путь: обработчик(путь)}
+
+    def __init__(self, handlers, mode: str = SETTINGS_WATCH):
+        super().__init__(name="settings-watch", daemon=True)
+        self.handlers = {os.path.abspath(path): handler for path, handler in handlers.items()}
+        self.applied = 0
+        self.rejected = 0
+        self.last_error = None
+        self.running = True
+        self._wake_r, self._wake_w = os.pipe()
+        self.fd = None
+        self._dirs = {}
+        if mode == "inotify":
+            try:
+                self.fd = self._open_inotify()
+            except (OSError, AttributeError):
+                mode = "poll"
+        self.mode = mode
+        self._stamps = {path: _stamp(path) for path in self.handlers}
+        stats.register("settings_watch", self.snapshot)
+
+    def _open_inotify(self) -> int:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        for directory in {os.path.dirname(path) for path in self.handlers}:
+            wd = libc.inotify_add_watch(fd, directory.encode(), IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                err = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(err, f"inotify_add_watch {directory}")
+            self._dirs[wd] = directory
+        return fd
+
+    def run(self):
+        while self.running:
+            changed = self._wait(None)
+            if not changed:
+                continue
+            # редактор пишет в несколько приёмов: ждём тишины
+            while self.running:
+                more = self._wait(SETTLE)
+                if not more:
+                    break
+                changed |= more
+            for path in sorted(changed):
+                self._apply(path)
+        if self.fd is not None:
+            os.close(self.fd)
+
+    def _wait(self, timeout):
+        # изменившиеся файлы из handlers; пусто — таймаут или остановка
+        if self.fd is None:
+            ready, _, _ = select.select([self._wake_r], [], [], WATCH_POLL if timeout is None else timeout)
+            if ready:
+                self.running = False
+                return set()
+            changed = set()
+            for path, old in self._stamps.items():
+                stamp = _stamp(path)
+                if stamp != old:
+                    self._stamps[path] = stamp
+                    changed.add(path)
+            return changed
+
+        ready, _, _ = select.select([self.fd, self._wake_r], [], [], timeout)
+        if self._wake_r in ready:
+            self.running = False
+            return set()
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        off = 0
+        while off + _event.size <= len(data):
+            wd, mask, cookie, length = _event.unpack_from(data, off)
+            name = data[off + _event.size:off + _event.size + length].rstrip(b"\0")
+            off += _event.size + length
+            path = os.path.join(self._dirs.get(wd, ""), os.fsdecode(name))
+            if path in self.handlers:
+                changed.add(path)
+        return changed
+
+    def _apply(self, path: str):
+        try:
+            self.handlers[path](path)
+        except (OSError, ValueError) as e:
+            self.rejected += 1
+            self.last_error = f"{os.path.basename(path)}: {e}"
+            print(f"settings: {self.last_error} — остаются прежние", file=sys.stderr, flush=True)
+            return
+        self.applied += 1
+
+    def stop(self):
+        self.running = False
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+
+    def snapshot(self):
+        return {"mode": self.mode, "applied": self.applied, "rejected": self.rejected,
+                "last_error": self.last_error}
+
+def start(handlers, mode: str = SETTINGS_WATCH):
+    if mode == "off":
+        return None
+    watcher = SettingsWatcher(handlers, mode)
+    watcher.start()
+    return watcher
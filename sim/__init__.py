@@ -0,0 +1,20 @@
+import os
+import sys
+import types
+
+# ===== СИМУЛЯЦИЯ БЕЗ ЖЕЛЕЗА =====
+# install() подкладывает поддельный RPi.GPIO (sim.gpio) и файл вместо
+# /dev/fb0 — до импорта motor_control и menu. UART — sim.uart.PtyUart
+# (адрес отдаётся приёмнику через UART_PORT), пульт — sim.ibus_gen,
+# тачскрин — sim.touch.FakeTouchDevice.
+
+def install(framebuffer: bool = True):
+    from sim import gpio
+    package = types.ModuleType("RPi")
+    package.GPIO = gpio
+    sys.modules["RPi"] = package
+    sys.modules["RPi.GPIO"] = gpio
+    if framebuffer and "FRAMEBUFFER" not in os.environ:
+        from sim.fb import fake_framebuffer
+        fake_framebuffer()
+    return gpio
@@ -0,0 +1,19 @@
+import os
+import tempfile
+
+# ===== ПОДДЕЛЬНЫЙ FRAMEBUFFER =====
+# framebuffer.Framebuffer уже умеет мапить обычный файл; здесь — временный
+# файл нужного размера и чтение из него того, что «показано на экране».
+# FRAMEBUFFER читается при импорте framebuffer, поэтому fake_framebuffer()
+# зовётся до импорта menu.
+
+def fake_framebuffer(width: int = 800, height: int = 480) -> str:
+    fd, path = tempfile.mkstemp(prefix="fb-sim-")
+    os.ftruncate(fd, width * height * 2)
+    os.close(fd)
+    os.environ["FRAMEBUFFER"] = path
+    return path
+
+def read_frame(path: str, width: int = 800, height: int = 480):
+    import numpy as np
+    return np.fromfile(path, dtype=np.uint16, count=width * height).reshape(height, width)
@@ -0,0 +1,103 @@
+import time
+
+# ===== ПОДДЕЛЬНЫЙ RPi.GPIO =====
+# Тот же интерфейс, что у RPi.GPIO, которым пользуется GpioBackend, но без
+# железа: каждая смена уровня выхода пишется фронтом (t_ns, pin, level) по
+# monotonic_ns. Входы (концевики) задаются через set_input().
+
+BCM = 11
+BOARD = 10
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+RPI_INFO = {"TYPE": "sim", "P1_REVISION": 3}
+VERSION = "sim"
+
+edges = []
+levels = {}
+inputs = {}
+modes = {}
+watchers = {}  # pin -> (edge, callback)
+_mode = None
+
+def _pins(channel):
+    return channel if isinstance(channel, (list, tuple)) else (channel,)
+
+def setmode(mode):
+    global _mode
+    _mode = mode
+
+def getmode():
+    return _mode
+
+def setwarnings(flag):
+    pass
+
+def setup(channel, direction, pull_up_down=PUD_OFF, initial=None):
+    for pin in _pins(channel):
+        modes[pin] = direction
+        if direction == OUT:
+            levels[pin] = LOW if initial is None else initial
+        elif pin not in inputs:
+            inputs[pin] = LOW if pull_up_down == PUD_DOWN else HIGH
+
+def output(channel, value):
+    now = time.monotonic_ns()
+    values = value if isinstance(value, (list, tuple)) else None
+    for n, pin in enumerate(_pins(channel)):
+        level = HIGH if (values[n] if values is not None else value) else LOW
+        if levels.get(pin) != level:
+            levels[pin] = level
+            edges.append((now, pin, level))
+
+def input(channel):
+    if modes.get(channel) == OUT:
+        return levels.get(channel, LOW)
+    return inputs.get(channel, HIGH)
+
+def add_event_detect(channel, edge, callback=None, bouncetime=None):
+    if channel in watchers:
+        raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+    watchers[channel] = (edge, callback)
+
+def remove_event_detect(channel):
+    watchers.pop(channel, None)
+
+def cleanup(channel=None):
+    for pin in (_pins(channel) if channel is not None else list(modes)):
+        modes.pop(pin, None)
+        levels.pop(pin, None)
+        watchers.pop(pin, None)
+
+# ===== ДЛЯ СИМУЛЯЦИИ =====
+def set_input(pin: int, level: int):
+    # колбэк add_event_detect зовётся сразу, в потоке вызывающего
+    old = inputs.get(pin, HIGH)
+    inputs[pin] = level
+    watcher = watchers.get(pin)
+    if watcher is None or old == level:
+        return
+    edge, callback = watcher
+    if callback is not None and (edge == BOTH or (edge == FALLING) == (level == LOW)):
+        callback(pin)
+
+def clear_edges():
+    del edges[:]
+
+def rising_edges(pin: int, since_ns: int = 0):
+    return [t for t, p, level in edges if p == pin and level == HIGH and t >= since_ns]
+
+def reset():
+    clear_edges()
+    levels.clear()
+    inputs.clear()
+    modes.clear()
+    watchers.clear()
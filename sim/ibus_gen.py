@@ -0,0 +1,55 @@
+import math
+import random
+
+import ibus
+import rc_protocols
+from channel_map import SIGNAL_CHANNEL
+
+# ===== СИНТЕТИЧЕСКИЙ ПУЛЬТ =====
+# Кадры iBus по времени: руль — синус, газ и тормоз — встречные пилы,
+# АКПП переключается R/N/D по кругу. Каналы, которые не двигаются,
+# стоят в 1500; канал связи — в норме, пока не выставлен lost.
+# noise — дрожь руля, газа и тормоза в мкс (±noise, повторяемая по seed).
+# protocol — в чьих кадрах отдавать каналы (rc_protocols: ibus, sbus, crsf).
+
+FRAME_PERIOD = 0.007  # пульты FlySky шлют кадр раз в 7 мс
+
+class IBusGenerator:
+    def __init__(self, period: float = FRAME_PERIOD, steer_period: float = 2.0,
+                 pedal_period: float = 3.0, gear_period: float = 5.0, noise: int = 0, seed: int = 1,
+                 protocol: str = "ibus"):
+        self.period = period
+        self.build_frame = rc_protocols.get_protocol(protocol).build_frame
+        self.noise = noise
+        self._random = random.Random(seed)
+        self.steer_period = steer_period
+        self.pedal_period = pedal_period
+        self.gear_period = gear_period
+        self.lost = False
+
+    def channels(self, t: float) -> list:
+        channels = [1500] * ibus.CHANNELS
+        channels[0] = 1500 + int(500 * math.sin(2 * math.pi * t / self.steer_period))
+        phase = (t / self.pedal_period) % 1.0
+        channels[1] = 1500 + int(500 * phase)
+        channels[2] = 2000 - int(1000 * phase)
+        channels[5] = (1000, 1500, 2000)[int(t / self.gear_period) % 3]
+        if self.noise:
+            for ch in (0, 1, 2):
+                channels[ch] += self._random.randint(-self.noise, self.noise)
+        channels[SIGNAL_CHANNEL] = 0 if self.lost else 1500
+        return channels
+
+    def frame(self, t: float) -> bytes:
+        return self.build_frame(self.channels(t))
+
+    def stream(self, seconds: float) -> bytes:
+        # готовый поток за seconds секунд — для разбора без таймингов
+        count = int(seconds / self.period)
+        return b"".join(self.frame(n * self.period) for n in range(count))
+
+def still_frame(steer: int = 1500, gas: int = 1500, brake: int = 1000, gear: int = 1500) -> bytes:
+    # кадр с заданными органами управления и нормальной связью
+    channels = [1500] * ibus.CHANNELS
+    channels[0], channels[1], channels[2], channels[5] = steer, gas, brake, gear
+    return ibus.build_frame(channels)
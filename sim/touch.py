@@ -0,0 +1,50 @@
+import os
+from collections import namedtuple
+
+from evdev import ecodes
+
+# ===== ПОДДЕЛЬНЫЙ ТАЧСКРИН =====
+# Вместо evdev.InputDevice: fd — читающий конец пайпа, так что epoll в
+# Menu.touch_listener_thread работает как с настоящим устройством.
+
+Event = namedtuple("Event", "type code value")
+
+class FakeTouchDevice:
+    # inject() кладёт касание и будит epoll
+    name = "fake touchscreen"
+
+    def __init__(self):
+        self.fd, self._w = os.pipe()
+        os.set_blocking(self.fd, False)
+        self._events = []
+
+    def inject(self, x: int, y: int):
+        self._events.append([
+            Event(ecodes.EV_ABS, ecodes.ABS_MT_POSITION_X, x),
+            Event(ecodes.EV_ABS, ecodes.ABS_MT_POSITION_Y, y),
+            Event(ecodes.EV_KEY, ecodes.BTN_TOUCH, 1),
+        ])
+        os.write(self._w, b"e")
+
+    def release(self):
+        self._events.append([Event(ecodes.EV_KEY, ecodes.BTN_TOUCH, 0)])
+        os.write(self._w, b"e")
+
+    def read(self):
+        os.read(self.fd, 64)
+        batch = []
+        while self._events:
+            batch.extend(self._events.pop(0))
+        if not batch:
+            raise BlockingIOError
+        return batch
+
+    def grab(self):
+        pass
+
+    def ungrab(self):
+        pass
+
+    def close(self):
+        os.close(self.fd)
+        os.close(self._w)
@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+import tty
+
+# ===== UART НА PTY =====
+# Пара псевдотерминалов вместо /dev/ttyAMA0: приёмник открывает port (ведомая
+# сторона) обычным pyserial, а симуляция пишет байты в ведущую. Ведомый fd
+# держим открытым сами — иначе после закрытия приёмником запись даёт EIO.
+
+class PtyUart:
+    def __init__(self):
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.sent = []  # (monotonic_ns, байт) каждой записи из play()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def write(self, data) -> int:
+        # момент записи — для замеров задержки «пакет -> шаг»
+        view = memoryview(data)
+        now = time.monotonic_ns()
+        while view:
+            view = view[os.write(self.master, view):]
+        return now
+
+    def play(self, source, seconds: float = None):
+        # source — IBusGenerator: кадр раз в source.period по абсолютным
+        # дедлайнам, чтобы темп не плыл от времени записи
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._play, args=(source, seconds),
+                                        name="pty-uart", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _play(self, source, seconds):
+        period_ns = int(source.period * 1e9)
+        start = time.monotonic_ns()
+        end = start + int(seconds * 1e9) if seconds is not None else None
+        deadline = start
+        stopped = self._stop_event.is_set
+        while not stopped():
+            if end is not None and deadline >= end:
+                break
+            frame = source.frame((deadline - start) / 1e9)
+            self.sent.append((self.write(frame), len(frame)))
+            deadline += period_ns
+            delay = deadline - time.monotonic_ns()
+            if delay > 0:
+                self._stop_event.wait(delay / 1e9)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
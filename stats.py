@@ -0,0 +1,200 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from array import array
+
+import axes
+
+# ===== СЧЁТЧИКИ И ГИСТОГРАММЫ =====
+# Запись в горячем пути — инкремент ячейки готового массива, без списков,
+# словарей и блокировок. Снимок (JSON) собирается в чужом потоке: сервер
+# на UNIX-сокете отдаёт его каждому подключившемуся и закрывает соединение.
+# Значения гистограмм — микросекунды; корзина k — [2^(k-1), 2^k) мкс,
+# корзина 0 — меньше 1 мкс, последняя — всё, что больше.
+
+BUCKETS = 24  # до ~8 с
+STATS_SOCKET = os.environ.get("STATS_SOCKET", "/tmp/tihon-stats.sock")
+
+class Histogram:
+    __slots__ = ("counts", "peak")
+
+    def __init__(self):
+        self.counts = array('q', bytes(8 * BUCKETS))
+        self.peak = 0
+
+    def record_ns(self, ns: int):
+        us = ns // 1000
+        k = us.bit_length()
+        self.counts[k if k < BUCKETS else BUCKETS - 1] += 1
+        if us > self.peak:
+            self.peak = us
+
+    def reset(self):
+        for k in range(BUCKETS):
+            self.counts[k] = 0
+        self.peak = 0
+
+    def snapshot(self):
+        counts = list(self.counts)
+        total = sum(counts)
+        result = {"count": total, "max_us": self.peak, "buckets": counts}
+        # перцентили — верхней границей корзины
+        for name, q in (("p50_us", 0.5), ("p90_us", 0.9), ("p99_us", 0.99)):
+            result[name] = _bucket_quantile(counts, total, q)
+        return result
+
+def _bucket_quantile(counts, total: int, q: float):
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for k, n in enumerate(counts):
+        seen += n
+        if seen >= rank:
+            return 1 << k if k else 1
+    return 1 << (BUCKETS - 1)
+
+class Counters:
+    # именованные счётчики в одном массиве: counters.add(INDEX)
+    __slots__ = ("names", "values")
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.values = array('q', bytes(8 * len(self.names)))
+
+    def add(self, index: int, n: int = 1):
+        self.values[index] += n
+
+    def snapshot(self):
+        return dict(zip(self.names, self.values))
+
+    def reset(self):
+        for k in range(len(self.values)):
+            self.values[k] = 0
+
+# ===== ЧТО МЕРИМ =====
+# опоздание шага move_motor относительно дедлайна плана, по осям
+STEP_LATENESS = tuple(Histogram() for _ in range(axes.COUNT))
+# период цикла шагов (между вызовами step_all) и время обработки
+# одной порции в приёмнике (без ожидания UART)
+STEP_LOOP_PERIOD = Histogram()
+RECEIVER_ITERATION = Histogram()
+
+SETTINGS_RELOADS = 0    # снимок настроек применён к моторам
+CHANNEL_MAP_BUILDS = 1  # таблицы каналов пересобраны
+LINK_TIMEOUTS = 2       # кадры не приходили дольше LINK_TIMEOUT
+counters = Counters(("settings_reloads", "channel_map_builds", "link_timeouts"))
+
+# источники, которые уже считают сами (IBusParser): опрашиваются при снимке
+_sources = {}
+
+def register(name: str, source):
+    # source() -> dict; зовётся в потоке экспорта
+    _sources[name] = source
+
+def read(name: str):
+    # один источник без полного снимка (страница телеметрии меню); None — нет такого
+    source = _sources.get(name)
+    if source is None:
+        return None
+    try:
+        return source()
+    except Exception:
+        return None
+
+def snapshot():
+    result = {
+        "time": time.time(),
+        "pid": os.getpid(),
+        "counters": counters.snapshot(),
+        "step_lateness": [h.snapshot() for h in STEP_LATENESS],
+        "step_loop_period": STEP_LOOP_PERIOD.snapshot(),
+        "receiver_iteration": RECEIVER_ITERATION.snapshot(),
+    }
+    for name, source in list(_sources.items()):
+        try:
+            result[name] = source()
+        except Exception:
+            pass
+    return result
+
+def reset():
+    for h in STEP_LATENESS:
+        h.reset()
+    STEP_LOOP_PERIOD.reset()
+    RECEIVER_ITERATION.reset()
+    counters.reset()
+
+# ===== ЭКСПОРТ =====
+class StatsServer(threading.Thread):
+    # «reset» в первой строке запроса обнуляет гистограммы после снимка
+
+    def __init__(self, path: str = STATS_SOCKET):
+        super().__init__(name="stats-server", daemon=True)
+        self.path = path
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(path)
+        self.sock.listen(4)
+
+    def run(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.settimeout(0.05)
+                    try:
+                        request = conn.recv(64)
+                    except socket.timeout:
+                        request = b""  # клиент без запроса (socat и т.п.)
+                    conn.sendall(json.dumps(snapshot()).encode())
+                    if request.strip() == b"reset":
+                        reset()
+                except OSError:
+                    pass
+
+    def close(self):
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+def serve(path: str = STATS_SOCKET):
+    # без прав на каталог — живём без экспорта
+    try:
+        server = StatsServer(path)
+    except OSError:
+        return None
+    server.start()
+    return server
+
+def fetch(path: str = STATS_SOCKET, reset_after: bool = False, timeout: float = 1.0):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(b"reset\n" if reset_after else b"get\n")
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b"".join(chunks))
+
+if __name__ == "__main__":
+    # python stats.py [путь сокета] [reset]
+    args = sys.argv[1:]
+    reset_after = "reset" in args
+    paths = [a for a in args if a != "reset"]
+    print(json.dumps(fetch(paths[0] if paths else STATS_SOCKET, reset_after),
+                     indent=4, ensure_ascii=False))
@@ -0,0 +1,321 @@
+import os
+import time
+
+# ===== ВЫХОД STEP/DIR =====
+# Бэкенд отвечает только за электрические уровни: когда и какой шаг делать,
+# решает motor_control. Небатчевые бэкенды делают импульс сразу в step()
+# (step_many() — одним стробом на несколько осей), батчевые копят сегмент
+# через queue_*() и отдают его целиком в flush().
+
+HIGH = 1
+LOW = 0
+
+def _busy_wait_us(us: int):
+    # минимальная точность на Pi в userspace — единицы микросекунд
+    target = time.perf_counter() + us / 1_000_000.0
+    while time.perf_counter() < target:
+        pass
+
+class StepBackend:
+    name = "base"
+    batched = False
+
+    def __init__(self, pulse_us: int = 3):
+        self.pulse_us = pulse_us
+
+    def setup_outputs(self, pins):
+        pass
+
+    def setup_inputs(self, pins):
+        pass
+
+    def set_dir(self, pin: int, level: int):
+        raise NotImplementedError
+
+    def step(self, pin: int):
+        raise NotImplementedError
+
+    def step_many(self, pins):
+        for pin in pins:
+            self.step(pin)
+
+    def read(self, pin: int) -> int:
+        return HIGH
+
+    def watch_falling(self, pin: int, callback) -> bool:
+        # callback() на спаде входа (нажатие концевика); False — бэкенд
+        # так не умеет, вход придётся опрашивать
+        return False
+
+    def unwatch(self, pin: int):
+        pass
+
+    # --- батчевый режим: смещения в нс от начала сегмента ---
+    def queue_pulses(self, pin: int, offsets_ns):
+        raise NotImplementedError
+
+    def queue_level(self, pin: int, level: int, offset_ns: int):
+        raise NotImplementedError
+
+    def flush(self, start_ns: int, length_ns: int):
+        pass
+
+    def cleanup(self):
+        pass
+
+class NullBackend(StepBackend):
+    # заглушка до init_backend(): процесс, где моторы не шагают
+    name = "null"
+
+    def set_dir(self, pin: int, level: int):
+        pass
+
+    def step(self, pin: int):
+        pass
+
+    def step_many(self, pins):
+        pass
+
+class GpioBackend(StepBackend):
+    # прежний путь: RPi.GPIO, строб STEP через busy-wait
+    name = "gpio"
+
+    def __init__(self, pulse_us: int = 3):
+        super().__init__(pulse_us)
+        import RPi.GPIO as GPIO
+        self.GPIO = GPIO
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
+        self._levels = {}  # теневые уровни DIR: без записи, если не менялся
+
+    def setup_outputs(self, pins):
+        for pin in pins:
+            self.GPIO.setup(pin, self.GPIO.OUT)
+
+    def setup_inputs(self, pins):
+        for pin in pins:
+            self.GPIO.setup(pin, self.GPIO.IN, pull_up_down=self.GPIO.PUD_UP)
+
+    def set_dir(self, pin: int, level: int):
+        if self._levels.get(pin) != level:
+            self._levels[pin] = level
+            self.GPIO.output(pin, level)
+
+    def step(self, pin: int):
+        self.GPIO.output(pin, self.GPIO.HIGH)
+        _busy_wait_us(self.pulse_us)
+        self.GPIO.output(pin, self.GPIO.LOW)
+
+    def step_many(self, pins):
+        # RPi.GPIO принимает список каналов: фронты всех осей — одним вызовом
+        if len(pins) == 1:
+            self.step(pins[0])
+            return
+        self.GPIO.output(pins, self.GPIO.HIGH)
+        _busy_wait_us(self.pulse_us)
+        self.GPIO.output(pins, self.GPIO.LOW)
+
+    def read(self, pin: int) -> int:
+        return self.GPIO.input(pin)
+
+    def watch_falling(self, pin: int, callback) -> bool:
+        GPIO = self.GPIO
+        self.unwatch(pin)
+        try:
+            GPIO.add_event_detect(pin, GPIO.FALLING, callback=lambda channel: callback(),
+                                  bouncetime=5)
+        except RuntimeError:
+            return False
+        return True
+
+    def unwatch(self, pin: int):
+        try:
+            self.GPIO.remove_event_detect(pin)
+        except (RuntimeError, ValueError):
+            pass
+
+    def cleanup(self):
+        self._levels.clear()
+        self.GPIO.cleanup()
+
+class PigpioWaveBackend(StepBackend):
+    # Импульсы собираются в волну pigpio и отдаются DMA целиком:
+    # тайминг не зависит от планировщика Python. Сегменты цепляются
+    # режимом ONE_SHOT_SYNC — следующая волна стартует по окончании текущей.
+    # Адрес демона — PIGPIO_ADDR/PIGPIO_PORT (подходит и локальная заглушка).
+    name = "pigpio"
+    batched = True
+
+    def __init__(self, pulse_us: int = 3):
+        super().__init__(pulse_us)
+        import pigpio
+        self.pigpio = pigpio
+        self.pi = pigpio.pi(os.environ.get("PIGPIO_ADDR", "localhost"),
+                            int(os.environ.get("PIGPIO_PORT", 8888)))
+        if not self.pi.connected:
+            raise RuntimeError("pigpiod недоступен")
+        self.pi.wave_clear()
+        self._pending = []
+        self._sent = []
+        self._callbacks = {}
+        self._levels = {}
+
+    def setup_outputs(self, pins):
+        for pin in pins:
+            self.pi.set_mode(pin, self.pigpio.OUTPUT)
+
+    def setup_inputs(self, pins):
+        for pin in pins:
+            self.pi.set_mode(pin, self.pigpio.INPUT)
+            self.pi.set_pull_up_down(pin, self.pigpio.PUD_UP)
+
+    def set_dir(self, pin: int, level: int):
+        if self._levels.get(pin) != level:
+            self._levels[pin] = level
+            self.pi.write(pin, level)
+
+    def step(self, pin: int):
+        self.pi.gpio_trigger(pin, self.pulse_us, 1)
+
+    def step_many(self, pins):
+        # весь банк одной командой: установка и сброс маски
+        mask = 0
+        for pin in pins:
+            mask |= 1 << pin
+        self.pi.set_bank_1(mask)
+        _busy_wait_us(self.pulse_us)
+        self.pi.clear_bank_1(mask)
+
+    def read(self, pin: int) -> int:
+        return self.pi.read(pin)
+
+    def watch_falling(self, pin: int, callback) -> bool:
+        self.unwatch(pin)
+        self.pi.set_glitch_filter(pin, 5000)  # дребезг концевика, мкс
+        self._callbacks[pin] = self.pi.callback(pin, self.pigpio.FALLING_EDGE,
+                                                lambda gpio, level, tick: callback())
+        return True
+
+    def unwatch(self, pin: int):
+        cb = self._callbacks.pop(pin, None)
+        if cb is not None:
+            cb.cancel()
+
+    def queue_pulses(self, pin: int, offsets_ns):
+        pulse = self.pigpio.pulse
+        mask = 1 << pin
+        train = []
+        t_us = 0
+        for offset in offsets_ns:
+            at = offset // 1000
+            if at > t_us:
+                train.append(pulse(0, 0, at - t_us))
+                t_us = at
+            train.append(pulse(mask, 0, self.pulse_us))
+            train.append(pulse(0, mask, 0))
+            t_us += self.pulse_us
+        self._pending.append(train)
+
+    def queue_level(self, pin: int, level: int, offset_ns: int):
+        # уровень после волны — и для set_dir, чтобы не пропустить запись
+        self._levels[pin] = level
+        pulse = self.pigpio.pulse
+        mask = 1 << pin
+        on, off = (mask, 0) if level else (0, mask)
+        self._pending.append([pulse(0, 0, offset_ns // 1000), pulse(on, off, 0)])
+
+    def flush(self, start_ns: int, length_ns: int):
+        if not self._pending:
+            return
+        # все оси сливаются в одну волну (wave_add_generic мержит по времени),
+        # хвостовая пауза выравнивает длину волны по сегменту
+        pulse = self.pigpio.pulse
+        for train in self._pending:
+            self.pi.wave_add_generic(train)
+        self.pi.wave_add_generic([pulse(0, 0, length_ns // 1000)])
+        self._pending = []
+        wave = self.pi.wave_create()
+        if wave < 0:
+            return
+        self.pi.wave_send_using_mode(wave, self.pigpio.WAVE_MODE_ONE_SHOT_SYNC)
+        self._sent.append(wave)
+        # текущая и следующая волны ещё нужны DMA, более старые — удаляем
+        while len(self._sent) > 2:
+            self.pi.wave_delete(self._sent.pop(0))
+
+    def cleanup(self):
+        try:
+            self.pi.wave_tx_stop()
+            self.pi.wave_clear()
+        finally:
+            self.pi.stop()
+
+class SimBackend(StepBackend):
+    # Без железа: пишет фронты (t_ns, pin, level) для тестов и бенчмарков.
+    name = "sim"
+
+    def __init__(self, pulse_us: int = 3, batched: bool = False):
+        super().__init__(pulse_us)
+        self.batched = batched
+        self.edges = []
+        self.levels = {}
+        self.inputs = {}
+        self.watchers = {}
+        self._pending = []
+
+    def set_input(self, pin: int, level: int):
+        # «нажать» концевик в симуляции; спад вызывает watch_falling
+        old = self.inputs.get(pin, HIGH)
+        self.inputs[pin] = level
+        if old == HIGH and level == LOW and pin in self.watchers:
+            self.watchers[pin]()
+
+    def watch_falling(self, pin: int, callback) -> bool:
+        self.watchers[pin] = callback
+        return True
+
+    def unwatch(self, pin: int):
+        self.watchers.pop(pin, None)
+
+    def set_dir(self, pin: int, level: int):
+        self.levels[pin] = level
+        self.edges.append((time.monotonic_ns(), pin, level))
+
+    def step(self, pin: int):
+        self.edges.append((time.monotonic_ns(), pin, HIGH))
+
+    def step_many(self, pins):
+        now = time.monotonic_ns()
+        self.edges.extend((now, pin, HIGH) for pin in pins)
+
+    def read(self, pin: int) -> int:
+        return self.inputs.get(pin, HIGH)
+
+    def queue_pulses(self, pin: int, offsets_ns):
+        self._pending.extend((offset, pin, HIGH) for offset in offsets_ns)
+
+    def queue_level(self, pin: int, level: int, offset_ns: int):
+        self.levels[pin] = level
+        self._pending.append((offset_ns, pin, level))
+
+    def flush(self, start_ns: int, length_ns: int):
+        self._pending.sort()
+        self.edges.extend((start_ns + offset, pin, level) for offset, pin, level in self._pending)
+        self._pending = []
+
+    def step_times(self, pin: int):
+        return [t for t, p, level in self.edges if p == pin and level == HIGH]
+
+BACKENDS = {
+    "null": NullBackend,
+    "gpio": GpioBackend,
+    "pigpio": PigpioWaveBackend,
+    "sim": SimBackend,
+}
+
+def create_backend(name: str, pulse_us: int = 3) -> StepBackend:
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"неизвестный бэкенд шагов: {name}")
+    return cls(pulse_us)
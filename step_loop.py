@@ -0,0 +1,257 @@
+import os
+import select
+import sys
+import threading
+import time
+from collections import deque
+
+import stats
+
+# ===== ПОЧТОВЫЙ ЯЩИК УСТАВОК =====
+class SetpointMailbox:
+    # Последнее значение без блокировок: писатель один (приёмник), запись и
+    # чтение — замена/чтение одной ссылки на кортеж (seq, targets), что под
+    # GIL атомарно. Промежуточные уставки читателю не нужны.
+    # Редкие команды (обнуление оси, калибровка) идут отдельной очередью:
+    # append/popleft у deque тоже потокобезопасны без блокировки. Команда
+    # получает номер (по порядку — под замком, писателей несколько), цикл
+    # шагов пишет в done номер выполненной: command_done() как у MotionCore.
+    # channels — последний кадр каналов, только для записи движения.
+    # Новая цель или команда будит спящий цикл шагов через waker; тот же
+    # кадр с прежними целями — нет.
+    __slots__ = ("_slot", "commands", "channels", "waker", "done", "_posted", "_lock")
+
+    def __init__(self, targets=()):
+        self._slot = (0, tuple(targets))
+        self.commands = deque()
+        self.channels = None
+        self.waker = Waker()
+        self.done = 0
+        self._posted = 0
+        self._lock = threading.Lock()
+
+    def publish(self, targets, channels=None):
+        seq, old = self._slot
+        targets = tuple(targets)
+        self._slot = (seq + 1, targets)
+        if channels is not None:
+            self.channels = channels
+        if targets != old:
+            self.waker.wake()
+
+    def latest(self):
+        return self._slot
+
+    def targets(self):
+        return self._slot[1]
+
+    def command(self, name: str, arg: int = 0) -> int:
+        with self._lock:
+            self._posted += 1
+            seq = self._posted
+            self.commands.append((seq, name, arg))
+        self.waker.wake()
+        return seq
+
+    def command_done(self, seq: int) -> bool:
+        return self.done >= seq
+
+    def rezero(self, axis: int):
+        return self.command("rezero", axis)
+
+    def calibrate(self):
+        return self.command("calibrate")
+
+class Waker:
+    # Самопайп: писатель уставок будит цикл шагов, спящий в wait(). Создан
+    # до fork — будит и ядро движения в другом процессе.
+    __slots__ = ("_r", "_w")
+
+    def __init__(self):
+        self._r, self._w = os.pipe()
+        os.set_blocking(self._r, False)
+        os.set_blocking(self._w, False)
+
+    def wake(self):
+        try:
+            os.write(self._w, b"\0")
+        except BlockingIOError:
+            pass  # в пайпе и так лежит пробуждение
+
+    def wait(self, timeout: float) -> bool:
+        # True — разбудили, False — вышло время
+        if not select.select((self._r,), (), (), timeout)[0]:
+            return False
+        try:
+            os.read(self._r, 4096)
+        except BlockingIOError:
+            pass
+        return True
+
+def run_command(motor_control, name: str, arg: int):
+    if name == "rezero":
+        motor_control.set_position(arg, 0)
+    elif name == "calibrate":
+        # калибровка идёт дальше внутри step_all(), цикл не блокируется
+        motor_control.start_homing()
+
+# ===== ОЖИДАНИЕ ДЕДЛАЙНА =====
+# adaptive — сон до ближайшего дедлайна осей минус запас, подстраиваемый
+# по опозданию пробуждений, остаток — опрос часов; моторы стоят — сон до
+# новой уставки или команды. fixed — прежний сон с постоянным запасом, не
+# дольше 1 мс.
+STEP_WAIT = os.environ.get("STEP_WAIT", "adaptive")
+IDLE_SLEEP = 0.001     # fixed: все моторы стоят — ждём новые уставки
+SPIN_MARGIN_NS = 300_000  # fixed: ближе к дедлайну не спим, а крутимся
+IDLE_WAIT = 0.05       # adaptive: без дел — не дольше (стоп, снимок настроек)
+HOMING_POLL_NS = 1_000_000  # калибровка между ходами: фазы меняет step_all()
+SPIN_MIN_NS = 10_000
+SPIN_MAX_NS = 1_000_000
+# запас — такая квантиль опоздания пробуждений: хвост дальше неё дешевле
+# пропустить, чем держать ядро в опросе часов на каждом шаге
+SPIN_QUANTILE = float(os.environ.get("STEP_SPIN_QUANTILE", 0.95))
+SPIN_STEP_NS = 2_000
+TIMER_SLACK_NS = 1_000  # у обычного потока ядро округляет таймеры на 50 мкс
+
+def tighten_timer_slack(slack_ns: int = TIMER_SLACK_NS):
+    # prctl(PR_SET_TIMERSLACK) для вызывающего потока; SCHED_FIFO и так без него
+    try:
+        import ctypes
+        ctypes.CDLL(None, use_errno=True).prctl(29, slack_ns, 0, 0, 0)
+    except (OSError, AttributeError):
+        pass
+
+class DeadlineWaiter:
+    # Сон в select() по пайпу ящика до дедлайна минус spin_ns, остаток —
+    # опрос часов. spin_ns подстраивается под квантиль SPIN_QUANTILE
+    # опоздания пробуждений: проспал дальше запаса — запас растёт на
+    # SPIN_STEP_NS, иначе спадает на долю шага. Редкие выбросы в
+    # миллисекунды запас не раздувают.
+    __slots__ = ("waker", "spin_ns", "_down_ns", "sleeps", "woken", "idle_waits")
+
+    def __init__(self, waker: Waker):
+        self.waker = waker
+        self.spin_ns = SPIN_MIN_NS
+        self._down_ns = int(SPIN_STEP_NS * (1 - SPIN_QUANTILE) / SPIN_QUANTILE)
+        self.sleeps = 0
+        self.woken = 0       # сон прерван новой уставкой или командой
+        self.idle_waits = 0  # моторы стояли
+
+    def wait(self, motor_control, soft_due=None):
+        # soft_due — срок без точности (запись движения): до него только сон
+        due = motor_control.next_due_ns()
+        now = time.monotonic_ns()
+        if motor_control.homing_active and (soft_due is None or soft_due > now + HOMING_POLL_NS):
+            soft_due = now + HOMING_POLL_NS
+        spin = self.spin_ns
+        if soft_due is not None and (due is None or soft_due < due - spin):
+            if soft_due > now and self.waker.wait((soft_due - now) / 1e9):
+                self.woken += 1
+            return
+        if due is None:
+            self.idle_waits += 1
+            if self.waker.wait(IDLE_WAIT):
+                self.woken += 1
+            return
+        gap = due - now
+        if gap > spin:
+            wake_at = due - spin
+            self.sleeps += 1
+            if self.waker.wait((gap - spin) / 1e9):
+                self.woken += 1
+                return  # новая цель — план мог измениться
+            self._adapt(time.monotonic_ns() - wake_at)
+        while time.monotonic_ns() < due:
+            pass
+
+    def _adapt(self, late: int):
+        if late > self.spin_ns:
+            spin = self.spin_ns + SPIN_STEP_NS
+            self.spin_ns = spin if spin < SPIN_MAX_NS else SPIN_MAX_NS
+        else:
+            spin = self.spin_ns - self._down_ns
+            self.spin_ns = spin if spin > SPIN_MIN_NS else SPIN_MIN_NS
+
+    def snapshot(self):
+        return {"mode": STEP_WAIT, "spin_us": self.spin_ns / 1000,
+                "sleeps": self.sleeps, "woken": self.woken, "idle_waits": self.idle_waits}
+
+def wait_until_due(motor_control):
+    # fixed: сон до ближайшего дедлайна (не дольше 1 мс — чтобы видеть новые уставки)
+    due = motor_control.next_due_ns()
+    if due is None:
+        time.sleep(IDLE_SLEEP)
+        return
+    gap = due - time.monotonic_ns()
+    if gap > SPIN_MARGIN_NS:
+        time.sleep(min(gap - SPIN_MARGIN_NS, 1_000_000) / 1e9)
+
+def lag_ns(motor_control) -> int:
+    # насколько цикл шагов не успевает: срок ближайшего шага уже прошёл,
+    # а шага всё нет (0 — успевает или оси стоят); зовётся из чужого потока
+    due = motor_control.next_due_ns()
+    if due is None:
+        return 0
+    return max(0, time.monotonic_ns() - due)
+
+# ===== ЦИКЛ ШАГОВ =====
+class StepLoop(threading.Thread):
+    # Генератор шагов в своём потоке: не ждёт UART, забирает уставки из
+    # ящика и спит ровно до ближайшего дедлайна среди осей.
+
+    def __init__(self, motor_control, mailbox: SetpointMailbox, recorder=None):
+        super().__init__(name="step-loop", daemon=True)
+        self.motor_control = motor_control
+        self.mailbox = mailbox
+        self.recorder = recorder  # motion_trace.TraceRecorder или None
+        self.waiter = DeadlineWaiter(mailbox.waker)
+        stats.register("step_wait", self.waiter.snapshot)
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self.mailbox.waker.wake()
+
+    def run(self):
+        motor_control = self.motor_control
+        targets = motor_control.target_positions
+        latest = self.mailbox.latest
+        commands = self.mailbox.commands
+        seq = 0
+        stopped = self._stop_event.is_set
+        period = stats.STEP_LOOP_PERIOD
+        recorder = self.recorder
+        mailbox = self.mailbox
+        adaptive = STEP_WAIT == "adaptive"
+        wait = self.waiter.wait
+        if adaptive:
+            tighten_timer_slack()
+        last = time.monotonic_ns()
+        while not stopped():
+            now = time.monotonic_ns()
+            period.record_ns(now - last)
+            last = now
+            new_seq, new_targets = latest()
+            if new_seq != seq:
+                seq = new_seq
+                targets[:] = new_targets
+            while commands:
+                done, name, arg = commands.popleft()
+                run_command(motor_control, name, arg)
+                mailbox.done = done
+            motor_control.step_all()
+            if recorder is not None and now >= recorder.due:
+                recorder.sample(motor_control, now, mailbox.channels)
+            if adaptive:
+                wait(motor_control, recorder.due if recorder is not None else None)
+            else:
+                wait_until_due(motor_control)
+        if recorder is not None:
+            recorder.close()
+
+def start_step_loop(motor_control, mailbox: SetpointMailbox, recorder=None) -> StepLoop:
+    # интервал переключения GIL по умолчанию 5 мс — для шагов слишком грубо
+    sys.setswitchinterval(0.0005)
+    loop = StepLoop(motor_control, mailbox, recorder)
+    loop.start()
+    return loop
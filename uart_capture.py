@@ -0,0 +1,207 @@
+import argparse
+import os
+import struct
+import time
+
+# ===== ЗАПИСЬ UART =====
+# Сырые куски, прочитанные приёмником, с метками monotonic_ns — в компактный
+# двоичный файл только на дописывание. Файл начинается с заголовка (магия,
+# время по часам и monotonic в момент открытия), дальше записи:
+# t_ns uint64, длина uint16, байты. По достижении max_bytes файл уходит
+# в path.1 (path.1 -> path.2 ...), самый старый удаляется.
+
+CAPTURE_PATH = os.environ.get("UART_CAPTURE", "")
+CAPTURE_MAX_BYTES = int(float(os.environ.get("UART_CAPTURE_MB", 8)) * 1024 * 1024)
+CAPTURE_FILES = int(os.environ.get("UART_CAPTURE_FILES", 4))
+
+MAGIC = b"UARTCAP1"
+FLUSH_INTERVAL_NS = 1_000_000_000  # в ОС — не чаще раза в секунду
+
+_header = struct.Struct("<8sQQ")
+_record = struct.Struct("<QH")
+MAX_CHUNK = 0xFFFF
+
+class CaptureWriter:
+    def __init__(self, path: str, max_bytes: int = CAPTURE_MAX_BYTES, files: int = CAPTURE_FILES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.files = files
+        self._file = None
+        self._size = 0
+        self._flushed_ns = 0
+        self._open()
+
+    def _open(self):
+        # буфер 64 КБ: в потоке приёмника запись — копия в память
+        self._file = open(self.path, "ab", buffering=65536)
+        self._size = self._file.tell()
+        if self._size == 0:
+            self._file.write(_header.pack(MAGIC, time.time_ns(), time.monotonic_ns()))
+            self._size = _header.size
+
+    def write(self, data, t_ns: int = None):
+        if t_ns is None:
+            t_ns = time.monotonic_ns()
+        f = self._file
+        for pos in range(0, len(data), MAX_CHUNK):
+            chunk = data[pos:pos + MAX_CHUNK]
+            f.write(_record.pack(t_ns, len(chunk)))
+            f.write(chunk)
+            self._size += _record.size + len(chunk)
+        if t_ns - self._flushed_ns >= FLUSH_INTERVAL_NS:
+            f.flush()
+            self._flushed_ns = t_ns
+        if self._size >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        self._file.close()
+        for n in range(self.files - 1, 0, -1):
+            older = f"{self.path}.{n}"
+            if os.path.exists(older):
+                if n + 1 < self.files:
+                    os.replace(older, f"{self.path}.{n + 1}")
+                else:
+                    os.unlink(older)
+        if self.files > 1:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.unlink(self.path)
+        self._open()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def open_capture():
+    # UART_CAPTURE не задан — запись выключена
+    if not CAPTURE_PATH:
+        return None
+    try:
+        return CaptureWriter(CAPTURE_PATH)
+    except OSError:
+        return None
+
+# ===== ЧТЕНИЕ =====
+def capture_files(path: str):
+    # от старых к новым: path.N ... path.1, path
+    rotated = []
+    n = 1
+    while os.path.exists(f"{path}.{n}"):
+        rotated.append(f"{path}.{n}")
+        n += 1
+    files = rotated[::-1]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+def read_records(paths):
+    # (t_ns, байты) по всем файлам подряд; обрезанный хвост (сбой питания)
+    # просто заканчивает файл
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < _header.size or data[:8] != MAGIC:
+            raise ValueError(f"не запись UART: {path}")
+        pos = _header.size
+        end = len(data)
+        while pos + _record.size <= end:
+            t_ns, length = _record.unpack_from(data, pos)
+            pos += _record.size
+            if pos + length > end:
+                break
+            yield t_ns, data[pos:pos + length]
+            pos += length
+
+# ===== ВОСПРОИЗВЕДЕНИЕ =====
+class ReplayUart:
+    # Вместо serial.Serial в receive_data: отдаёт записанные куски с прежними
+    # паузами, делёнными на speed (0 — без пауз). Конец записи — EOFError.
+
+    def __init__(self, records, speed: float = 1.0):
+        self._records = iter(records)
+        self._next = next(self._records, None)
+        self.speed = speed
+        self._first_ns = self._next[0] if self._next is not None else 0
+        self._start_ns = None
+        self.chunks = 0
+        self.bytes = 0
+        self.last_ns = self._first_ns
+
+    def _wait(self, t_ns: int):
+        if self._start_ns is None:
+            self._start_ns = time.monotonic_ns()
+        if self.speed:
+            due = self._start_ns + int((t_ns - self._first_ns) / self.speed)
+            delay = due - time.monotonic_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+
+    @property
+    def in_waiting(self) -> int:
+        if self._next is None:
+            return 0
+        self._wait(self._next[0])
+        return len(self._next[1])
+
+    def read(self, size: int = 1) -> bytes:
+        record = self._next
+        if record is None:
+            raise EOFError
+        self._wait(record[0])
+        self._next = next(self._records, None)
+        self.chunks += 1
+        self.bytes += len(record[1])
+        self.last_ns = record[0]
+        return record[1]
+
+    @property
+    def recorded_s(self) -> float:
+        return (self.last_ns - self._first_ns) / 1e9
+
+    def close(self):
+        pass
+
+def replay(path: str, speed: float):
+    # приёмник и цикл шагов как на машине, моторы — SimBackend
+    os.environ["STEP_BACKEND"] = "sim"
+    os.environ["MOTION_CORE"] = "thread"
+    import motor_control as motor
+    import data_receiver
+    import step_loop
+
+    paths = capture_files(path)
+    if not paths:
+        raise FileNotFoundError(path)
+    mailbox = step_loop.SetpointMailbox(motor.target_positions)
+    loop = step_loop.start_step_loop(motor, mailbox)
+    source = ReplayUart(read_records(paths), speed)
+    start = time.perf_counter()
+    data_receiver.receive_data(motor, mailbox, uart=source)
+    elapsed = time.perf_counter() - start
+    # даём моторам доехать до последних целей записи
+    deadline = time.monotonic() + 10.0
+    while any(plan is not None for plan in motor.plans) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    loop.stop()
+    loop.join()
+
+    recorded = source.recorded_s
+    print(f"файлов {len(paths)}, кусков {source.chunks}, байт {source.bytes}")
+    print(f"запись {recorded:.2f} с, воспроизведение {elapsed:.2f} с "
+          f"({recorded / elapsed if elapsed else 0:.1f}x, {source.bytes / elapsed / 1024 if elapsed else 0:.0f} КБ/с)")
+    steps = [len(motor.backend.step_times(pin)) for pin in motor.STEP_PINS]
+    print(f"шагов по осям {steps}, позиции {list(motor.positions)}, цели {list(motor.target_positions)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="воспроизведение записи UART через приёмник")
+    parser.add_argument("command", choices=["replay"])
+    parser.add_argument("path", help="файл записи (повёрнутые path.N подхватываются)")
+    parser.add_argument("--speed", default="1", help="1, N (ускорение) или max")
+    args = parser.parse_args()
+    speed = 0.0 if args.speed == "max" else float(args.speed)
+    replay(args.path, speed)
+
+if __name__ == "__main__":
+    main()